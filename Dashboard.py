@@ -1,25 +1,53 @@
 # dashboard_enhanced.py
 # Requirements:
-import gc
+import hashlib
+import json
+import logging
 import os
+import tempfile
+import threading
 import time
+import tracemalloc
+import uuid
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
 import pandas as pd
-from functools import lru_cache
 import numpy as np
 import re
 import plotly.graph_objects as go
-from plotly.subplots import make_subplots
 import dash
-from dash import dcc, html, Input, Output, State,dash_table
+from dash import dcc, html, Input, Output, State,dash_table, Patch, ctx
+from flask import Response, abort, jsonify, send_file, request as flask_request
+from coalesce import LatestOnly, SingleFlight, Superseded
+from compression import install_compression
+from computation import Computation
+from exports import EXPORT_CHUNK_ROWS, available_formats, export_response
+from export_jobs import ExportJobs
+from health import StartupFailed, install_health, rss_bytes
+from ingest import Column, load_dataset, prepare
+from memory_budget import MemoryBudget, MemoryBudgetExceeded, cgroup_limit, nbytes
+from tracing import Tracer, bind, span, traced
+from metrics import REGISTRY, current_callback, install_metrics, instrument_callbacks
+from profiling import Profiler, install_profiling, profile_callbacks, profiling_active
 from dash.exceptions import PreventUpdate
 import dash_bootstrap_components as dbc
-import requests  # ✅ ADD THIS
-import io
-if os.environ.get('RENDER'):
-    print("Running on Render - limiting data size")
-    LIMIT_ROWS = 5000  # Process only first 190k rows
-else:
-    LIMIT_ROWS = None 
+from figure_specs import (COLORS, METRIC_Y_TITLES, cvr_colors, figure_spec,
+                          grid_2x2, scatter_trace, treemap_figure, add_metric_markers, add_metric_bubbles,
+                          encode_figure, figure_structure)
+from urllib.parse import urlencode
+# DEBUG adds per-request detail (filtered shapes, chart timings, payload sizes); those calls cost
+# nothing at the default INFO level
+LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO').upper()
+logging.basicConfig(level=LOG_LEVEL, format='%(asctime)s %(levelname)s %(message)s')
+log = logging.getLogger('dashboard')
+# Rows kept from each CSV (0 = all); Render's small instance defaults to 5000
+LIMIT_ROWS = int(os.environ.get('LIMIT_ROWS', 5000 if os.environ.get('RENDER') else 0)) or None
+if LIMIT_ROWS:
+    log.info("Limiting data size to %d rows", LIMIT_ROWS)
+# Raw CSV columns to load besides the schema columns (see LOAD DATA), comma-separated. The row
+# exports carry the schema columns, so by default nothing else is loaded; columns listed here are
+# added to the exports, and '*' loads every raw column (more memory).
+EXTRA_COLUMNS = tuple(c.strip() for c in os.environ.get('EXTRA_COLUMNS', '').split(',') if c.strip())
 # -----------------------------
 # CONFIG
 # -----------------------------
@@ -30,111 +58,118 @@ DOMAIN_FILE_ID = "-"
 KEYWORD_DATA_FILE = "Max Learning_5Dec202517_54_48_27Nov2025_03Dec2025.csv"
 DOMAIN_DATA_FILE = "Domain Analysis_27Nov2025_03Dec2025.csv"
 PORT = 8050
+# BINARY_FIGURES=1 sends figure arrays as base64 typed arrays (about 3% smaller payloads). Opt-in:
+# it needs plotly.js >= 2.28, newer than the one bundled with dash 2.14, so that build is loaded
+# from PLOTLYJS_URL (dcc.Graph picks up window.Plotly) and every chart breaks if it cannot be
+# fetched. Point PLOTLYJS_URL at a self-hosted copy where the CDN is not reachable.
+BINARY_FIGURES = os.environ.get('BINARY_FIGURES', '0') == '1'
+PLOTLYJS_URL = os.environ.get('PLOTLYJS_URL', "https://cdn.plot.ly/plotly-2.35.2.min.js")
+# gzip/brotli responses at least this large (0 disables compression)
+COMPRESS_MIN_BYTES = int(os.environ.get('COMPRESS_MIN_BYTES', 1024))
+# Threads building the keyword charts of one update in parallel (1 = build them one after another)
+CHART_WORKERS = int(os.environ.get('CHART_WORKERS', min(8, os.cpu_count() or 1)))
+# Finished dashboard views kept per worker, so a repeated filter combination is not recomputed
+VIEW_CACHE_SIZE = int(os.environ.get('VIEW_CACHE_SIZE', 64))
+# Background warm-up of likely views after startup (see WARM-UP)
+WARMUP = os.environ.get('WARMUP', '1') == '1'
+WARMUP_TOP_ADVERTISERS = int(os.environ.get('WARMUP_TOP_ADVERTISERS', 10))
+WARMUP_BUDGET_SECONDS = float(os.environ.get('WARMUP_BUDGET_SECONDS', 120))
+WARMUP_CPU_SHARE = float(os.environ.get('WARMUP_CPU_SHARE', 0.5))
+# Per-view request counts, kept across worker recycles (point it at a persistent disk to keep
+# them across deploys too)
+ACCESS_LOG = os.environ.get('ACCESS_LOG', os.path.join(tempfile.gettempdir(), 'dashboard_view_access.json'))
+# Per-request stage traces: the last 50 are viewable at /debug/traces (with PROFILE_TOKEN, see
+# below), and a sample of them plus every one slower than TRACE_SLOW_SECONDS is appended to
+# TRACE_LOG (JSON lines)
+TRACE_LOG = os.environ.get('TRACE_LOG', os.path.join(tempfile.gettempdir(), 'dashboard_traces.jsonl'))
+TRACE_SAMPLE_RATE = float(os.environ.get('TRACE_SAMPLE_RATE', 0.05))
+TRACE_SLOW_SECONDS = float(os.environ.get('TRACE_SLOW_SECONDS', 2))
+# On-demand callback profiling (/debug/profile/arm, /debug/profiles) - off unless PROFILE_TOKEN is set.
+# The token (X-Debug-Token header or ?token=) also guards /debug/traces.
+# At most PROFILE_MAX_CONCURRENT profiles run at once, the last PROFILE_KEEP are kept in PROFILE_DIR
+PROFILE_TOKEN = os.environ.get('PROFILE_TOKEN') or None
+PROFILE_DIR = os.environ.get('PROFILE_DIR', os.path.join(tempfile.gettempdir(), 'dashboard_profiles'))
+PROFILE_MAX_CONCURRENT = int(os.environ.get('PROFILE_MAX_CONCURRENT', 1))
+PROFILE_KEEP = int(os.environ.get('PROFILE_KEEP', 20))
+# Memory budget (MB) for the data frames plus every cache. Default: 80% of the container's memory
+# limit minus what the process already uses before loading data; no limit outside a container.
+# Over budget, caches are evicted (see MEMORY) and exports that would not fit are refused
+MEMORY_BUDGET_MB = float(os.environ.get('MEMORY_BUDGET_MB', 0))
+if MEMORY_BUDGET_MB:
+    memory = MemoryBudget(int(MEMORY_BUDGET_MB * 1e6))
+else:
+    container = cgroup_limit()
+    memory = MemoryBudget(int(container * 0.8) - (rss_bytes() or 0) if container else None)
+# Startup phase reported by /healthz and /readyz:
+# loading -> preprocessing -> building -> starting -> indexing -> warming -> ready (or failed)
+STARTED = time.time()
+LOAD_STATE = {'phase': 'loading', 'since': STARTED, 'error': None}
+PHASE_SECONDS = {}  # seconds spent in each finished phase
+PHASE_PEAK_BYTES = {}  # peak traced memory per finished phase, only filled while tracemalloc runs (benchmarks)
+phase_stage = memory.begin('startup loading')  # peak RSS growth per phase, in memory.stages
+def set_phase(phase, error=None):
+    global phase_stage
+    now = time.time()
+    if phase_stage is not None:
+        memory.end(phase_stage)
+    # 'starting' is idle until a gunicorn worker is forked (with no stage running), the last two are final
+    phase_stage = None if phase in ('starting', 'ready', 'failed') else memory.begin(f"startup {phase}")
+    PHASE_SECONDS[LOAD_STATE['phase']] = round(now - LOAD_STATE['since'], 3)
+    if tracemalloc.is_tracing():
+        PHASE_PEAK_BYTES[LOAD_STATE['phase']] = tracemalloc.get_traced_memory()[1]
+        tracemalloc.reset_peak()
+    LOAD_STATE.update(phase=phase, since=now, error=error)
+    log.info("🚦 Phase: %s%s", phase, f" ({error})" if error else "")
 
-@lru_cache(maxsize=1)
-def load_keyword_data():
-    """Load from Google Drive on Render, local file otherwise"""
-    try:
-        if os.environ.get('RENDER'):
-            # Running on Render - load from Google Drive
-            print("📥 Loading keyword data from Google Drive...")
-            url = f"https://drive.google.com/uc?export=download&id={KEYWORD_FILE_ID}"
-            response = requests.get(url, timeout=120)
-            response.raise_for_status()
-            df = pd.read_csv(io.StringIO(response.text), low_memory=False)
-            print(f"✅ Loaded {len(df)} rows from Google Drive")
-        else:
-            # Running locally - try local file first, fallback to Drive
-            if os.path.exists(KEYWORD_DATA_FILE):
-                print("📂 Loading keyword data from local file...")
-                df = pd.read_csv(KEYWORD_DATA_FILE, low_memory=False)
-                print(f"✅ Loaded {len(df)} rows from local file")
-            else:
-                print(f"⚠️ Local file not found, loading from Google Drive...")
-                url = f"https://drive.google.com/uc?export=download&id={KEYWORD_FILE_ID}"
-                response = requests.get(url, timeout=120)
-                response.raise_for_status()
-                df = pd.read_csv(io.StringIO(response.text), low_memory=False)
-                print(f"✅ Loaded {len(df)} rows from Google Drive")
-        
-        # Apply row limit if set
-        if LIMIT_ROWS:
-            df = df.head(LIMIT_ROWS)
-            print(f"✅ Limited to {len(df)} rows")
-        
-        return df
-    except Exception as e:
-        print(f"❌ Error loading keyword data: {e}")
-        return pd.DataFrame()
-
-@lru_cache(maxsize=1)
-def load_domain_data():
-    """Load from Google Drive on Render, local file otherwise"""
-    try:
-        if os.environ.get('RENDER'):
-            # Running on Render - load from Google Drive
-            print("📥 Loading domain data from Google Drive...")
-            url = f"https://drive.google.com/uc?export=download&id={DOMAIN_FILE_ID}"
-            response = requests.get(url, timeout=120)
-            response.raise_for_status()
-            df = pd.read_csv(io.StringIO(response.text), low_memory=False)
-            print(f"✅ Loaded {len(df)} rows from Google Drive")
-        else:
-            # Running locally - try local file first, fallback to Drive
-            if os.path.exists(DOMAIN_DATA_FILE):
-                print("📂 Loading domain data from local file...")
-                df = pd.read_csv(DOMAIN_DATA_FILE, low_memory=False)
-                print(f"✅ Loaded {len(df)} rows from local file")
-            else:
-                print(f"⚠️ Local file not found, loading from Google Drive...")
-                url = f"https://drive.google.com/uc?export=download&id={DOMAIN_FILE_ID}"
-                response = requests.get(url, timeout=120)
-                response.raise_for_status()
-                df = pd.read_csv(io.StringIO(response.text), low_memory=False)
-                print(f"✅ Loaded {len(df)} rows from Google Drive")
-        
-        # Apply row limit if set
-        if LIMIT_ROWS:
-            df = df.head(LIMIT_ROWS)
-            print(f"✅ Limited to {len(df)} rows")
-            
-        return df
-    except Exception as e:
-        print(f"❌ Error loading domain data: {e}")
-        return pd.DataFrame()
-COLORS = {
-    'primary': '#00D9FF',
-    'secondary': '#FF6B9D',
-    'success': '#00F5A0',
-    'warning': '#FFD93D',
-    'danger': '#FF6B6B',
-    'info': '#A78BFA',
-    'background': '#0F1419',
-    'card_bg': '#121419',
-    'text': '#E5E7EB',
-    'muted': '#9CA3AF'
+# Dataset schemas: canonical column -> Column(headers it may have in the CSV, kind, value when
+# absent) - see ingest.py. Columns outside the schema are loaded only as EXTRA_COLUMNS.
+FILTER_SCHEMA = {
+    'Campaign_Objective': Column(['[Learning] Campaign Objective', 'Campaign Objective']),
+    'Advertiser': Column(['Advertiser', 'Advertiser.']),
+    'Campaign_Type': Column(['Campaign Type']),
+    'Campaign': Column(['Campaign']),
 }
-PLOT_TEMPLATE = {
-    'layout': {
-        'font': {'color': 'white', 'family': 'Arial, sans-serif'},
-        'xaxis': {'gridcolor': 'rgba(255,255,255,0.1)', 'color': 'white'},
-        'yaxis': {'gridcolor': 'rgba(255,255,255,0.1)', 'color': 'white'},
-        'paper_bgcolor': 'rgba(0,0,0,0)',
-        'plot_bgcolor': 'rgba(30,30,40,0.3)'
-    }
+METRIC_SCHEMA = {
+    'Impressions': Column(['Ad Impressions', 'Ad Impressions.'], 'number', 0),
+    'Clicks': Column(['Clicks', 'Clicks.'], 'number', 0),
+    'CTR': Column(['CTR', 'CTR.'], 'number'),
+    'CVR': Column(['CVR', 'CVR,'], 'number'),
+    'CPA': Column(['CPA', 'CPA.'], 'number'),
+    'ROAS': Column(['roas', 'roas.', 'ROAS'], 'number'),
+    'Max_System_Cost': Column(['Max System Cost', 'Max System Cost.'], 'number'),
+    'Weighted_Conversion': Column(['Weighted Conversion', 'Weighted Conversion.'], 'number'),
 }
+KEYWORD_SCHEMA = {
+    **FILTER_SCHEMA,
+    'Keyword': Column(['Keyword', '.Keyword'], absent=None),  # required, see LOAD DATA
+    'Keyword_Category': Column(['Keyword Category', 'Keyword Category.']),
+    'Query_Type': Column(['Query_Type', 'Query_Type.']),
+    'Emotional_Intent': Column(['Emotional_Intent', 'Emotional Intent']),
+    'Phrase_Components': Column(['Individual_Words', 'Phrase Components']),
+    'Word_Count': Column(['Number_of_Words', 'Word Count'], 'number'),
+    'Character_Count': Column(['Number_of_Characters', 'Character Count'], 'number'),
+    'Is_Question': Column(['Is_Question']),
+    # text levels, not numbers; their charts are left out when the CSV has no such column
+    'Specificity_Score': Column(['Specificity_Score', 'Specificity Score'], 'label', None),
+    'Urgency_Level': Column(['Urgency_Level', 'Urgency Level'], 'label', None),
+    'Is_Number_Present': Column(['Is_Number_Present', 'Number_Present']),
+    'Position_of_Number': Column(['Position_of_Number']),
+    **METRIC_SCHEMA,
+}
+DOMAIN_SCHEMA = {
+    **FILTER_SCHEMA,
+    'Domain': Column(['Domain']),
+    'Domain_Category': Column(['Sprig Domain Category']),
+    **METRIC_SCHEMA,
+}
+def load_keyword_data():
+    """Keyword frame with only the KEYWORD_SCHEMA columns (renamed) and EXTRA_COLUMNS; empty on failure"""
+    return load_dataset(KEYWORD_DATA_FILE, KEYWORD_FILE_ID, 'keyword', KEYWORD_SCHEMA, EXTRA_COLUMNS, LIMIT_ROWS)
+def load_domain_data():
+    return load_dataset(DOMAIN_DATA_FILE, DOMAIN_FILE_ID, 'domain', DOMAIN_SCHEMA, EXTRA_COLUMNS, LIMIT_ROWS)
 # -----------------------------
 # UTILS
 # -----------------------------
-def find_col(df, candidates):
-    for c in candidates:
-        if c in df.columns:
-            return c
-    lower_cols = {col.lower(): col for col in df.columns}
-    for c in candidates:
-        if c.lower() in lower_cols:
-            return lower_cols[c.lower()]
-    return None
 def split_multi(cell):
     if pd.isna(cell):
         return []
@@ -143,58 +178,15 @@ def split_multi(cell):
     txt = str(cell)
     parts = re.split(r'[;,]\s*', txt)
     return [p.strip() for p in parts if p.strip()!='']
-def cvr_color(val, metric='CVR'):
-    if metric == 'CVR':
-        if val >= 1.0:
-            return COLORS['success']
-        if val < 0.5:
-            return COLORS['danger']
-        return COLORS['warning']
-    elif metric == 'CPA':
-        if val <= 50:
-            return COLORS['success']
-        if val > 150:
-            return COLORS['danger']
-        return COLORS['warning']
-    elif metric == 'ROAS':
-        if val >= 3.0:
-            return COLORS['success']
-        if val < 1.5:
-            return COLORS['danger']
-        return COLORS['warning']
-    return COLORS['info']
 # -----------------------------
 # LOAD DATA
 # -----------------------------
-df_keyword = load_keyword_data()
-df_domain = load_domain_data()
-df = df_keyword
-# Column mapping
-COL_CAMPAIGN_OBJ = find_col(df, ['[Learning] Campaign Objective', 'Campaign Objective'])
-COL_ADVERTISER = find_col(df, ['Advertiser', 'Advertiser.'])
-COL_CAMPAIGN_TYPE = find_col(df, ['Campaign Type'])
-COL_CAMPAIGN = find_col(df, ['Campaign'])
-COL_KEYWORD = find_col(df, ['Keyword', '.Keyword'])
-COL_KEYWORD_CAT = find_col(df, ['Keyword Category', 'Keyword Category.'])
-COL_QUERY_TYPE = find_col(df, ['Query_Type', 'Query_Type.'])
-COL_EMOT = find_col(df, ['Emotional_Intent', 'Emotional Intent'])
-COL_PHRASE = find_col(df, ['Individual_Words', 'Phrase Components'])
-COL_WORDCOUNT = find_col(df, ['Number_of_Words', 'Word Count'])
-COL_CHARCOUNT = find_col(df, ['Number_of_Characters', 'Character Count'])
-COL_IS_QUESTION = find_col(df, ['Is_Question'])
-COL_SPECIFICITY = find_col(df, ['Specificity_Score', 'Specificity Score'])
-COL_URGENCY = find_col(df, ['Urgency_Level', 'Urgency Level'])
-COL_NUMBER = find_col(df, ['Is_Number_Present', 'Number_Present'])
-COL_NUMBER_POS = find_col(df, ['Position_of_Number'])
-COL_IMPRESSIONS = find_col(df, ['Ad Impressions', 'Ad Impressions.'])
-COL_CLICKS = find_col(df, ['Clicks', 'Clicks.'])
-COL_CTR = find_col(df, ['CTR', 'CTR.'])
-COL_CVR = find_col(df, ['CVR', 'CVR,'])
-COL_CPA = find_col(df, ['CPA', 'CPA.'])
-COL_ROAS = find_col(df, ['roas', 'roas.', 'ROAS'])
-COL_MAX_COST = find_col(df, ['Max System Cost', 'Max System Cost.'])
-COL_WEIGHTED_CONV = find_col(df, ['Weighted Conversion', 'Weighted Conversion.'])
-if df.empty or COL_KEYWORD is None:
+# Loaded already renamed and projected; preprocessing types the frames in place, so each
+# dataset exists once
+work = load_keyword_data()
+work_domain = load_domain_data()
+set_phase('preprocessing')
+if work.empty or 'Keyword' not in work.columns:
     app = dash.Dash(__name__, external_stylesheets=[dbc.themes.CYBORG])
     app.layout = dbc.Container([
         html.H2("Dashboard - Data Load Error", style={'color': COLORS['text']}),
@@ -209,104 +201,99 @@ if df.empty or COL_KEYWORD is None:
     
     html.Div(id="tab-content")
     ], fluid=True)
+    set_phase('failed', "Could not load keyword data" if work.empty else "Keyword column not found")
+    # Keep answering health checks with the reason instead of just crash-looping (see wsgi.py)
+    install_health(app.server, lambda: {'phase': LOAD_STATE['phase'], 'error': LOAD_STATE['error'],
+                                        'rows': {'keyword': len(work), 'domain': len(work_domain)},
+                                        'rss_bytes': rss_bytes()},
+                   lambda: False)
     if __name__ == '__main__':
         app.run_server(debug=True, port=PORT)
-    raise SystemExit("Data not loaded")
+    raise StartupFailed("Data not loaded", app.server)
 # -----------------------------
 # PREPROCESS
 # -----------------------------
-work = df.copy()
-if LIMIT_ROWS:
-    work = work.head(LIMIT_ROWS)
-    print(f"✅ LIMITED to {len(work)} rows for Render production")
-else:
-    print(f"Processing all {len(work)} rows")
-rename_map = {}
-if COL_CAMPAIGN_OBJ: rename_map[COL_CAMPAIGN_OBJ] = 'Campaign_Objective'
-if COL_ADVERTISER: rename_map[COL_ADVERTISER] = 'Advertiser'
-if COL_CAMPAIGN_TYPE: rename_map[COL_CAMPAIGN_TYPE] = 'Campaign_Type'
-if COL_CAMPAIGN: rename_map[COL_CAMPAIGN] = 'Campaign'
-if COL_KEYWORD: rename_map[COL_KEYWORD] = 'Keyword'
-if COL_KEYWORD_CAT: rename_map[COL_KEYWORD_CAT] = 'Keyword_Category'
-if COL_QUERY_TYPE: rename_map[COL_QUERY_TYPE] = 'Query_Type'
-if COL_EMOT: rename_map[COL_EMOT] = 'Emotional_Intent'
-if COL_PHRASE: rename_map[COL_PHRASE] = 'Phrase_Components'
-if COL_WORDCOUNT: rename_map[COL_WORDCOUNT] = 'Word_Count'
-if COL_CHARCOUNT: rename_map[COL_CHARCOUNT] = 'Character_Count'
-if COL_IS_QUESTION: rename_map[COL_IS_QUESTION] = 'Is_Question'
-if COL_SPECIFICITY: rename_map[COL_SPECIFICITY] = 'Specificity_Score'
-if COL_URGENCY: rename_map[COL_URGENCY] = 'Urgency_Level'
-if COL_NUMBER: rename_map[COL_NUMBER] = 'Is_Number_Present'
-if COL_NUMBER_POS: rename_map[COL_NUMBER_POS] = 'Position_of_Number'
-if COL_IMPRESSIONS: rename_map[COL_IMPRESSIONS] = 'Impressions'
-if COL_CLICKS: rename_map[COL_CLICKS] = 'Clicks'
-if COL_CTR: rename_map[COL_CTR] = 'CTR'
-if COL_CVR: rename_map[COL_CVR] = 'CVR'
-if COL_CPA: rename_map[COL_CPA] = 'CPA'
-if COL_ROAS: rename_map[COL_ROAS] = 'ROAS'
-if COL_MAX_COST: rename_map[COL_MAX_COST] = 'Max_System_Cost'
-if COL_WEIGHTED_CONV: rename_map[COL_WEIGHTED_CONV] = 'Weighted_Conversion'
-work = work.rename(columns=rename_map)
-
-# DEBUG - Check what's in the data after loading
-    
-for col in ['Impressions', 'Clicks', 'CTR', 'CVR', 'CPA', 'ROAS', 'Max_System_Cost', 'Weighted_Conversion', 'Word_Count', 'Character_Count']:
-    if col in work.columns:
-        work[col] = pd.to_numeric(work[col], errors='coerce').fillna(0)
-# Keep Specificity_Score as text - don't convert to numeric!
-if 'Specificity_Score' in work.columns:
-    work['Specificity_Score'] = work['Specificity_Score'].fillna('Unknown').astype(str)
-    # Clean up any weird values like ','
-    work['Specificity_Score'] = work['Specificity_Score'].replace(',', 'Unknown')
-
-# Keep Urgency_Level as text - don't convert to numeric!
-if 'Urgency_Level' in work.columns:
-    work['Urgency_Level'] = work['Urgency_Level'].fillna('Unknown').astype(str)
-    # Clean up any weird values
-    work['Urgency_Level'] = work['Urgency_Level'].replace(',', 'Unknown')
-for c in ['Campaign_Objective', 'Advertiser', 'Campaign_Type', 'Campaign', 'Keyword', 'Query_Type', 'Emotional_Intent', 'Phrase_Components', 'Keyword_Category', 'Impressions', 'Clicks', 'CTR', 'CVR', 'CPA', 'ROAS', 'Max_System_Cost', 'Weighted_Conversion', 'Is_Question', 'Is_Number_Present', 'Position_of_Number', 'Word_Count', 'Character_Count']:
-    if c not in work.columns:
-        work[c] = np.nan if c not in ['Impressions', 'Clicks'] else 0
+# Typed in place by their schemas; values that are not numbers are logged and counted here
+COERCION_FAILURES = {'keyword': prepare(work, KEYWORD_SCHEMA, 'keyword'),
+                     'domain': prepare(work_domain, DOMAIN_SCHEMA, 'domain')}
+# -----------------------------
+# FILTER CACHE
 # -----------------------------
-# PREPROCESS DOMAIN DATA
+# Callbacks share read-only row positions per filter tuple instead of copying and re-filtering the frames.
+# The frames are never modified after preprocessing and every cached value is immutable (read-only
+# arrays, tuples), so they can be shared by all request threads without locking (gthread workers).
+DATASETS = {'keyword': work, 'domain': work_domain}
+def dataset_version(frame):
+    """Content hash of a frame, so cached exports are never served for different data"""
+    try:
+        h = pd.util.hash_pandas_object(frame, index=False)
+    except TypeError:  # unhashable cells (lists)
+        h = pd.util.hash_pandas_object(frame.astype(str), index=False)
+    return hashlib.sha1(h.to_numpy().tobytes()).hexdigest()[:12]
+DATASET_VERSIONS = {name: dataset_version(frame) for name, frame in DATASETS.items()}
 # -----------------------------
-work_domain = df_domain.copy()
-COL_DOM_CAMPAIGN_OBJ = find_col(df_domain, ['[Learning] Campaign Objective', 'Campaign Objective'])
-COL_DOM_ADVERTISER = find_col(df_domain, ['Advertiser'])
-COL_DOM_CAMPAIGN_TYPE = find_col(df_domain, ['Campaign Type'])
-COL_DOM_CAMPAIGN = find_col(df_domain, ['Campaign'])
-COL_DOM_DOMAIN = find_col(df_domain, ['Domain'])
-COL_DOM_CATEGORY = find_col(df_domain, ['Sprig Domain Category'])
-COL_DOM_IMPRESSIONS = find_col(df_domain, ['Ad Impressions'])
-COL_DOM_CLICKS = find_col(df_domain, ['Clicks'])
-COL_DOM_CTR = find_col(df_domain, ['CTR'])
-COL_DOM_CVR = find_col(df_domain, ['CVR'])
-COL_DOM_CPA = find_col(df_domain, ['CPA'])
-COL_DOM_ROAS = find_col(df_domain, ['roas', 'ROAS'])
-COL_DOM_MAX_COST = find_col(df_domain, ['Max System Cost'])
-COL_DOM_WEIGHTED_CONV = find_col(df_domain, ['Weighted Conversion'])
-dom_rename_map = {}
-if COL_DOM_CAMPAIGN_OBJ: dom_rename_map[COL_DOM_CAMPAIGN_OBJ] = 'Campaign_Objective'
-if COL_DOM_ADVERTISER: dom_rename_map[COL_DOM_ADVERTISER] = 'Advertiser'
-if COL_DOM_CAMPAIGN_TYPE: dom_rename_map[COL_DOM_CAMPAIGN_TYPE] = 'Campaign_Type'
-if COL_DOM_CAMPAIGN: dom_rename_map[COL_DOM_CAMPAIGN] = 'Campaign'
-if COL_DOM_DOMAIN: dom_rename_map[COL_DOM_DOMAIN] = 'Domain'
-if COL_DOM_CATEGORY: dom_rename_map[COL_DOM_CATEGORY] = 'Domain_Category'
-if COL_DOM_IMPRESSIONS: dom_rename_map[COL_DOM_IMPRESSIONS] = 'Impressions'
-if COL_DOM_CLICKS: dom_rename_map[COL_DOM_CLICKS] = 'Clicks'
-if COL_DOM_CTR: dom_rename_map[COL_DOM_CTR] = 'CTR'
-if COL_DOM_CVR: dom_rename_map[COL_DOM_CVR] = 'CVR'
-if COL_DOM_CPA: dom_rename_map[COL_DOM_CPA] = 'CPA'
-if COL_DOM_ROAS: dom_rename_map[COL_DOM_ROAS] = 'ROAS'
-if COL_DOM_MAX_COST: dom_rename_map[COL_DOM_MAX_COST] = 'Max_System_Cost'
-if COL_DOM_WEIGHTED_CONV: dom_rename_map[COL_DOM_WEIGHTED_CONV] = 'Weighted_Conversion'
-work_domain = work_domain.rename(columns=dom_rename_map)
-for col in ['Impressions', 'Clicks', 'CTR', 'CVR', 'CPA', 'ROAS', 'Max_System_Cost', 'Weighted_Conversion']:
-    if col in work_domain.columns:
-        work_domain[col] = pd.to_numeric(work_domain[col], errors='coerce').fillna(0)
-for c in ['Campaign_Objective', 'Advertiser', 'Campaign_Type', 'Campaign', 'Domain', 'Domain_Category', 'Impressions', 'Clicks', 'CTR', 'CVR', 'CPA', 'ROAS', 'Max_System_Cost', 'Weighted_Conversion']:
-    if c not in work_domain.columns:
-        work_domain[c] = np.nan if c not in ['Impressions', 'Clicks'] else 0
+# MEMORY
+# -----------------------------
+# memory (see CONFIG) accounts for the preprocessed frames and every cache. Over budget it evicts
+# the oldest entries of filtered_positions, dropdown_options, column_order, table_positions and
+# the view cache, in that order - the cheapest to recompute first.
+for name, frame in DATASETS.items():
+    memory.hold(f"{name} frame", lambda frame=frame: nbytes(frame))
+def frame_row_bytes(frame):
+    """Average in-memory bytes per row; measured once for the datasets"""
+    held = next((memory.held.get(f"{name} frame") for name, f in DATASETS.items() if f is frame), None)
+    return (held if held is not None else nbytes(frame)) / max(len(frame), 1)
+def export_memory(frame, positions):
+    """Working set of a streamed export: one chunk of rows, its serialized text (about twice the
+    rows again) and the row positions"""
+    rows = len(frame) if positions is None else len(positions)
+    need = min(rows, EXPORT_CHUNK_ROWS) * frame_row_bytes(frame) * 3
+    return int(need + (0 if positions is None else positions.nbytes))
+def export_guard(filename, frame, positions):
+    """Admit an export job against the budget (MemoryBudgetExceeded fails the job) and measure it"""
+    memory.admit(f"Export {filename}", export_memory(frame, positions))
+    return memory.stage(f"export {filename.rsplit('.', 1)[0]}")
+memory.enforce()
+set_phase('building')
+FILTER_COLS = ['Campaign_Objective', 'Advertiser', 'Campaign_Type', 'Campaign']
+ROWS_SCANNED = REGISTRY.counter('dashboard_rows_scanned_total', 'Filtered rows aggregated by views and table pages',
+                                ['dataset', 'callback'])
+FILTER_CACHE_SIZE = 32
+@memory.sized_cache(FILTER_CACHE_SIZE)
+def filtered_positions(dataset, obj=None, adv=None, ctype=None, camp=None):
+    """Row positions of the dataset matching the global dropdown filters"""
+    frame = DATASETS[dataset]
+    mask = np.ones(len(frame), dtype=bool)
+    for col, val in zip(FILTER_COLS, (obj, adv, ctype, camp)):
+        if val:
+            mask &= (frame[col] == val).to_numpy()
+    pos = np.flatnonzero(mask).astype(np.int32)
+    pos.setflags(write=False)
+    return pos
+def filter_frame(dataset, obj=None, adv=None, ctype=None, camp=None):
+    return DATASETS[dataset].iloc[filtered_positions(dataset, obj, adv, ctype, camp)]
+@memory.sized_cache(FILTER_CACHE_SIZE)
+def dropdown_options(column, obj=None, adv=None, ctype=None):
+    """Sorted distinct keyword-data values of column under the dropdowns above it (a shared tuple)"""
+    values = work[column].iloc[filtered_positions('keyword', obj, adv, ctype)]
+    return tuple(sorted(values.dropna().astype(str).unique()))
+@memory.sized_cache(FILTER_CACHE_SIZE)
+def column_order(dataset, column, ascending=True):
+    """Cached argsort of one column over the whole dataset, NaNs last"""
+    col = DATASETS[dataset][column].reset_index(drop=True)
+    try:
+        ordered = col.sort_values(ascending=ascending, kind='stable', na_position='last')
+    except TypeError:  # mixed types in an object column
+        ordered = col.where(col.isna(), col.astype(str)).sort_values(ascending=ascending, kind='stable', na_position='last')
+    order = ordered.index.to_numpy().astype(np.int32)
+    order.setflags(write=False)
+    return order
+def sorted_positions(dataset, positions, column, ascending=True):
+    """Positions reordered by column, using the cached argsort instead of sorting the subset"""
+    order = column_order(dataset, column, ascending)
+    member = np.zeros(len(DATASETS[dataset]), dtype=bool)
+    member[positions] = True
+    return order[member[order]]
 # -----------------------------
 # AGGREGATION FUNCTIONS
 # -----------------------------
@@ -326,13 +313,844 @@ def weighted_roas(group):
     if group['Max_System_Cost'].sum() == 0:
         return 0
     return (group['ROAS'] * group['Max_System_Cost']).sum() / group['Max_System_Cost'].sum()
+# metric -> column it is weighted by
+METRIC_WEIGHTS = {'CTR': 'Impressions', 'CVR': 'Clicks', 'CPA': 'Weighted_Conversion', 'ROAS': 'Max_System_Cost'}
+def weighted_metrics(frame, by, impressions=False, sort=True):
+    """Per-group Clicks (and Impressions) plus weighted CTR/CVR/CPA/ROAS.
+
+    Same numbers as groupby(by).apply() over the weighted_* functions, but done as one grouped
+    sum, which pandas runs in compiled code without holding the GIL or calling back per group.
+    """
+    parts = {c: frame[c] for c in ['Clicks', 'Impressions', 'Weighted_Conversion', 'Max_System_Cost']}
+    for metric, weight in METRIC_WEIGHTS.items():
+        parts[f'{metric}_x'] = frame[metric] * frame[weight]
+    sums = pd.DataFrame(parts).groupby(frame[by], sort=sort).sum()
+    out = sums[['Clicks', 'Impressions']] if impressions else sums[['Clicks']]
+    out = out.astype(float)
+    for metric, weight in METRIC_WEIGHTS.items():
+        w = sums[weight]
+        out[metric] = (sums[f'{metric}_x'] / w.where(w != 0)).fillna(0)
+    return out.reset_index()
+def metric_totals(frame):
+    """Total clicks/impressions and weighted CTR/CVR/CPA/ROAS of a frame"""
+    return {'clicks': int(frame['Clicks'].sum()), 'impressions': int(frame['Impressions'].sum()),
+            'ctr': weighted_ctr(frame), 'cvr': weighted_cvr(frame),
+            'cpa': weighted_cpa(frame), 'roas': weighted_roas(frame)}
+def top_keywords(frame, by, bullet='• ', n=3, label='Keyword'):
+    """Hover text per group of by: its n rows with the most clicks ('<br>'-joined label (clicks))"""
+    top = frame[[by, label, 'Clicks']].dropna(subset=[by])
+    top = top.sort_values('Clicks', ascending=False, kind='stable').groupby(by, sort=False).head(n)
+    text = bullet + top[label].astype(str) + ' (' + top['Clicks'].astype(int).astype(str) + ' clicks)'
+    return text.groupby(top[by], sort=False).agg('<br>'.join)
+# Computation nodes both tabs build on (see computation.py). A view creates a Computation with
+# the 'dataset' and 'filters' inputs; every aggregate is then computed once per request, however
+# many charts use it. Node values are shared - copy (sort_values, assign, ...) before changing them.
+def rows_node(c):
+    rows = filter_frame(c.get('dataset'), *c.get('filters'))
+    ROWS_SCANNED.inc(len(rows), dataset=c.get('dataset'), callback=current_callback())
+    return rows
+def totals_node(c):
+    return metric_totals(c.get('rows'))
+def metrics_node(c, by, sort=True):
+    """weighted_metrics (with Impressions) per value of by, in key order or first-appearance order"""
+    return weighted_metrics(c.get('rows'), by, impressions=True, sort=sort)
+def top_node(c, by, bullet='• ', label='Keyword'):
+    return top_keywords(c.get('rows'), by, bullet, label=label)
+BASE_NODES = {'rows': rows_node, 'totals': totals_node, 'metrics': metrics_node, 'top': top_node}
+# tab -> Computation of its latest update, for /stats/computation/<tab>
+last_computations = {}
+def finish_figures(*figs):
+    """Binary-encode figure outputs when the client plotly.js can decode them"""
+    if not BINARY_FIGURES:
+        return figs
+    return tuple(encode_figure(f) for f in figs)
+def triggered_by_tab():
+    """True when the callback runs because the tab (and so its graphs) was just rendered"""
+    try:
+        return ctx.triggered_id in (None, 'analysis-tabs')
+    except dash.exceptions.MissingCallbackContextException:  # called directly, e.g. from a benchmark
+        return True
+def patch_figures(figure_ids, figs, signatures, full):
+    """Send a dash.Patch with only the changed arrays when the client already shows a figure
+    of the same structure; full figures otherwise. Returns (outputs, new signatures)."""
+    signatures = signatures or {}
+    outputs, new_signatures = [], {}
+    for fid, fig in zip(figure_ids, figs):
+        if hasattr(fig, 'to_dict'):
+            fig = fig.to_dict()
+        sig, updates = figure_structure(fig)
+        new_signatures[fid] = sig
+        if full or signatures.get(fid) != sig:
+            outputs.append(fig)
+            continue
+        patch = Patch()
+        for path, value in updates:
+            node = patch
+            for key in path[:-1]:
+                node = node[key]
+            node[path[-1]] = value
+        outputs.append(patch)
+    return outputs, new_signatures
+# A dropdown change cascades into several dashboard updates for the same filters, and often
+# for filters that are already stale. view_flight shares one computation between identical
+# in-flight (tab, filters) updates and keeps the last VIEW_CACHE_SIZE finished views;
+# latest_requests lets an update stop once a newer one from the same browser session has started.
+view_flight = memory.cache('views', SingleFlight(cache_size=VIEW_CACHE_SIZE, sizer=nbytes, on_store=memory.enforce))
+latest_requests = LatestOnly()
+view_access = Counter()
+access_lock = threading.Lock()
+def load_access_log():
+    try:
+        with open(ACCESS_LOG) as f:
+            view_access.update({(tab, tuple(filters)): n for tab, filters, n in json.load(f)})
+    except (OSError, ValueError, TypeError):
+        pass
+def record_access(tab, filters):
+    """Count a view request; the 200 most requested views are written to ACCESS_LOG every 50 requests"""
+    with access_lock:
+        view_access[(tab, filters)] += 1
+        if sum(view_access.values()) % 50 == 0:
+            try:
+                with open(f"{ACCESS_LOG}.{os.getpid()}.tmp", 'w') as f:
+                    json.dump([[tab, list(filters), n] for (tab, filters), n in view_access.most_common(200)], f)
+                os.replace(f"{ACCESS_LOG}.{os.getpid()}.tmp", ACCESS_LOG)
+            except OSError as e:
+                log.warning("⚠️ Could not write access log: %s", e)
+load_access_log()
+def check_wanted(still_wanted):
+    if still_wanted is not None and not still_wanted():
+        raise Superseded()
+def measured_build(tab, build, filters, still_wanted):
+    with memory.stage(f"view {tab}"):
+        return build(filters, still_wanted)
+def coalesced_view(tab, filters, session, build):
+    """build(filters, still_wanted) shared by concurrent identical updates; PreventUpdate if superseded"""
+    record_access(tab, filters)
+    if profiling_active():  # profile the real computation, not a cache hit
+        return build(filters, None)
+    wanted = latest_requests.start((session, tab)) if session else None
+    try:
+        return view_flight.do((tab, filters), lambda still_wanted: measured_build(tab, build, filters, still_wanted), wanted)
+    except Superseded:
+        latest_requests.drop()
+        log.debug("⏭️ Dropped superseded %s update for %s", tab, filters)
+        raise PreventUpdate
+def coalescing_stats():
+    return dict(view_flight.stats, dropped=latest_requests.dropped)
+# -----------------------------
+# PREVIEW TABLES
+# -----------------------------
+PREVIEW_PAGE_SIZE = 30
+KEYWORD_PREVIEW_COLS = ['Keyword', 'Clicks', 'CTR', 'CVR', 'CPA', 'ROAS', 'Campaign_Type', 'Query_Type']
+DOMAIN_PREVIEW_COLS = ['Domain', 'Domain_Category', 'Clicks', 'CTR', 'CVR', 'CPA', 'ROAS']
+KEYWORD_FIGURE_IDS = ['treemap_ctr_cvr', 'treemap_cpa_roas', 'category_overview', 'keyword_category_analysis',
+                      'emotion_bubble_ctr_cvr', 'emotion_bubble_roas_cpa', 'char_analysis', 'specificity_analysis',
+                      'urgency_analysis', 'word_count_analysis', 'number_analysis', 'number_position_analysis',
+                      'question_analysis']
+DOMAIN_FIGURE_IDS = ['domain_treemap_ctr_cvr', 'domain_treemap_cpa_roas', 'domain_category_overview',
+                     'domain_category_ctr_cvr', 'domain_category_roas_cpa']
+TABLE_FILTER_OPERATORS = [['ge ', '>='], ['le ', '<='], ['lt ', '<'], ['gt ', '>'], ['ne ', '!='], ['eq ', '='],
+                          ['contains '], ['datestartswith ']]
+def split_filter_part(filter_part):
+    """Parse one '{col} op value' clause of a DataTable filter_query into (col, op, value)"""
+    for operator_type in TABLE_FILTER_OPERATORS:
+        for operator in operator_type:
+            if operator in filter_part:
+                name_part, value_part = filter_part.split(operator, 1)
+                name = name_part[name_part.find('{') + 1: name_part.rfind('}')]
+                value_part = value_part.strip()
+                v0 = value_part[0] if value_part else ''
+                if v0 and v0 == value_part[-1] and v0 in ("'", '"', '`'):
+                    value = value_part[1: -1].replace('\\' + v0, v0)
+                else:
+                    try:
+                        value = float(value_part)
+                    except ValueError:
+                        value = value_part
+                return name, operator_type[0].strip(), value
+    return None, None, None
+def apply_filter_query(frame, positions, filter_query):
+    """Narrow positions with a DataTable filter_query ('{Clicks} > 10 && {Keyword} contains car')"""
+    if not filter_query:
+        return positions
+    sub = frame.iloc[positions]
+    mask = np.ones(len(sub), dtype=bool)
+    for part in filter_query.split(' && '):
+        col, op, value = split_filter_part(part)
+        if col not in sub.columns:
+            continue
+        series = sub[col]
+        if op in ('eq', 'ne', 'lt', 'le', 'gt', 'ge'):
+            if isinstance(value, str) and pd.api.types.is_numeric_dtype(series):
+                continue
+            cmp = {'eq': series.eq, 'ne': series.ne, 'lt': series.lt, 'le': series.le,
+                   'gt': series.gt, 'ge': series.ge}[op](value)
+        elif op == 'contains':
+            cmp = series.astype(str).str.contains(str(value), case=False, regex=False)
+        elif op == 'datestartswith':
+            cmp = series.astype(str).str.startswith(str(value))
+        else:
+            continue
+        mask &= cmp.fillna(False).to_numpy(dtype=bool)
+    return positions[mask]
+@memory.sized_cache(FILTER_CACHE_SIZE)
+def table_positions(dataset, filters, filter_query, sort_col, ascending):
+    pos = apply_filter_query(DATASETS[dataset], filtered_positions(dataset, *filters), filter_query)
+    if sort_col:
+        pos = sorted_positions(dataset, pos, sort_col, ascending)
+    return pos
+def table_page(dataset, columns, filters, page_current, page_size, sort_by, filter_query):
+    """One page of rows for a custom-paged DataTable, plus the page count over the whole filtered set"""
+    sort = (sort_by or [{'column_id': 'Clicks', 'direction': 'desc'}])[0]
+    pos = table_positions(dataset, tuple(filters), filter_query or '', sort['column_id'], sort['direction'] == 'asc')
+    page_current, page_size = page_current or 0, page_size or PREVIEW_PAGE_SIZE
+    page = pos[page_current * page_size: (page_current + 1) * page_size]
+    data = DATASETS[dataset].iloc[page][columns].to_dict('records')
+    ROWS_SCANNED.inc(len(pos), dataset=dataset, callback=current_callback())
+    return data, max(1, -(-len(pos) // page_size))
+def preview_table(table_id, dataset, columns):
+    """Empty server-paged DataTable; its page/sort/filter callback fills the data"""
+    frame = DATASETS[dataset]
+    return dash_table.DataTable(
+    id=table_id,
+    data=[],
+    columns=[{"name": c, "id": c, "type": 'numeric' if pd.api.types.is_numeric_dtype(frame[c]) else 'text'}
+             for c in columns],
+    page_action='custom',
+    page_size=PREVIEW_PAGE_SIZE,
+    page_current=0,
+    sort_action='custom',
+    sort_mode='single',
+    sort_by=[{'column_id': 'Clicks', 'direction': 'desc'}],
+    filter_action='custom',
+    filter_query='',
+    style_table={'overflowX': 'auto'},
+    style_cell={
+        'textAlign': 'left',
+        'backgroundColor': '#121419',
+        'color': '#E5E7EB',
+        'border': '1px solid #2d3748',
+        'padding': '8px'
+    },
+    style_header={
+        'backgroundColor': '#1a1a1a',
+        'fontWeight': 'bold',
+        'color': '#00D9FF',
+        'border': '1px solid #2d3748'
+    },
+    style_filter={
+        'backgroundColor': '#1a1f2e',
+        'color': '#E5E7EB'
+    },
+    style_data_conditional=[
+        {
+            'if': {'row_index': 'odd'},
+            'backgroundColor': '#1a1f2e'
+        }
+    ]
+)
+def stat_cards(totals):
+    """Stats row - 6 metrics"""
+    return dbc.Row([
+        dbc.Col(dbc.Card(dbc.CardBody([
+            html.Div("Total Impressions", className='small-muted'),
+            html.Div(f"{totals['impressions']:,}", className='big-number')
+        ])), md=2),
+        dbc.Col(dbc.Card(dbc.CardBody([
+            html.Div("Total Clicks", className='small-muted'),
+            html.Div(f"{totals['clicks']:,}", className='big-number', style={'color':COLORS['secondary']})
+        ])), md=2),
+        dbc.Col(dbc.Card(dbc.CardBody([
+            html.Div("Avg CTR (%)", className='small-muted'),
+            html.Div(f"{totals['ctr']:.2f}", className='big-number', style={'color':COLORS['info']})
+        ])), md=2),
+        dbc.Col(dbc.Card(dbc.CardBody([
+            html.Div("Avg CVR (%)", className='small-muted'),
+            html.Div(f"{totals['cvr']:.2f}", className='big-number', style={'color':COLORS['success']})
+        ])), md=2),
+        dbc.Col(dbc.Card(dbc.CardBody([
+            html.Div("Avg CPA", className='small-muted'),
+            html.Div(f"${totals['cpa']:.2f}", className='big-number', style={'color':COLORS['warning']})
+        ])), md=2),
+        dbc.Col(dbc.Card(dbc.CardBody([
+            html.Div("Avg ROAS", className='small-muted'),
+            html.Div(f"{totals['roas']:.2f}x", className='big-number', style={'color':COLORS['primary']})
+        ])), md=2),
+    ], className='mb-3')
+# -----------------------------
+# KEYWORD CHARTS
+# -----------------------------
+# update_dashboard builds its figures as independent tasks on a bounded thread pool. Every
+# builder is a node of the request's Computation and takes its filtered rows, aggregates and
+# top-keyword tables from there, so nothing is computed twice however the charts share them.
+LEVEL_ORDER = {'Low': 0, 'Medium': 1, 'High': 2, 'Unknown': 3}
+def metric_groups(c, by, bullet='• '):
+    """Weighted metrics per value of by (first-appearance order) plus a top_keywords column"""
+    return c.get('metrics', by, False).assign(top_keywords=lambda g: g[by].map(c.get('top', by, bullet)))
+def word_table(d):
+    """Top 30 phrase components (or keyword tokens when a row has none) by clicks"""
+    words, rows = [], []
+    for i, (phrase, kw) in enumerate(zip(d['Phrase_Components'], d['Keyword'])):
+        pcs = split_multi(phrase)
+        if not pcs:
+            tokens = re.findall(r"[A-Za-z0-9']+", str(kw).lower())
+            pcs = [t for t in tokens if len(t)>1][:5]
+        for w in set(pcs):
+            words.append(w)
+            rows.append(i)
+    if not words:
+        return pd.DataFrame(columns=['word','Clicks','CTR','CVR','CPA','ROAS'])
+    word_df = d.iloc[rows][['Clicks', 'Impressions', 'CTR', 'CVR', 'CPA', 'ROAS', 'Max_System_Cost',
+                            'Weighted_Conversion']].reset_index(drop=True)
+    word_df['word'] = words
+    return weighted_metrics(word_df, 'word', impressions=True).sort_values('Clicks', ascending=False).head(30)
+def emotion_table(d):
+    """Clicks, impressions and mean metrics per emotional intent, with top keywords"""
+    emotions, rows = [], []
+    for i, emo in enumerate(d['Emotional_Intent']):
+        emo_str = str(emo)
+        if pd.isna(emo) or emo_str.lower() in ['', 'nan', 'none']:
+            emos = ['neutral']
+        else:
+            emos = [e.strip().lower() for e in re.split(r'[;,]\s*', emo_str) if e.strip()] or ['neutral']
+        emotions += emos
+        rows += [i] * len(emos)
+    emo_df = d.iloc[rows][['Keyword', 'Clicks', 'Impressions', 'CTR', 'CVR', 'CPA', 'ROAS']].reset_index(drop=True)
+    emo_df['emotion'] = emotions
+    emo_agg = emo_df.groupby('emotion').agg({
+        'Clicks': 'sum',
+        'Impressions': 'sum',
+        'CTR': 'mean',
+        'CVR': 'mean',
+        'CPA': 'mean',
+        'ROAS': 'mean'
+        }).reset_index()
+    emo_agg['top_keywords'] = emo_agg['emotion'].map(top_keywords(emo_df, 'emotion')).fillna('N/A')
+    return emo_agg
+def word_treemaps(c):
+    word_agg = c.get('words')
+    if word_agg.empty:
+        return go.Figure(), go.Figure()
+    text_labels = word_agg.apply(
+        lambda r: f"<b>{r['word']}</b><br>CTR: {r['CTR']:.1f}% | CVR: {r['CVR']:.1f}%", axis=1
+    )
+    treemap_ctr_cvr = treemap_figure(word_agg['word'], word_agg['Clicks'], text_labels,
+                                     cvr_colors(word_agg['CVR'], 'CVR'))
+    text_labels = word_agg.apply(
+        lambda r: f"<b>{r['word']}</b><br>CPA: ${r['CPA']:.1f} | ROAS: {r['ROAS']:.1f}x", axis=1
+    )
+    treemap_cpa_roas = treemap_figure(word_agg['word'], word_agg['Clicks'], text_labels,
+                                      cvr_colors(word_agg['CPA'], 'CPA'))
+    return treemap_ctr_cvr, treemap_cpa_roas
+def query_type_overview(c):
+    """All 5 metrics per query type, normalized to 0-100"""
+    d = c.get('rows')
+    if not (d['Query_Type'].notna().any()):
+        return (go.Figure(),)
+    cat_grp = c.get('metrics', 'Query_Type').sort_values('Clicks', ascending=False).head(10)
+    if cat_grp.empty:
+        return (go.Figure(),)
+    for col in ['Clicks', 'CTR', 'CVR', 'CPA', 'ROAS']:
+        min_val = cat_grp[col].min()
+        max_val = cat_grp[col].max()
+        cat_grp[f'{col}_norm'] = (cat_grp[col] - min_val) / (max_val - min_val + 1e-9) * 100
+    cat_grp['top_keywords'] = cat_grp['Query_Type'].map(c.get('top', 'Query_Type'))
+    fig_cat = go.Figure()
+    fig_cat.add_trace(go.Bar(
+        x=cat_grp['Query_Type'], 
+        y=cat_grp['Clicks_norm'],
+        name='Clicks', 
+        marker_color=COLORS['secondary'],
+        customdata=list(zip(cat_grp['Clicks'], cat_grp['top_keywords'])),
+        hovertemplate='<b>%{x}</b><br>Normalized: %{y:.1f}<br><b>Actual Clicks: %{customdata[0]:,}</b><br><br>Top Keywords:<br>%{customdata[1]}<extra></extra>'))
+    fig_cat.add_trace(go.Bar(
+        x=cat_grp['Query_Type'], 
+        y=cat_grp['CTR_norm'], 
+        name='CTR', 
+        marker_color=COLORS['info'],
+        customdata=list(zip(cat_grp['CTR'], cat_grp['top_keywords'])),
+        hovertemplate='<b>%{x}</b><br>Normalized: %{y:.1f}<br><b>Actual CTR: %{customdata[0]:.2f}%</b><br><br>Top Keywords:<br>%{customdata[1]}<extra></extra>'
+        ))
+    fig_cat.add_trace(go.Bar(
+        x=cat_grp['Query_Type'], 
+        y=cat_grp['CVR_norm'], 
+        name='CVR', 
+        marker_color=COLORS['success'],
+        customdata=list(zip(cat_grp['CVR'], cat_grp['top_keywords'])),
+        hovertemplate='<b>%{x}</b><br>Normalized: %{y:.1f}<br><b>Actual CVR: %{customdata[0]:.2f}%</b><br><br>Top Keywords:<br>%{customdata[1]}<extra></extra>'))
+    fig_cat.add_trace(go.Bar(
+        x=cat_grp['Query_Type'], 
+        y=cat_grp['CPA_norm'], 
+        name='CPA', 
+        marker_color=COLORS['warning'],
+        customdata=list(zip(cat_grp['CPA'], cat_grp['top_keywords'])),
+        hovertemplate='<b>%{x}</b><br>Normalized: %{y:.1f}<br><b>Actual CPA: $%{customdata[0]:.2f}</b><br><br>Top Keywords:<br>%{customdata[1]}<extra></extra>'
+        ))
+    fig_cat.add_trace(go.Bar(
+        x=cat_grp['Query_Type'], 
+        y=cat_grp['ROAS_norm'], 
+        name='ROAS', 
+        marker_color=COLORS['primary'],
+        customdata=list(zip(cat_grp['ROAS'], cat_grp['top_keywords'])),
+        hovertemplate='<b>%{x}</b><br>Normalized: %{y:.1f}<br><b>Actual ROAS: %{customdata[0]:.2f}x</b><br><br>Top Keywords:<br>%{customdata[1]}<extra></extra>'
+        ))
+    fig_cat.update_layout(
+        barmode='group', height=500,
+        xaxis_tickangle=-20,
+        paper_bgcolor='rgba(0,0,0,0)', plot_bgcolor='rgba(0,0,0,0)',
+        yaxis_title="Normalized Score (0-100)",font=dict(color='white'), xaxis=dict(color='white'),yaxis=dict(color='white')
+    )
+    return (fig_cat,)
+def keyword_category_overview(c):
+    """All 5 metrics per keyword category, normalized to 0-100"""
+    if not c.get('rows')['Keyword_Category'].notna().any():
+        return (go.Figure(),)
+    kw_cat_grp = c.get('metrics', 'Keyword_Category').sort_values('Clicks', ascending=False).head(10)
+    if kw_cat_grp.empty:
+        return (go.Figure(),)
+    for col in ['Clicks', 'CTR', 'CVR', 'CPA', 'ROAS']:
+        min_val = kw_cat_grp[col].min()
+        max_val = kw_cat_grp[col].max()
+        kw_cat_grp[f'{col}_norm'] = (kw_cat_grp[col] - min_val) / (max_val - min_val + 1e-9) * 100
+    kw_cat_grp['top_keywords'] = kw_cat_grp['Keyword_Category'].map(c.get('top', 'Keyword_Category'))
+    keyword_category_fig = go.Figure()
+    keyword_category_fig.add_trace(go.Bar(
+        x=kw_cat_grp['Keyword_Category'], y=kw_cat_grp['Clicks_norm'],
+        name='Clicks', marker_color=COLORS['secondary'],
+        customdata=list(zip(kw_cat_grp['Clicks'], kw_cat_grp['top_keywords'])),
+        hovertemplate='<b>%{x}</b><br>Normalized: %{y:.1f}<br><b>Clicks: %{customdata[0]:,}</b><br><br>Top Keywords:<br>%{customdata[1]}<extra></extra>'))
+    keyword_category_fig.add_trace(go.Bar(
+        x=kw_cat_grp['Keyword_Category'], y=kw_cat_grp['CTR_norm'],
+        name='CTR', marker_color=COLORS['info'],
+        customdata=list(zip(kw_cat_grp['CTR'], kw_cat_grp['top_keywords'])),
+        hovertemplate='<b>%{x}</b><br>Normalized: %{y:.1f}<br><b>CTR: %{customdata[0]:.2f}%</b><br><br>Top Keywords:<br>%{customdata[1]}<extra></extra>'))
+    keyword_category_fig.add_trace(go.Bar(
+        x=kw_cat_grp['Keyword_Category'], y=kw_cat_grp['CVR_norm'],
+        name='CVR', marker_color=COLORS['success'],
+        customdata=list(zip(kw_cat_grp['CVR'], kw_cat_grp['top_keywords'])),
+        hovertemplate='<b>%{x}</b><br>Normalized: %{y:.1f}<br><b>CVR: %{customdata[0]:.2f}%</b><br><br>Top Keywords:<br>%{customdata[1]}<extra></extra>'))
+    keyword_category_fig.add_trace(go.Bar(
+        x=kw_cat_grp['Keyword_Category'], y=kw_cat_grp['CPA_norm'],
+        name='CPA', marker_color=COLORS['warning'],
+        customdata=list(zip(kw_cat_grp['CPA'], kw_cat_grp['top_keywords'])),
+        hovertemplate='<b>%{x}</b><br>Normalized: %{y:.1f}<br><b>CPA: $%{customdata[0]:.2f}</b><br><br>Top Keywords:<br>%{customdata[1]}<extra></extra>'))
+    keyword_category_fig.add_trace(go.Bar(
+        x=kw_cat_grp['Keyword_Category'], y=kw_cat_grp['ROAS_norm'],
+        name='ROAS', marker_color=COLORS['primary'],
+        customdata=list(zip(kw_cat_grp['ROAS'], kw_cat_grp['top_keywords'])),
+        hovertemplate='<b>%{x}</b><br>Normalized: %{y:.1f}<br><b>ROAS: %{customdata[0]:.2f}x</b><br><br>Top Keywords:<br>%{customdata[1]}<extra></extra>'))
+    keyword_category_fig.update_layout(
+        barmode='group', height=500,
+        xaxis_tickangle=-45,
+        paper_bgcolor='rgba(0,0,0,0)', plot_bgcolor='rgba(0,0,0,0)',
+        yaxis_title="Normalized Score (0-100)",
+        font=dict(color='white'), xaxis=dict(color='white'), yaxis=dict(color='white')
+    )
+    return (keyword_category_fig,)
+def emotion_bubbles(c):
+    """CTR/CVR and ROAS/CPA bubbles per emotional intent"""
+    emo_agg = c.get('emotions')
+    emo_roas_cpa = figure_spec(height=500, xaxis=dict(title={'text': "ROAS"}), yaxis=dict(title={'text': "CPA ($)"}))
+    if emo_agg.empty:
+        return go.Figure(), emo_roas_cpa
+    max_clicks_emo = emo_agg['Clicks'].max()
+    if max_clicks_emo == 0:
+        max_clicks_emo = 1  # Prevent division by zero
+    palette = [COLORS['primary'], COLORS['secondary'], COLORS['success'], 
+           COLORS['info'], COLORS['warning'], COLORS['danger']]
+    emo_colors = [palette[i % len(palette)] for i in range(len(emo_agg))]
+    emo_sizes = 40 + (emo_agg['Clicks'] / max_clicks_emo) * 100
+    emo_customdata = list(zip(emo_agg['Clicks'], emo_agg['top_keywords']))
+
+    emo_ctr_cvr = figure_spec([scatter_trace(
+        len(emo_agg),
+        x=emo_agg['CTR'], y=emo_agg['CVR'],
+        mode='markers+text',
+        text=emo_agg['emotion'],
+        textposition='middle center',
+        textfont=dict(size=12, color='white', family='Arial'),  # optional: family
+        marker=dict(size=emo_sizes, color=emo_colors, opacity=0.8,
+                   line=dict(width=3, color='white')),
+        customdata=emo_customdata,
+        hovertemplate="<b>%{text}</b><br>" +
+                     "CTR: %{x:.2f}%<br>" +
+                     "CVR: %{y:.2f}%<br>" +
+                     "<b>Clicks: %{customdata[0]:,.0f}</b><br>" +
+                     "<b>Top Keywords:</b><br>%{customdata[1]}<extra></extra>",
+        showlegend=False
+    )], height=500, xaxis=dict(title={'text': "CTR (%)"}), yaxis=dict(title={'text': "CVR (%)"}))
+    emo_roas_cpa['data'].append(scatter_trace(
+        len(emo_agg),
+        x=emo_agg['ROAS'], y=emo_agg['CPA'],
+        mode='markers+text',
+        text=emo_agg['emotion'],
+        textposition='middle center',
+        textfont=dict(size=12, color='white', family='Arial'),  # optional: family
+        marker=dict(size=emo_sizes, color=emo_colors, opacity=0.8,
+                   line=dict(width=3, color='white')),
+        customdata=emo_customdata,
+        hovertemplate="<b>%{text}</b><br>" +
+                     "ROAS: %{x:.2f}x<br>" +
+                     "CPA: $%{y:.2f}<br>" +
+                     "<b>Clicks: %{customdata[0]:,.0f}</b><br>" +
+                     "<b>Top Keywords:</b><br>%{customdata[1]}<extra></extra>",
+        showlegend=False
+    ))
+    return emo_ctr_cvr, emo_roas_cpa
+def character_grid(c):
+    """One bubble per character count, with its top 3 keywords"""
+    char_grp = metric_groups(c, 'Character_Count', bullet='  • ')
+    char_fig = grid_2x2(("CTR by Character Length", "CVR by Character Length",
+                         "ROAS by Character Length", "CPA by Character Length"),
+                        vertical_spacing=0.12, horizontal_spacing=0.1,
+                        x_title="Character Count", y_titles=METRIC_Y_TITLES, height=700, showlegend=False)
+    if not char_grp.empty:
+        max_char_clicks = char_grp['Clicks'].max()
+        char_grp['size'] = 10 + (char_grp['Clicks'] / max_char_clicks) * 40
+        add_metric_markers(char_fig, char_grp, 'Character_Count', 'Char Count', char_grp['size'])
+    return (char_fig,)
+def word_count_grid(c):
+    """One bubble per word count, with its top 3 keywords"""
+    word_grp = metric_groups(c, 'Word_Count', bullet='  • ')
+    word_count_fig = grid_2x2(("CTR by Word Count", "CVR by Word Count",
+                               "ROAS by Word Count", "CPA by Word Count"),
+                              vertical_spacing=0.12, horizontal_spacing=0.1,
+                              x_title="Word Count", y_titles=METRIC_Y_TITLES, height=700, showlegend=False)
+    if not word_grp.empty:
+        max_word_clicks = word_grp['Clicks'].max()
+        word_grp['size'] = 10 + (word_grp['Clicks'] / max_word_clicks) * 40
+        add_metric_markers(word_count_fig, word_grp, 'Word_Count', 'Word Count', word_grp['size'])
+    return (word_count_fig,)
+def level_grid(c, column, label, x_title):
+    """Specificity / urgency bubbles, levels ordered Low, Medium, High, Unknown"""
+    d = c.get('rows')
+    if column not in d.columns or not d[column].notna().any():
+        return (go.Figure(),)
+    grp = metric_groups(c, column, bullet='  • ')
+    grp['sort_order'] = grp[column].map(LEVEL_ORDER)
+    grp = grp.sort_values('sort_order')
+    fig = grid_2x2((f"CTR by {label}", f"CVR by {label}", f"ROAS by {label}", f"CPA by {label}"),
+                   vertical_spacing=0.12, horizontal_spacing=0.1,
+                   x_title=x_title, y_titles=METRIC_Y_TITLES,
+                   x_axis=dict(categoryorder='array', categoryarray=['Low', 'Medium', 'High', 'Unknown']),
+                   height=700, showlegend=False)
+    max_clicks = grp['Clicks'].max()
+    grp['size'] = 10 + (grp['Clicks'] / max_clicks) * 40
+    add_metric_markers(fig, grp, column, label, grp['size'])
+    return (fig,)
+def specificity_grid(c):
+    return level_grid(c, 'Specificity_Score', 'Specificity', "Specificity Score")
+def urgency_grid(c):
+    return level_grid(c, 'Urgency_Level', 'Urgency', "Urgency Level")
+def number_grid(c):
+    """Labelled bubbles for keywords with / without a number"""
+    num_grp = metric_groups(c, 'Is_Number_Present')
+    num_fig = grid_2x2(("CTR", "CVR", "ROAS", "CPA"),
+                       vertical_spacing=0.15, horizontal_spacing=0.15,
+                       x_title="Number Present", height=600)
+    if not num_grp.empty:
+        max_num_clicks = num_grp['Clicks'].max()
+        num_sizes = 40 + (num_grp['Clicks'] / max_num_clicks) * 60
+        add_metric_bubbles(num_fig, num_grp, 'Is_Number_Present', "Number Present", num_sizes)
+    return (num_fig,)
+def number_position_grid(c):
+    """Labelled bubbles per position of the number in the keyword"""
+    num_pos_grp = metric_groups(c, 'Position_of_Number').sort_values('Position_of_Number')
+    num_pos_grp['Position_of_Number'] = num_pos_grp['Position_of_Number'].astype(int)  # cleaner display
+    num_pos_fig = grid_2x2(("CTR by Number Position", "CVR by Number Position",
+                            "ROAS by Number Position", "CPA by Number Position"),
+                           vertical_spacing=0.15, horizontal_spacing=0.15,
+                           x_title="Position", height=600)
+    if not num_pos_grp.empty:
+        max_pos_clicks = num_pos_grp['Clicks'].max()
+        num_pos_grp['size'] = 10 + (num_pos_grp['Clicks'] / max_pos_clicks) * 30
+        add_metric_bubbles(num_pos_fig, num_pos_grp, 'Position_of_Number', "Position", num_pos_grp['size'],
+                           textposition='top center')
+    return (num_pos_fig,)
+def question_grid(c):
+    """Labelled bubbles for question / non-question keywords"""
+    question_grp = metric_groups(c, 'Is_Question')
+    question_fig = grid_2x2(("CTR", "CVR", "ROAS", "CPA"),
+                            vertical_spacing=0.15, horizontal_spacing=0.15,
+                            x_title="Is Question", height=600)
+    if not question_grp.empty:
+        max_q_clicks = question_grp['Clicks'].max()
+        q_sizes = 60 + (question_grp['Clicks'] / max_q_clicks) * 80
+        add_metric_bubbles(question_fig, question_grp, 'Is_Question', "Is Question", q_sizes)
+    return (question_fig,)
+# (builder, ids of the figures it returns) - together they cover KEYWORD_FIGURE_IDS
+KEYWORD_CHARTS = [
+    (word_treemaps, ['treemap_ctr_cvr', 'treemap_cpa_roas']),
+    (query_type_overview, ['category_overview']),
+    (keyword_category_overview, ['keyword_category_analysis']),
+    (emotion_bubbles, ['emotion_bubble_ctr_cvr', 'emotion_bubble_roas_cpa']),
+    (character_grid, ['char_analysis']),
+    (specificity_grid, ['specificity_analysis']),
+    (urgency_grid, ['urgency_analysis']),
+    (word_count_grid, ['word_count_analysis']),
+    (number_grid, ['number_analysis']),
+    (number_position_grid, ['number_position_analysis']),
+    (question_grid, ['question_analysis']),
+]
+KEYWORD_NODES = dict(BASE_NODES, words=lambda c: word_table(c.get('rows')),
+                     emotions=lambda c: emotion_table(c.get('rows')),
+                     **{builder.__name__: builder for builder, _ in KEYWORD_CHARTS})
+chart_pool = ThreadPoolExecutor(max_workers=CHART_WORKERS, thread_name_prefix='chart') if CHART_WORKERS > 1 else None
+def chart_node(c, builder, still_wanted=None):
+    check_wanted(still_wanted)
+    return c.get(builder.__name__)
+def build_charts(charts, c, still_wanted=None):
+    """{figure id: figure} for every (builder, ids) in charts, evaluated as nodes of Computation c -
+    on chart_pool if there is one, else serially (always serially while profiling, so the
+    profile sees the chart code instead of a wait on the pool).
+
+    Builders not started yet are skipped (Superseded) once still_wanted() turns False.
+    """
+    t0 = time.perf_counter()
+    if chart_pool is None or profiling_active():
+        results = [chart_node(c, builder, still_wanted) for builder, _ in charts]
+    else:
+        futures = [chart_pool.submit(bind(chart_node), c, builder, still_wanted) for builder, _ in charts]
+        try:
+            results = [f.result() for f in futures]
+        except Superseded:
+            for f in futures:
+                f.cancel()
+            raise
+    figures = {}
+    for (_, ids), figs in zip(charts, results):
+        figures.update(zip(ids, figs))
+    if log.isEnabledFor(logging.DEBUG):
+        log.debug("⏱️ %d charts in %.0f ms (%d workers), %s", len(charts), (time.perf_counter() - t0) * 1000,
+                  CHART_WORKERS, c.summary())
+    return figures
+# -----------------------------
+# DOMAIN CHARTS
+# -----------------------------
+def domain_treemaps(c):
+    """Top 50 domains by clicks, colored by CVR and by CPA"""
+    # Domain aggregation
+    domain_agg = c.get('metrics', 'Domain').sort_values('Clicks', ascending=False).head(50)
+
+    # 1. Domain Treemap CTR/CVR
+    treemap_ctr_cvr = go.Figure()
+    if not domain_agg.empty:
+        text_labels = domain_agg.apply(
+            lambda r: f"<b>{r['Domain']}</b><br>CTR: {r['CTR']:.1f}% | CVR: {r['CVR']:.1f}%", axis=1
+        )
+        treemap_ctr_cvr = treemap_figure(domain_agg['Domain'], domain_agg['Clicks'], text_labels,
+                                         cvr_colors(domain_agg['CVR'], 'CVR'), textfont_size=11)
+
+    # 2. Domain Treemap CPA/ROAS
+    treemap_cpa_roas = go.Figure()
+    if not domain_agg.empty:
+        text_labels = domain_agg.apply(
+            lambda r: f"<b>{r['Domain']}</b><br>CPA: ${r['CPA']:.1f} | ROAS: {r['ROAS']:.1f}x", axis=1
+        )
+        treemap_cpa_roas = treemap_figure(domain_agg['Domain'], domain_agg['Clicks'], text_labels,
+                                          cvr_colors(domain_agg['CPA'], 'CPA'), textfont_size=11)
+    return treemap_ctr_cvr, treemap_cpa_roas
+def domain_category_overview(c):
+    """All 4 metrics per domain category, normalized to 0-100"""
+    d = c.get('rows')
+    cat_overview = go.Figure()
+    if 'Domain_Category' in d.columns and d['Domain_Category'].notna().any():
+        cat_grp = c.get('metrics', 'Domain_Category').sort_values('Clicks', ascending=False).head(10)
+        top_domains = c.get('top', 'Domain_Category', '• ', 'Domain')
+        if not cat_grp.empty:
+            for col in ['Clicks', 'CTR', 'CVR', 'CPA', 'ROAS']:
+                min_val, max_val = cat_grp[col].min(), cat_grp[col].max()
+                cat_grp[f'{col}_norm'] = (cat_grp[col] - min_val) / (max_val - min_val + 1e-9) * 100
+        
+            cat_grp['top_domains'] = cat_grp['Domain_Category'].map(top_domains)
+        
+            cat_overview = go.Figure()
+            cat_overview.add_trace(go.Bar(
+                x=cat_grp['Domain_Category'], 
+                y=cat_grp['CTR_norm'], 
+                name='CTR', 
+                marker_color=COLORS['info'],
+                customdata=list(zip(cat_grp['CTR'], cat_grp['Clicks'], cat_grp['top_domains'])),
+                hovertemplate='<b>%{x}</b><br>Normalized: %{y:.1f}<br><b>Actual CTR: %{customdata[0]:.2f}%</b><br><b>Total Clicks: %{customdata[1]:,}</b><br><br>Top Domains:<br>%{customdata[2]}<extra></extra>'))
+            cat_overview.add_trace(go.Bar(
+                x=cat_grp['Domain_Category'], 
+                y=cat_grp['CVR_norm'], 
+                name='CVR', 
+                marker_color=COLORS['success'],
+                customdata=list(zip(cat_grp['CVR'], cat_grp['Clicks'], cat_grp['top_domains'])),
+                hovertemplate='<b>%{x}</b><br>Normalized: %{y:.1f}<br><b>Actual CVR: %{customdata[0]:.2f}%</b><br><b>Total Clicks: %{customdata[1]:,}</b><br><br>Top Domains:<br>%{customdata[2]}<extra></extra>'))
+            cat_overview.add_trace(go.Bar(
+                x=cat_grp['Domain_Category'], 
+                y=cat_grp['CPA_norm'], 
+                name='CPA', 
+                marker_color=COLORS['warning'],
+                customdata=list(zip(cat_grp['CPA'], cat_grp['Clicks'], cat_grp['top_domains'])),
+                hovertemplate='<b>%{x}</b><br>Normalized: %{y:.1f}<br><b>Actual CPA: $%{customdata[0]:.2f}</b><br><b>Total Clicks: %{customdata[1]:,}</b><br><br>Top Domains:<br>%{customdata[2]}<extra></extra>'))
+            cat_overview.add_trace(go.Bar(
+                x=cat_grp['Domain_Category'], 
+                y=cat_grp['ROAS_norm'], 
+                name='ROAS', 
+                marker_color=COLORS['primary'],
+                customdata=list(zip(cat_grp['ROAS'], cat_grp['Clicks'], cat_grp['top_domains'])),
+                hovertemplate='<b>%{x}</b><br>Normalized: %{y:.1f}<br><b>Actual ROAS: %{customdata[0]:.2f}x</b><br><b>Total Clicks: %{customdata[1]:,}</b><br><br>Top Domains:<br>%{customdata[2]}<extra></extra>'))
+    return (cat_overview,)
+def domain_category_bubbles(c):
+    """CTR/CVR and ROAS/CPA bubbles per domain category, one trace per chart"""
+    d = c.get('rows')
+    if 'Domain_Category' not in d.columns or not d['Domain_Category'].notna().any():
+        return go.Figure(), go.Figure()
+    cat_agg = c.get('metrics', 'Domain_Category')
+    max_cat_clicks = cat_agg['Clicks'].max() or 1
+    palette = [COLORS['primary'], COLORS['secondary'], COLORS['success'], COLORS['info'], COLORS['warning'], COLORS['danger']]
+    cat_colors = [palette[i % len(palette)] for i in range(len(cat_agg))]
+    cat_sizes = 40 + (cat_agg['Clicks'] / max_cat_clicks) * 100
+    def bubbles(x, y, x_hover, y_hover):
+        # values only in the arrays, so a filter change patches them and keeps the structure
+        return scatter_trace(
+            len(cat_agg),
+            x=cat_agg[x], y=cat_agg[y],
+            mode='markers+text',
+            text=cat_agg['Domain_Category'],
+            textposition='middle center',
+            textfont=dict(size=11, color='white', family='Arial'),
+            marker=dict(size=cat_sizes, color=cat_colors, opacity=0.8, line=dict(width=3, color='white')),
+            customdata=cat_agg['Clicks'],
+            hovertemplate=f"<b>%{{text}}</b><br>{x_hover}<br>{y_hover}<br>" +
+                          "<b>Clicks: %{customdata:,.0f}</b><extra></extra>",
+            showlegend=False)
+    cat_ctr_cvr = figure_spec([bubbles('CTR', 'CVR', "CTR: %{x:.2f}%", "CVR: %{y:.2f}%")],
+                              height=500, xaxis=dict(title={'text': "CTR (%)"}), yaxis=dict(title={'text': "CVR (%)"}))
+    cat_roas_cpa = figure_spec([bubbles('ROAS', 'CPA', "ROAS: %{x:.2f}x", "CPA: $%{y:.2f}")],
+                               height=500, xaxis=dict(title={'text': "ROAS"}), yaxis=dict(title={'text': "CPA ($)"}))
+    return cat_ctr_cvr, cat_roas_cpa
+DOMAIN_CHARTS = [
+    (domain_treemaps, ['domain_treemap_ctr_cvr', 'domain_treemap_cpa_roas']),
+    (domain_category_overview, ['domain_category_overview']),
+    (domain_category_bubbles, ['domain_category_ctr_cvr', 'domain_category_roas_cpa']),
+]
+DOMAIN_NODES = dict(BASE_NODES, **{builder.__name__: builder for builder, _ in DOMAIN_CHARTS})
 # -----------------------------
 # DASH APP
 # -----------------------------
-app = dash.Dash(__name__, external_stylesheets=[dbc.themes.CYBORG])
+app = dash.Dash(__name__, external_stylesheets=[dbc.themes.CYBORG],
+                external_scripts=[PLOTLYJS_URL] if BINARY_FIGURES else [])
 app.title = "Campaign Analytics Dashboard"
 app.config.suppress_callback_exceptions = True
 server = app.server
+RESPONSE_BYTES = REGISTRY.counter('http_response_bytes_total', 'Compressible response bytes before and after compression',
+                                  ['route', 'encoding', 'stage'])
+def log_payload_size(raw_bytes, sent_bytes, encoding, seconds):
+    """Count raw vs sent bytes of compressible responses; DEBUG logs them per Dash callback"""
+    dash_update = flask_request.path.endswith('_dash-update-component')
+    route = 'dash-update' if dash_update else 'other'
+    RESPONSE_BYTES.inc(raw_bytes, route=route, encoding=encoding or 'identity', stage='raw')
+    RESPONSE_BYTES.inc(sent_bytes, route=route, encoding=encoding or 'identity', stage='sent')
+    if dash_update and log.isEnabledFor(logging.DEBUG):
+        output = (flask_request.get_json(silent=True) or {}).get('output', '')
+        cb = app.callback_map.get(output, {}).get('callback')
+        name = getattr(cb, '__name__', output[:60])
+        log.debug("📦 %s: %s -> %s bytes (%s, %.1f ms)", name, f"{raw_bytes:,}", f"{sent_bytes:,}",
+                  encoding or 'identity', seconds * 1000)
+if COMPRESS_MIN_BYTES:
+    install_compression(server, min_size=COMPRESS_MIN_BYTES, on_response=log_payload_size)
+# -----------------------------
+# EXPORTS
+# -----------------------------
+# /export/<name> streams the rows in chunks straight from the cached filter positions.
+# The download buttons go through export_queue instead: the file is written to disk by a
+# background thread, the page polls its progress, then fetches the finished file. Files are
+# cached on disk by (dataset version, filters, format), so a repeat download is a file send.
+EXPORT_FILTER_PARAMS = ['obj', 'adv', 'ctype', 'camp']
+def keyword_category_frame(d):
+    if 'Keyword_Category' not in d.columns or not d['Keyword_Category'].notna().any():
+        return pd.DataFrame(columns=['Keyword_Category', 'Clicks', 'CTR', 'CVR', 'CPA', 'ROAS'])
+    return weighted_metrics(d, 'Keyword_Category')
+# name -> (dataset, summary builder or None to export the filtered rows as they are)
+EXPORTS = {
+    'filtered_data': ('keyword', None),
+    'keyword_category_analysis': ('keyword', keyword_category_frame),
+    'filtered_domain_data': ('domain', None),
+}
+export_queue = ExportJobs(guard=export_guard)
+def export_url(name, obj=None, adv=None, ctype=None, camp=None, fmt='csv'):
+    params = {k: v for k, v in zip(EXPORT_FILTER_PARAMS, (obj, adv, ctype, camp)) if v}
+    params['format'] = fmt
+    return app.get_relative_path(f"/export/{name}") + '?' + urlencode(params)
+def export_source(name, filters):
+    """(frame, positions) to export for one EXPORTS entry and filter tuple"""
+    dataset, summarize = EXPORTS[name]
+    positions = filtered_positions(dataset, *filters)
+    if summarize is None:
+        return DATASETS[dataset], positions
+    return summarize(DATASETS[dataset].iloc[positions]), None
+def export_request_args(name):
+    if name not in EXPORTS:
+        abort(404)
+    fmt = flask_request.args.get('format', 'csv')
+    if fmt not in available_formats():
+        abort(400, f"format must be one of {available_formats()}")
+    return tuple(flask_request.args.get(k) or None for k in EXPORT_FILTER_PARAMS), fmt
+def export_key(name, filters):
+    """Cache key of an export: (name, dataset version, filter tuple) - the format is added by export_queue"""
+    return (name, DATASET_VERSIONS[EXPORTS[name][0]], tuple(filters))
+def start_export(name, filters, fmt='csv'):
+    filters = tuple(filters)
+    return export_queue.submit(export_key(name, filters), name, fmt, lambda: export_source(name, filters))
+def send_export_file(jid, path, filename):
+    """Cached export file with the job id as ETag; If-None-Match and Range are handled by send_file"""
+    return send_file(path, as_attachment=True, download_name=filename, etag=jid,
+                     conditional=True, max_age=0)
+@server.route('/stats/coalescing')
+def coalescing_stats_route():
+    return jsonify(coalescing_stats())
+@server.route('/stats/computation/<tab>')
+def computation_stats_route(tab):
+    """Node timings of the tab's latest dashboard update"""
+    c = last_computations.get(tab)
+    if c is None:
+        abort(404)
+    return jsonify({'summary': c.summary(), 'nodes': c.report()})
+@server.route('/export/<name>')
+def export_data(name):
+    filters, fmt = export_request_args(name)
+    jid, path = export_queue.cached_file(export_key(name, filters), fmt)
+    if path is not None:
+        return send_export_file(jid, path, f"{name}.{fmt}")
+    if jid in flask_request.if_none_match:  # same key, same bytes
+        return Response(status=304, headers={'ETag': f'"{jid}"'})
+    frame, positions = export_source(name, filters)
+    try:
+        memory.admit(f"Export {name}.{fmt}", export_memory(frame, positions))
+    except MemoryBudgetExceeded as e:
+        return Response(str(e), status=503, mimetype='text/plain', headers={'Retry-After': '30'})
+    response = export_response(frame, positions, name, fmt)
+    response.set_etag(jid)
+    return response
+@server.route('/export/<name>/jobs', methods=['POST'])
+def export_job_create(name):
+    filters, fmt = export_request_args(name)
+    return jsonify(export_queue.status(start_export(name, filters, fmt))), 202
+@server.route('/export/jobs/<jid>')
+def export_job_status(jid):
+    status = export_queue.status(jid)
+    if status is None:
+        abort(404)
+    return jsonify(status)
+@server.route('/export/jobs/<jid>/file')
+def export_job_file(jid):
+    """Finished export file; send_file answers Range requests, so interrupted downloads can resume"""
+    job = export_queue.jobs.get(jid)
+    status = export_queue.status(jid)
+    if status is None and job is not None:  # done, but the file was deleted by another worker
+        abort(410, "This export has expired - download it again")
+    if status is None or status['state'] != 'done':
+        abort(404)
+    export_queue.touch(jid)
+    try:
+        return send_export_file(jid, export_queue.path(jid), status['filename'])
+    except FileNotFoundError:  # deleted between the check and the send
+        export_queue.forget(jid)
+        abort(410, "This export has expired - download it again")
 app.index_string = '''
 
 <!DOCTYPE html>
@@ -420,7 +1238,14 @@ app.layout = dbc.Container([
         color="info",
         className="mb-3"
     ),
-    html.Div(id="tab-content")
+    html.Div(id='export-status', className='mb-3'),
+    html.Div(id="tab-content"),
+    dcc.Store(id='export-job'),
+    dcc.Store(id='session-id', storage_type='session'),
+    dcc.Interval(id='export-poll', interval=1000, disabled=True),
+    # Structure signatures of the figures each tab's graphs currently show (see patch_figures)
+    dcc.Store(id='keyword-figure-signatures'),
+    dcc.Store(id='domain-figure-signatures'),
 ], fluid=True)
 @app.callback(
     Output("tab-content", "children"),
@@ -458,7 +1283,6 @@ def render_tab_content(active_tab):
                     dbc.CardBody([dcc.Loading(dcc.Graph(id='keyword_category_analysis'), type='default')])
                 ]), md=12)
             ], className='mb-4'),
-            dcc.Download(id="download-keyword-category"),
             dbc.Row([
                 dbc.Col(dbc.Card([
                     dbc.CardHeader([
@@ -574,13 +1398,12 @@ def render_tab_content(active_tab):
             dbc.Row([
                 dbc.Col(dbc.Card([
                     dbc.CardHeader(html.Div([
-                        "Data Preview (Top 30 Keywords by Clicks)",
+                        "Data Preview (all filtered keywords - sort and filter in the table)",
                         dbc.Button("Download CSV", id="download-btn", color="primary", size="sm", style={'float':'right'})
                     ])),
                     dbc.CardBody([dcc.Loading(html.Div(id='table_preview'), type='default')])
                 ]), md=12)
             ], className='mb-4'),
-            dcc.Download(id="download-data"),
         ])
     
     elif active_tab == "domain-tab":
@@ -642,23 +1465,31 @@ def render_tab_content(active_tab):
         dbc.Row([
             dbc.Col(dbc.Card([
                 dbc.CardHeader(html.Div([
-                    "Domain Data Preview (Top 30 by Clicks)",
+                    "Domain Data Preview (all filtered domains - sort and filter in the table)",
                     dbc.Button("Download CSV", id="download-domain-btn", color="primary", size="sm", style={'float':'right'})
                 ])),
                 dbc.CardBody([dcc.Loading(html.Div(id='domain_table_preview'), type='default')])
             ]), md=12)
         ], className='mb-4'),
-        dcc.Download(id="download-domain-data"),
     ])
 # KEYWORD CALLBACKS - WITH prevent_initial_call=True ADDED
+@app.callback(
+    Output('session-id','data'),
+    Input('session-id','id'),
+    State('session-id','data')
+)
+def init_session(_, sid):
+    """Per browser tab id, used to drop dashboard updates a newer one has replaced"""
+    if sid:
+        raise PreventUpdate
+    return uuid.uuid4().hex
 @app.callback(
     Output('objective-dropdown','options'),
     Output('objective-dropdown','value'),
     Input('objective-dropdown','id')
 )
 def init_objective(_):
-    opts = sorted(work['Campaign_Objective'].dropna().astype(str).unique())
-    return [{'label': o, 'value': o} for o in opts], None
+    return [{'label': o, 'value': o} for o in dropdown_options('Campaign_Objective')], None
 @app.callback(
     Output('advertiser-dropdown','options'),
     Output('advertiser-dropdown','value'),
@@ -666,9 +1497,7 @@ def init_objective(_):
 ,
 )
 def load_advertisers(obj):
-    data = work if not obj else work[work['Campaign_Objective'] == obj]
-    opts = sorted(data['Advertiser'].dropna().astype(str).unique())
-    return [{'label': a, 'value': a} for a in opts],None
+    return [{'label': a, 'value': a} for a in dropdown_options('Advertiser', obj)], None
 @app.callback(
     Output('campaign-type-dropdown','options'),
     Output('campaign-type-dropdown','value'),
@@ -676,11 +1505,7 @@ def load_advertisers(obj):
     Input('advertiser-dropdown','value')
 )
 def load_campaign_types(obj, adv):
-    data = work.copy()
-    if obj: data = data[data['Campaign_Objective']==obj]
-    if adv: data = data[data['Advertiser']==adv]
-    opts = sorted(data['Campaign_Type'].dropna().astype(str).unique())
-    return [{'label': c, 'value': c} for c in opts], None
+    return [{'label': c, 'value': c} for c in dropdown_options('Campaign_Type', obj, adv)], None
 
 @app.callback(
     Output('campaign-dropdown','options'),
@@ -690,12 +1515,7 @@ def load_campaign_types(obj, adv):
     Input('campaign-type-dropdown','value')
 )
 def load_campaigns(obj, adv, ctype):
-    data=work.copy()
-    if obj: data = data[data['Campaign_Objective']==obj]
-    if adv: data = data[data['Advertiser']==adv]
-    if ctype: data = data[data['Campaign_Type']==ctype]
-    opts = sorted(data['Campaign'].dropna().astype(str).unique())
-    return [{'label': c, 'value': c} for c in opts], None
+    return [{'label': c, 'value': c} for c in dropdown_options('Campaign', obj, adv, ctype)], None
 # MAIN KEYWORD DASHBOARD - WITH prevent_initial_call=True ADDED
 @app.callback(
     Output('stats','children'),
@@ -713,31 +1533,21 @@ def load_campaigns(obj, adv, ctype):
     Output('number_position_analysis','figure'),
     Output('question_analysis','figure'),
     Output('table_preview','children'),
+    Output('keyword-figure-signatures','data'),
     Input('objective-dropdown','value'),
     Input('advertiser-dropdown','value'),
     Input('campaign-type-dropdown','value'),
     Input('campaign-dropdown','value'),
-    Input('analysis-tabs', 'active_tab')
+    Input('analysis-tabs', 'active_tab'),
+    State('keyword-figure-signatures','data'),
+    State('session-id','data')
 )
-def update_dashboard(obj, adv, ctype, camp, active_tab):
+def update_dashboard(obj, adv, ctype, camp, active_tab, signatures=None, session=None):
     if active_tab != "keyword-tab":
         raise PreventUpdate
-    
-    # Filter data
-    d = work.copy()
-    if obj:
-        d = d[d['Campaign_Objective'] == obj]
-    if adv:
-        d = d[d['Advertiser'] == adv]
-    if ctype:
-        d = d[d['Campaign_Type'] == ctype]
-    if camp:
-        d = d[d['Campaign'] == camp]
-    
-    print(f"Filtered data shape: {d.shape}")  # Debug
-    print(f"Columns in filtered data: {d.columns.tolist()}")  # Debug
-    
-    if d.shape[0] == 0:
+    with span('view'):
+        view = coalesced_view('keyword', (obj, adv, ctype, camp), session, keyword_view)
+    if view is None:
         empty_fig = go.Figure()
         empty_fig.add_annotation(
             text="No data available for selected filters",
@@ -755,952 +1565,48 @@ def update_dashboard(obj, adv, ctype, camp, active_tab):
         empty_stats = dbc.Alert("No data available for selected filters", color="warning")
         return (empty_stats, empty_fig, empty_fig, empty_fig, empty_fig, 
                 empty_fig, empty_fig, empty_fig, empty_fig, empty_fig, 
-                empty_fig, empty_fig, empty_fig, empty_fig, html.Div("No data"))
-
-    total_clicks = int(d['Clicks'].sum())
-    total_impressions = int(d['Impressions'].sum())
-    avg_ctr = weighted_ctr(d)
-    avg_cvr = weighted_cvr(d)
-    avg_cpa = weighted_cpa(d)
-    avg_roas = weighted_roas(d)
-    # Stats row - 6 metrics
-    stat_row = dbc.Row([
-        dbc.Col(dbc.Card(dbc.CardBody([
-            html.Div("Total Impressions", className='small-muted'),
-            html.Div(f"{total_impressions:,}", className='big-number')
-        ])), md=2),
-        dbc.Col(dbc.Card(dbc.CardBody([
-            html.Div("Total Clicks", className='small-muted'),
-            html.Div(f"{total_clicks:,}", className='big-number', style={'color':COLORS['secondary']})
-        ])), md=2),
-        dbc.Col(dbc.Card(dbc.CardBody([
-            html.Div("Avg CTR (%)", className='small-muted'),
-            html.Div(f"{avg_ctr:.2f}", className='big-number', style={'color':COLORS['info']})
-        ])), md=2),
-        dbc.Col(dbc.Card(dbc.CardBody([
-            html.Div("Avg CVR (%)", className='small-muted'),
-            html.Div(f"{avg_cvr:.2f}", className='big-number', style={'color':COLORS['success']})
-        ])), md=2),
-        dbc.Col(dbc.Card(dbc.CardBody([
-            html.Div("Avg CPA", className='small-muted'),
-            html.Div(f"${avg_cpa:.2f}", className='big-number', style={'color':COLORS['warning']})
-        ])), md=2),
-        dbc.Col(dbc.Card(dbc.CardBody([
-            html.Div("Avg ROAS", className='small-muted'),
-            html.Div(f"{avg_roas:.2f}x", className='big-number', style={'color':COLORS['primary']})
-        ])), md=2),
-    ], className='mb-3')
-    # Prepare word-level aggregated df
-    
-    # 1. TREEMAP CTR/CVR
-    # Prepare word-level aggregated df
-    rows = []
-    for idx, r in d.iterrows():
-        pcs = split_multi(r.get('Phrase_Components', ''))
-        if not pcs:
-            kw = str(r.get('Keyword', ''))
-            tokens = re.findall(r"[A-Za-z0-9']+", kw.lower())
-            pcs = [t for t in tokens if len(t)>1][:5]
-        for w in set(pcs):
-            rows.append({
-                'word': w,
-                'Clicks': r.get('Clicks', 0),
-                'Impressions': r.get('Impressions', 0),
-                'CTR': r.get('CTR', 0),
-                'CVR': r.get('CVR', 0),
-                'CPA': r.get('CPA', 0),
-                'ROAS': r.get('ROAS', 0),
-                'Max_System_Cost': r.get('Max_System_Cost', 0),
-                'Weighted_Conversion': r.get('Weighted_Conversion', 0)
-            })
-    
-    print(f"Word rows generated: {len(rows)}")  # Debug
-    
-    if rows:
-        word_df = pd.DataFrame(rows)
-        word_agg = word_df.groupby('word').apply(lambda g: pd.Series({
-            'Clicks': g['Clicks'].sum(),
-            'Impressions': g['Impressions'].sum(),
-            'CTR': weighted_ctr(g),
-            'CVR': weighted_cvr(g),
-            'CPA': weighted_cpa(g),
-            'ROAS': weighted_roas(g)
-        })).reset_index()
-        word_agg = word_agg.sort_values('Clicks', ascending=False).head(30)
-        print(f"Word aggregation complete: {len(word_agg)} words")  # Debug
-    else:
-        word_agg = pd.DataFrame(columns=['word','Clicks','CTR','CVR','CPA','ROAS'])
-        print("No word rows generated - creating empty dataframe")  # Debug
-    if not word_agg.empty:
-        text_labels = word_agg.apply(
-            lambda r: f"<b>{r['word']}</b><br>CTR: {r['CTR']:.1f}% | CVR: {r['CVR']:.1f}%", axis=1
-        )
-        treemap_ctr_cvr = go.Figure(go.Treemap(
-            labels=word_agg['word'],
-            parents=[''] * len(word_agg),
-            values=word_agg['Clicks'],
-            text=text_labels,
-            textposition="middle center",
-            marker=dict(
-                colors=word_agg['CVR'].apply(lambda x: cvr_color(x, 'CVR')),
-                line=dict(width=2, color='#1a1a1a')
-            ),
-            textfont=dict(size=12, color='white')
-        ))
-        treemap_ctr_cvr.update_layout(
-            
-            margin=dict(l=5,r=5,t=5,b=5),
-            paper_bgcolor='rgba(0,0,0,0)',
-            height=450,font=dict(color='white'), xaxis=dict(color='white'),yaxis=dict(color='white')
-        )
-    else:
-        treemap_ctr_cvr = go.Figure()
-    # 2. TREEMAP CPA/ROAS
-    if not word_agg.empty:
-        text_labels = word_agg.apply(
-            lambda r: f"<b>{r['word']}</b><br>CPA: ${r['CPA']:.1f} | ROAS: {r['ROAS']:.1f}x", axis=1
-        )
-        treemap_cpa_roas = go.Figure(go.Treemap(
-            labels=word_agg['word'],
-            parents=[''] * len(word_agg),
-            values=word_agg['Clicks'],
-            text=text_labels,
-            textposition="middle center",
-            marker=dict(
-                colors=word_agg['CPA'].apply(lambda x: cvr_color(x, 'CPA')),
-                line=dict(width=2, color='#1a1a1a')
-            ),
-            textfont=dict(size=12, color='white')
-        ))
-        treemap_cpa_roas.update_layout(
-            margin=dict(l=5,r=5,t=5,b=5),
-            paper_bgcolor='rgba(0,0,0,0)',
-            height=450,font=dict(color='white'), xaxis=dict(color='white'),yaxis=dict(color='white')
-        )
-    else:
-        treemap_cpa_roas = go.Figure()
-    # 3. WORD BUBBLE CTR/CVR
-    # 5. CATEGORY OVERVIEW - All 4 metrics normalized
-    # KEYWORD CATEGORY ANALYSIS - Add after category_overview
-    
-    
-    
-    if 'Query_Type' in d.columns and d['Query_Type'].notna().any():
-    # Get top 3 keywords per category
-        cat_top_kw = {}
-        for cat in d['Query_Type'].dropna().unique():
-            cat_data = d[d['Query_Type'] == cat]
-            if len(cat_data) > 0 and 'Keyword' in cat_data.columns:
-                top_kws = cat_data.nlargest(3, 'Clicks')
-                cat_top_kw[cat] = '<br>'.join([f"• {kw} ({int(c)} clicks)" 
-                                           for kw, c in zip(top_kws['Keyword'], top_kws['Clicks'])])
-            else:
-                cat_top_kw[cat] = 'N/A'
-
-    
-        cat_grp = d.groupby('Query_Type').apply(lambda g: pd.Series({
-                'Clicks': g['Clicks'].sum(),
-                'CTR': weighted_ctr(g),
-                'CVR': weighted_cvr(g),
-                'CPA': weighted_cpa(g),
-                'ROAS': weighted_roas(g)
-    })).reset_index().sort_values('Clicks', ascending=False).head(10)
+                empty_fig, empty_fig, empty_fig, empty_fig, html.Div("No data"), {})
+    stat_row, finished = view
+    # Table preview - rows are paged in by update_keyword_table
+    table_children = preview_table('keyword-table', 'keyword', KEYWORD_PREVIEW_COLS)
+    with span('patch figures'):
+        figs, signatures = patch_figures(KEYWORD_FIGURE_IDS, finished, signatures, full=triggered_by_tab())
+    return (stat_row, *figs, table_children, signatures)
+def keyword_view(filters, still_wanted=None):
+    """Stat row and finished figures of the keyword tab, None when no rows match the filters"""
+    c = Computation(KEYWORD_NODES, dataset='keyword', filters=filters)
+    d = c.get('rows')
     
-        if not cat_grp.empty:
-        # Normalize all 5 to 0-100
-                    for col in ['Clicks', 'CTR', 'CVR', 'CPA', 'ROAS']:
-                       min_val = cat_grp[col].min()
-                       max_val = cat_grp[col].max()
-                       cat_grp[f'{col}_norm'] = (cat_grp[col] - min_val) / (max_val - min_val + 1e-9) * 100
-        
-        # Add top keywords column
-                    cat_grp['top_keywords'] = cat_grp['Query_Type'].map(cat_top_kw)
-        
-                    fig_cat = go.Figure()
-                    fig_cat.add_trace(go.Bar(
-                        x=cat_grp['Query_Type'], 
-                        y=cat_grp['Clicks_norm'],
-                        name='Clicks', 
-                        marker_color=COLORS['secondary'],
-                        customdata=list(zip(cat_grp['Clicks'], cat_grp['top_keywords'])),
-                        hovertemplate='<b>%{x}</b><br>Normalized: %{y:.1f}<br><b>Actual Clicks: %{customdata[0]:,}</b><br><br>Top Keywords:<br>%{customdata[1]}<extra></extra>'))
-                    fig_cat.add_trace(go.Bar(
-                        x=cat_grp['Query_Type'], 
-                        y=cat_grp['CTR_norm'], 
-                        name='CTR', 
-                        marker_color=COLORS['info'],
-                        customdata=list(zip(cat_grp['CTR'], cat_grp['top_keywords'])),
-                        hovertemplate='<b>%{x}</b><br>Normalized: %{y:.1f}<br><b>Actual CTR: %{customdata[0]:.2f}%</b><br><br>Top Keywords:<br>%{customdata[1]}<extra></extra>'
-                        ))
-                    fig_cat.add_trace(go.Bar(
-                        x=cat_grp['Query_Type'], 
-                        y=cat_grp['CVR_norm'], 
-                        name='CVR', 
-                        marker_color=COLORS['success'],
-                        customdata=list(zip(cat_grp['CVR'], cat_grp['top_keywords'])),
-                        hovertemplate='<b>%{x}</b><br>Normalized: %{y:.1f}<br><b>Actual CVR: %{customdata[0]:.2f}%</b><br><br>Top Keywords:<br>%{customdata[1]}<extra></extra>'))
-                    fig_cat.add_trace(go.Bar(
-                        x=cat_grp['Query_Type'], 
-                        y=cat_grp['CPA_norm'], 
-                        name='CPA', 
-                        marker_color=COLORS['warning'],
-                        customdata=list(zip(cat_grp['CPA'], cat_grp['top_keywords'])),
-                        hovertemplate='<b>%{x}</b><br>Normalized: %{y:.1f}<br><b>Actual CPA: $%{customdata[0]:.2f}</b><br><br>Top Keywords:<br>%{customdata[1]}<extra></extra>'
-                        ))
-                    fig_cat.add_trace(go.Bar(
-                        x=cat_grp['Query_Type'], 
-                        y=cat_grp['ROAS_norm'], 
-                        name='ROAS', 
-                        marker_color=COLORS['primary'],
-                        customdata=list(zip(cat_grp['ROAS'], cat_grp['top_keywords'])),
-                        hovertemplate='<b>%{x}</b><br>Normalized: %{y:.1f}<br><b>Actual ROAS: %{customdata[0]:.2f}x</b><br><br>Top Keywords:<br>%{customdata[1]}<extra></extra>'
-                        ))
-                    fig_cat.update_layout(
-                        barmode='group', height=500,
-                        xaxis_tickangle=-20,
-                        paper_bgcolor='rgba(0,0,0,0)', plot_bgcolor='rgba(0,0,0,0)',
-                        yaxis_title="Normalized Score (0-100)",font=dict(color='white'), xaxis=dict(color='white'),yaxis=dict(color='white')
-            )
-        else:
-            fig_cat = go.Figure()
-            print("cat_grp is empty, creating empty fig_cat")
-    else:
-        fig_cat = go.Figure()
-        print("Query_Type column missing or all null")
-        
-    if 'Keyword_Category' in d.columns and d['Keyword_Category'].notna().any():
-        kw_cat_top = {}
-        for cat in d['Keyword_Category'].dropna().unique():
-            cat_data = d[d['Keyword_Category'] == cat]
-            if len(cat_data) > 0:
-                top_kws = cat_data.nlargest(3, 'Clicks')
-                kw_cat_top[cat] = '<br>'.join([f"• {kw} ({int(c)} clicks)" 
-                                          for kw, c in zip(top_kws['Keyword'], top_kws['Clicks'])])
+    log.debug("Filtered data shape: %s", d.shape)
+    log.debug("Columns in filtered data: %s", d.columns)
     
-        kw_cat_grp = d.groupby('Keyword_Category').apply(lambda g: pd.Series({
-        'Clicks': g['Clicks'].sum(),
-        'CTR': weighted_ctr(g),
-        'CVR': weighted_cvr(g),
-        'CPA': weighted_cpa(g),
-        'ROAS': weighted_roas(g)
-    })).reset_index().sort_values('Clicks', ascending=False).head(10)
-    
-        if not kw_cat_grp.empty:
-            for col in ['Clicks', 'CTR', 'CVR', 'CPA', 'ROAS']:
-                min_val = kw_cat_grp[col].min()
-                max_val = kw_cat_grp[col].max()
-                kw_cat_grp[f'{col}_norm'] = (kw_cat_grp[col] - min_val) / (max_val - min_val + 1e-9) * 100
-        
-            kw_cat_grp['top_keywords'] = kw_cat_grp['Keyword_Category'].map(kw_cat_top)
-            keyword_category_fig = go.Figure()
-            keyword_category_fig.add_trace(go.Bar(
-                x=kw_cat_grp['Keyword_Category'], y=kw_cat_grp['Clicks_norm'],
-                name='Clicks', marker_color=COLORS['secondary'],
-                customdata=list(zip(kw_cat_grp['Clicks'], kw_cat_grp['top_keywords'])),
-                hovertemplate='<b>%{x}</b><br>Normalized: %{y:.1f}<br><b>Clicks: %{customdata[0]:,}</b><br><br>Top Keywords:<br>%{customdata[1]}<extra></extra>'))
-            keyword_category_fig.add_trace(go.Bar(
-                x=kw_cat_grp['Keyword_Category'], y=kw_cat_grp['CTR_norm'],
-                name='CTR', marker_color=COLORS['info'],
-                customdata=list(zip(kw_cat_grp['CTR'], kw_cat_grp['top_keywords'])),
-                hovertemplate='<b>%{x}</b><br>Normalized: %{y:.1f}<br><b>CTR: %{customdata[0]:.2f}%</b><br><br>Top Keywords:<br>%{customdata[1]}<extra></extra>'))
-            keyword_category_fig.add_trace(go.Bar(
-                x=kw_cat_grp['Keyword_Category'], y=kw_cat_grp['CVR_norm'],
-                name='CVR', marker_color=COLORS['success'],
-                customdata=list(zip(kw_cat_grp['CVR'], kw_cat_grp['top_keywords'])),
-                hovertemplate='<b>%{x}</b><br>Normalized: %{y:.1f}<br><b>CVR: %{customdata[0]:.2f}%</b><br><br>Top Keywords:<br>%{customdata[1]}<extra></extra>'))
-            keyword_category_fig.add_trace(go.Bar(
-                x=kw_cat_grp['Keyword_Category'], y=kw_cat_grp['CPA_norm'],
-                name='CPA', marker_color=COLORS['warning'],
-                customdata=list(zip(kw_cat_grp['CPA'], kw_cat_grp['top_keywords'])),
-                hovertemplate='<b>%{x}</b><br>Normalized: %{y:.1f}<br><b>CPA: $%{customdata[0]:.2f}</b><br><br>Top Keywords:<br>%{customdata[1]}<extra></extra>'))
-            keyword_category_fig.add_trace(go.Bar(
-                x=kw_cat_grp['Keyword_Category'], y=kw_cat_grp['ROAS_norm'],
-                name='ROAS', marker_color=COLORS['primary'],
-                customdata=list(zip(kw_cat_grp['ROAS'], kw_cat_grp['top_keywords'])),
-                hovertemplate='<b>%{x}</b><br>Normalized: %{y:.1f}<br><b>ROAS: %{customdata[0]:.2f}x</b><br><br>Top Keywords:<br>%{customdata[1]}<extra></extra>'))
-            keyword_category_fig.update_layout(
-                barmode='group', height=500,
-                xaxis_tickangle=-45,
-                paper_bgcolor='rgba(0,0,0,0)', plot_bgcolor='rgba(0,0,0,0)',
-                yaxis_title="Normalized Score (0-100)",
-                font=dict(color='white'), xaxis=dict(color='white'), yaxis=dict(color='white')
-        )
-        else:
-            keyword_category_fig = go.Figure()
-                
-    else:
-            keyword_category_fig = go.Figure()    
-    # 6. EMOTION BUBBLE CTR/CVR
-    # 6. EMOTION BUBBLE CTR/CVR
-    # 6. EMOTION BUBBLE CTR/CVR with top keywords
-    # 6. EMOTION BUBBLE CTR/CVR with top keywords
-    emo_rows = []
-    for idx, row in d.iterrows():
-        emo_str = str(row.get('Emotional_Intent', ''))
-        if pd.isna(row.get('Emotional_Intent')) or emo_str.lower() in ['', 'nan', 'none']:
-          emos = ['neutral']
-        else:
-          emos = [e.strip().lower() for e in re.split(r'[;,]\s*', emo_str) if e.strip()]
-        if not emos:
-          emos = ['neutral']
-    
-        for e in emos:
-            emo_rows.append({
-            'emotion': e,
-            'Keyword': row.get('Keyword', ''),
-            'Clicks': row.get('Clicks', 0),
-            'Impressions': row.get('Impressions', 0),
-            'CTR': row.get('CTR', 0),
-            'CVR': row.get('CVR', 0),
-            'CPA': row.get('CPA', 0),
-            'ROAS': row.get('ROAS', 0),
-            'Max_System_Cost': row.get('Max_System_Cost', 0),
-            'Weighted_Conversion': row.get('Weighted_Conversion', 0)
-        })
-
-    print(f"Emotion rows generated: {len(emo_rows)}")  # Debug
-    
-    emo_ctr_cvr = go.Figure()
-    if emo_rows:
-        emo_df = pd.DataFrame(emo_rows)
-    
-        emo_top_keywords = emo_df.groupby('emotion').apply(
-        lambda g: '<br>'.join([f"• {kw} ({int(c)} clicks)" 
-                               for kw, c in zip(g.nlargest(3, 'Clicks')['Keyword'], 
-                                              g.nlargest(3, 'Clicks')['Clicks'])])
-        ).to_dict()
-    
-        emo_agg = emo_df.groupby('emotion').agg({
-            'Clicks': 'sum',
-            'Impressions': 'sum',
-            'CTR': 'mean',
-            'CVR': 'mean',
-            'CPA': 'mean',
-            'ROAS': 'mean'
-            }).reset_index()
-    
-        print(f"Emotion aggregation complete: {len(emo_agg)} emotions")  # Debug
-        
-        max_clicks_emo = emo_agg['Clicks'].max()
-        if max_clicks_emo == 0:
-            max_clicks_emo = 1  # Prevent division by zero
-        palette = [COLORS['primary'], COLORS['secondary'], COLORS['success'], 
-               COLORS['info'], COLORS['warning'], COLORS['danger']]
-        cmap = {emo: palette[i % len(palette)] for i, emo in enumerate(emo_agg['emotion'])}
-    
-        for _, r in emo_agg.iterrows():
-            size = 40 + (r['Clicks'] / max_clicks_emo) * 100
-            top_kw = emo_top_keywords.get(r['emotion'], 'N/A')
-            emo_ctr_cvr.add_trace(go.Scatter(
-            x=[r['CTR']], y=[r['CVR']],
-            mode='markers+text',
-            text=[r['emotion']],
-            textposition='middle center',
-            textfont=dict(size=12, color='white', family='Arial'),  # optional: family
-            marker=dict(size=size, color=cmap[r['emotion']], opacity=0.8,
-                       line=dict(width=3, color='white')),
-            hovertemplate=f"<b>{r['emotion']}</b><br>" +
-                         f"CTR: {r['CTR']:.2f}%<br>" +
-                         f"CVR: {r['CVR']:.2f}%<br>" +
-                         f"<b>Clicks: {int(r['Clicks']):,}</b><br>" +
-                         f"<b>Top Keywords:</b><br>{top_kw}<extra></extra>",
-            showlegend=False
-        ))
-    
-        emo_ctr_cvr.update_layout(
-        xaxis_title="CTR (%)", yaxis_title="CVR (%)",
-        paper_bgcolor='rgba(0,0,0,0)', plot_bgcolor='rgba(30,30,40,0.3)',
-        height=500, font=dict(color='white'),
-        xaxis=dict(color='white'), yaxis=dict(color='white')
-    )
-    # 7. EMOTION BUBBLE ROAS/CPA
-    emo_roas_cpa = go.Figure()
-    if emo_rows:
-     for _, r in emo_agg.iterrows():
-        size = 40 + (r['Clicks'] / max_clicks_emo) * 100
-        top_kw = emo_top_keywords.get(r['emotion'], 'N/A')
-        emo_roas_cpa.add_trace(go.Scatter(
-            x=[r['ROAS']], y=[r['CPA']],
-            mode='markers+text',
-            text=[r['emotion']],
-            textposition='middle center',
-            textfont=dict(size=12, color='white', family='Arial'),  # optional: family
-            marker=dict(size=size, color=cmap[r['emotion']], opacity=0.8,
-                       line=dict(width=3, color='white')),
-            hovertemplate=f"<b>{r['emotion']}</b><br>" +
-                         f"ROAS: {r['ROAS']:.2f}x<br>" +
-                         f"CPA: ${r['CPA']:.2f}<br>" +
-                         f"<b>Clicks: {int(r['Clicks']):,}</b><br>" +
-                         f"<b>Top Keywords:</b><br>{top_kw}<extra></extra>",
-            showlegend=False
-        ))
-    
-    emo_roas_cpa.update_layout(
-        xaxis_title="ROAS", yaxis_title="CPA ($)",
-        paper_bgcolor='rgba(0,0,0,0)', plot_bgcolor='rgba(30,30,40,0.3)',
-        height=500, font=dict(color='white'),
-        xaxis=dict(color='white'), yaxis=dict(color='white')
-    )
-    # 8. CHARACTER LENGTH - aggregated by character count (1 bubble per char length)
-    # 8. CHARACTER LENGTH - aggregated by character count with top 3 keywords
-    char_grp_list = []
-    for char_count in d['Character_Count'].dropna().unique():
-       char_data = d[d['Character_Count'] == char_count]
-       top_keywords = char_data.nlargest(3, 'Clicks')['Keyword'].tolist()
-       top_clicks = char_data.nlargest(3, 'Clicks')['Clicks'].tolist()
-       keywords_text = '<br>'.join([f"  • {kw} ({int(c)} clicks)" for kw, c in zip(top_keywords, top_clicks)])
-       char_grp_list.append({
-        'Character_Count': char_count,
-        'Clicks': char_data['Clicks'].sum(),
-        'CTR': weighted_ctr(char_data),
-        'CVR': weighted_cvr(char_data),
-        'CPA': weighted_cpa(char_data),
-        'ROAS': weighted_roas(char_data),
-        'top_keywords': keywords_text
-    })
-    char_grp = pd.DataFrame(char_grp_list)
-    char_fig = make_subplots(rows=2, cols=2,
-                              subplot_titles=("CTR by Character Length", "CVR by Character Length",
-                                            "ROAS by Character Length", "CPA by Character Length"),
-                              vertical_spacing=0.12, horizontal_spacing=0.1)
-    max_char_clicks = char_grp['Clicks'].max()
-    char_grp['size'] = 10 + (char_grp['Clicks'] / max_char_clicks) * 40
-    char_fig.add_trace(go.Scatter(x=char_grp['Character_Count'], y=char_grp['CTR'],
-                                  mode='markers', marker=dict(size=char_grp['size'], color=COLORS['info'], opacity=0.7),
-                                  customdata=char_grp['top_keywords'],
-                                  hovertemplate='<b>Char Count: %{x}</b><br>CTR: %{y:.2f}%<br><br>Top Keywords:<br>%{customdata}<extra></extra>',
-                                  name='CTR'), row=1, col=1)
-    char_fig.add_trace(go.Scatter(x=char_grp['Character_Count'], y=char_grp['CVR'],
-                                   mode='markers', marker=dict(size=char_grp['size'], color=COLORS['success'], opacity=0.7),
-                                   customdata=char_grp['top_keywords'],
-                                   hovertemplate='<b>Char Count: %{x}</b><br>CVR: %{y:.2f}%<br><br>Top Keywords:<br>%{customdata}<extra></extra>',
-                                   name='CVR'), row=1, col=2)
-    char_fig.add_trace(go.Scatter(x=char_grp['Character_Count'], y=char_grp['ROAS'],
-                                   mode='markers', marker=dict(size=char_grp['size'], color=COLORS['primary'], opacity=0.7),
-                                   customdata=char_grp['top_keywords'],
-                                   hovertemplate='<b>Char Count: %{x}</b><br>ROAS: %{y:.2f}x<br><br>Top Keywords:<br>%{customdata}<extra></extra>',
-                                   name='ROAS'), row=2, col=1)
-    char_fig.add_trace(go.Scatter(x=char_grp['Character_Count'], y=char_grp['CPA'],
-                                   mode='markers', marker=dict(size=char_grp['size'], color=COLORS['warning'], opacity=0.7),
-                                   customdata=char_grp['top_keywords'],
-                                   hovertemplate='<b>Char Count: %{x}</b><br>CPA: $%{y:.2f}<br><br>Top Keywords:<br>%{customdata}<extra></extra>',
-                                   name='CPA'), row=2, col=2)
-    char_fig.update_xaxes(title_text="Character Count", title_font=dict(color='white'), tickfont=dict(color='white'),
-                          row=1, col=1)
-    char_fig.update_xaxes(title_text="Character Count", title_font=dict(color='white'), tickfont=dict(color='white'), row=1, col=2)
-    char_fig.update_xaxes(title_text="Character Count", title_font=dict(color='white'), tickfont=dict(color='white'), row=2, col=1)
-    char_fig.update_xaxes(title_text="Character Count", title_font=dict(color='white'), tickfont=dict(color='white'), row=2, col=2)
-    char_fig.update_yaxes(title_text="CTR (%)", title_font=dict(color='white'), tickfont=dict(color='white'), row=1, col=1)
-    char_fig.update_yaxes(title_text="CVR (%)", title_font=dict(color='white'), tickfont=dict(color='white'), row=1, col=2)
-    char_fig.update_yaxes(title_text="ROAS", title_font=dict(color='white'), tickfont=dict(color='white'), row=2, col=1)
-    char_fig.update_yaxes(title_text="CPA ($)", title_font=dict(color='white'), tickfont=dict(color='white'), row=2, col=2)
-    char_fig.update_layout(height=700, paper_bgcolor='rgba(0,0,0,0)', plot_bgcolor='rgba(30,30,40,0.3)', showlegend=False,font=dict(color='white'), xaxis=dict(color='white'),yaxis=dict(color='white'))
-    # 9. WORD COUNT - aggregated by word count (1 bubble per word count)
-    # 9. WORD COUNT - aggregated by word count (1 bubble per word count)
-    word_count_list = []
-    for word_count in d['Word_Count'].dropna().unique():
-       wc_data = d[d['Word_Count'] == word_count]
-       top_keywords = wc_data.nlargest(3, 'Clicks')['Keyword'].tolist()
-       top_clicks = wc_data.nlargest(3, 'Clicks')['Clicks'].tolist()
-       keywords_text = '<br>'.join([f"  • {kw} ({int(c)} clicks)" for kw, c in zip(top_keywords, top_clicks)])
-       word_count_list.append({
-        'Word_Count': word_count,
-        'Clicks': wc_data['Clicks'].sum(),
-        'CTR': weighted_ctr(wc_data),
-        'CVR': weighted_cvr(wc_data),
-        'CPA': weighted_cpa(wc_data),
-        'ROAS': weighted_roas(wc_data),
-        'top_keywords': keywords_text})
-    word_grp = pd.DataFrame(word_count_list)
-    word_count_fig = make_subplots(rows=2, cols=2,
-                                subplot_titles=("CTR by Word Count", "CVR by Word Count",
-                                              "ROAS by Word Count", "CPA by Word Count"),
-                                vertical_spacing=0.12, horizontal_spacing=0.1)
-    max_word_clicks = word_grp['Clicks'].max()
-    word_grp['size'] = 10 + (word_grp['Clicks'] / max_word_clicks) * 40
-    word_count_fig.add_trace(go.Scatter(x=word_grp['Word_Count'], y=word_grp['CTR'],mode='markers', marker=dict(size=word_grp['size'], color=COLORS['info'], opacity=0.7), customdata=word_grp['top_keywords'], hovertemplate='<b>Word Count: %{x}</b><br>CTR: %{y:.2f}%<br><br>Top Keywords:<br>%{customdata}<extra></extra>',name='CTR'), row=1, col=1)
-    word_count_fig.add_trace(go.Scatter(x=word_grp['Word_Count'], y=word_grp['CVR'],mode='markers', marker=dict(size=word_grp['size'], color=COLORS['success'], opacity=0.7),customdata=word_grp['top_keywords'], hovertemplate='<b>Word Count: %{x}</b><br>CVR: %{y:.2f}%<br><br>Top Keywords:<br>%{customdata}<extra></extra>', name='CVR'), row=1, col=2)
-    word_count_fig.add_trace(go.Scatter(x=word_grp['Word_Count'], y=word_grp['ROAS'],mode='markers', marker=dict(size=word_grp['size'], color=COLORS['primary'], opacity=0.7),customdata=word_grp['top_keywords'],hovertemplate='<b>Word Count: %{x}</b><br>ROAS: %{y:.2f}x<br><br>Top Keywords:<br>%{customdata}<extra></extra>',name='ROAS'), row=2, col=1)
-    word_count_fig.add_trace(go.Scatter(x=word_grp['Word_Count'], y=word_grp['CPA'],mode='markers', marker=dict(size=word_grp['size'], color=COLORS['warning'], opacity=0.7),customdata=word_grp['top_keywords'],hovertemplate='<b>Word Count: %{x}</b><br>CPA: $%{y:.2f}<br><br>Top Keywords:<br>%{customdata}<extra></extra>',name='CPA'), row=2, col=2)
-    word_count_fig.update_xaxes(title_text="Word Count", title_font=dict(color='white'), tickfont=dict(color='white'), row=1, col=1)
-    word_count_fig.update_xaxes(title_text="Word Count", title_font=dict(color='white'), tickfont=dict(color='white'), row=1, col=2)
-    word_count_fig.update_xaxes(title_text="Word Count", title_font=dict(color='white'), tickfont=dict(color='white'), row=2, col=1)
-    word_count_fig.update_xaxes(title_text="Word Count", title_font=dict(color='white'), tickfont=dict(color='white'), row=2, col=2)
-    word_count_fig.update_yaxes(title_text="CTR (%)", title_font=dict(color='white'), tickfont=dict(color='white'), row=1, col=1)
-    word_count_fig.update_yaxes(title_text="CVR (%)", title_font=dict(color='white'), tickfont=dict(color='white'), row=1, col=2)
-    word_count_fig.update_yaxes(title_text="ROAS", title_font=dict(color='white'), tickfont=dict(color='white'), row=2, col=1)
-    word_count_fig.update_yaxes(title_text="CPA ($)", title_font=dict(color='white'), tickfont=dict(color='white'), row=2, col=2)
-    word_count_fig.update_layout(
-      height=700,
-      paper_bgcolor='rgba(0,0,0,0)',
-      plot_bgcolor='rgba(30,30,40,0.3)',
-      showlegend=False,
-      font=dict(color='white')
-)
-    
-    # DEBUG SPECIFICITY
-    
-    
-    # SPECIFICITY SCORE ANALYSIS - aggregated by specificity score
-    # SPECIFICITY SCORE ANALYSIS with Top 3 Keywords
-    if 'Specificity_Score' in d.columns and d['Specificity_Score'].notna().any():
-    # Get aggregated data AND top 3 keywords per specificity score
-        spec_data = []
-        for score in d['Specificity_Score'].dropna().unique():
-           score_data = d[d['Specificity_Score'] == score]
-           top_keywords = score_data.nlargest(3, 'Clicks')['Keyword'].tolist()
-           top_clicks = score_data.nlargest(3, 'Clicks')['Clicks'].tolist()
-           keywords_text = '<br>'.join([f"  • {kw} ({int(c)} clicks)" for kw, c in zip(top_keywords, top_clicks)])
-           spec_data.append({
-            'Specificity_Score': score,
-            'Clicks': score_data['Clicks'].sum(),
-            'CTR': weighted_ctr(score_data),
-            'CVR': weighted_cvr(score_data),
-            'CPA': weighted_cpa(score_data),
-            'ROAS': weighted_roas(score_data),
-            'top_keywords': keywords_text
-        })
-        spec_grp = pd.DataFrame(spec_data)
-        order_map = {'Low': 0, 'Medium': 1, 'High': 2, 'Unknown': 3}
-        spec_grp['sort_order'] = spec_grp['Specificity_Score'].map(order_map)
-        spec_grp = spec_grp.sort_values('sort_order')
-        specificity_fig = make_subplots(rows=2, cols=2,
-                                     subplot_titles=("CTR by Specificity", "CVR by Specificity",
-                                                   "ROAS by Specificity", "CPA by Specificity"),
-                                     vertical_spacing=0.12, horizontal_spacing=0.1)
-        max_spec_clicks = spec_grp['Clicks'].max()
-        spec_grp['size'] = 10 + (spec_grp['Clicks'] / max_spec_clicks) * 40
-    # CTR
-        specificity_fig.add_trace(go.Scatter(
-          x=spec_grp['Specificity_Score'], y=spec_grp['CTR'],mode='markers', marker=dict(size=spec_grp['size'], color=COLORS['info'], opacity=0.7), customdata=spec_grp['top_keywords'], hovertemplate='<b>Specificity: %{x}</b><br>CTR: %{y:.2f}%<br><br>Top Keywords:<br>%{customdata}<extra></extra>', name='CTR'), row=1, col=1)
-    # CVR
-        specificity_fig.add_trace(go.Scatter(
-          x=spec_grp['Specificity_Score'], y=spec_grp['CVR'], mode='markers', marker=dict(size=spec_grp['size'], color=COLORS['success'], opacity=0.7),customdata=spec_grp['top_keywords'], hovertemplate='<b>Specificity: %{x}</b><br>CVR: %{y:.2f}%<br><br>Top Keywords:<br>%{customdata}<extra></extra>',name='CVR'), row=1, col=2)
-    # ROAS
-        specificity_fig.add_trace(go.Scatter(
-          x=spec_grp['Specificity_Score'], y=spec_grp['ROAS'],mode='markers', marker=dict(size=spec_grp['size'], color=COLORS['primary'], opacity=0.7), customdata=spec_grp['top_keywords'], hovertemplate='<b>Specificity: %{x}</b><br>ROAS: %{y:.2f}x<br><br>Top Keywords:<br>%{customdata}<extra></extra>', name='ROAS'), row=2, col=1)
-    # CPA
-        specificity_fig.add_trace(go.Scatter(x=spec_grp['Specificity_Score'], y=spec_grp['CPA'],mode='markers', marker=dict(size=spec_grp['size'], color=COLORS['warning'], opacity=0.7), customdata=spec_grp['top_keywords'], hovertemplate='<b>Specificity: %{x}</b><br>CPA: $%{y:.2f}<br><br>Top Keywords:<br>%{customdata}<extra></extra>',name='CPA'), row=2, col=2)
-        specificity_fig.update_xaxes(title_text="Specificity Score", color='white', row=1, col=1, categoryorder='array', categoryarray=['Low', 'Medium', 'High', 'Unknown'])
-        specificity_fig.update_xaxes(title_text="Specificity Score", color='white', row=1, col=2, categoryorder='array', categoryarray=['Low', 'Medium', 'High', 'Unknown'])
-        specificity_fig.update_xaxes(title_text="Specificity Score", color='white', row=2, col=1, categoryorder='array', categoryarray=['Low', 'Medium', 'High', 'Unknown'])
-        specificity_fig.update_xaxes(title_text="Specificity Score", color='white', row=2, col=2, categoryorder='array', categoryarray=['Low', 'Medium', 'High', 'Unknown'])
-        specificity_fig.update_yaxes(title_text="CTR (%)", color='white', row=1, col=1)
-        specificity_fig.update_yaxes(title_text="CVR (%)", color='white', row=1, col=2)
-        specificity_fig.update_yaxes(title_text="ROAS", color='white', row=2, col=1)
-        specificity_fig.update_yaxes(title_text="CPA ($)", color='white', row=2, col=2)
-        specificity_fig.update_layout(
-          height=700,
-          paper_bgcolor='rgba(0,0,0,0)',
-          plot_bgcolor='rgba(30,30,40,0.3)',
-          showlegend=False,
-          font=dict(color='white')
-    )
-    else:
-        specificity_fig = go.Figure()
-        
-    # URGENCY LEVEL ANALYSIS with Top 3 Keywords - ORDERED Low, Medium, High
-    if 'Urgency_Level' in d.columns and d['Urgency_Level'].notna().any():
-        urgency_data = []
-        for level in d['Urgency_Level'].dropna().unique():
-            level_data = d[d['Urgency_Level'] == level]
-            top_keywords = level_data.nlargest(3, 'Clicks')['Keyword'].tolist()
-            top_clicks = level_data.nlargest(3, 'Clicks')['Clicks'].tolist()
-            keywords_text = '<br>'.join([f"  • {kw} ({int(c)} clicks)" for kw, c in zip(top_keywords, top_clicks)])
-            urgency_data.append({
-                'Urgency_Level': level,
-                'Clicks': level_data['Clicks'].sum(),
-                'CTR': weighted_ctr(level_data),
-                'CVR': weighted_cvr(level_data),
-                'CPA': weighted_cpa(level_data),
-                'ROAS': weighted_roas(level_data),
-                'top_keywords': keywords_text
-            })
-        
-        urgency_grp = pd.DataFrame(urgency_data)
-        
-        # Order: Low, Medium, High
-        order_map = {'Low': 0, 'Medium': 1, 'High': 2, 'Unknown': 3}
-        urgency_grp['sort_order'] = urgency_grp['Urgency_Level'].map(order_map)
-        urgency_grp = urgency_grp.sort_values('sort_order')
-        
-        urgency_fig = make_subplots(rows=2, cols=2,
-                                     subplot_titles=("CTR by Urgency", "CVR by Urgency",
-                                                   "ROAS by Urgency", "CPA by Urgency"),
-                                     vertical_spacing=0.12, horizontal_spacing=0.1)
-        
-        max_urgency_clicks = urgency_grp['Clicks'].max()
-        urgency_grp['size'] = 10 + (urgency_grp['Clicks'] / max_urgency_clicks) * 40
-        
-        # CTR
-        urgency_fig.add_trace(go.Scatter(
-            x=urgency_grp['Urgency_Level'], y=urgency_grp['CTR'],
-            mode='markers', marker=dict(size=urgency_grp['size'], color=COLORS['info'], opacity=0.7), 
-            customdata=urgency_grp['top_keywords'], 
-            hovertemplate='<b>Urgency: %{x}</b><br>CTR: %{y:.2f}%<br><br>Top Keywords:<br>%{customdata}<extra></extra>',
-            name='CTR'), row=1, col=1)
-        
-        # CVR
-        urgency_fig.add_trace(go.Scatter(
-            x=urgency_grp['Urgency_Level'], y=urgency_grp['CVR'],
-            mode='markers', marker=dict(size=urgency_grp['size'], color=COLORS['success'], opacity=0.7),
-            customdata=urgency_grp['top_keywords'], 
-            hovertemplate='<b>Urgency: %{x}</b><br>CVR: %{y:.2f}%<br><br>Top Keywords:<br>%{customdata}<extra></extra>',
-            name='CVR'), row=1, col=2)
-        
-        # ROAS
-        urgency_fig.add_trace(go.Scatter(
-            x=urgency_grp['Urgency_Level'], y=urgency_grp['ROAS'],
-            mode='markers', marker=dict(size=urgency_grp['size'], color=COLORS['primary'], opacity=0.7), 
-            customdata=urgency_grp['top_keywords'], 
-            hovertemplate='<b>Urgency: %{x}</b><br>ROAS: %{y:.2f}x<br><br>Top Keywords:<br>%{customdata}<extra></extra>', 
-            name='ROAS'), row=2, col=1)
-        
-        # CPA
-        urgency_fig.add_trace(go.Scatter(
-            x=urgency_grp['Urgency_Level'], y=urgency_grp['CPA'],
-            mode='markers', marker=dict(size=urgency_grp['size'], color=COLORS['warning'], opacity=0.7), 
-            customdata=urgency_grp['top_keywords'], 
-            hovertemplate='<b>Urgency: %{x}</b><br>CPA: $%{y:.2f}<br><br>Top Keywords:<br>%{customdata}<extra></extra>',
-            name='CPA'), row=2, col=2)
-        
-        urgency_fig.update_xaxes(title_text="Urgency Level", color='white', row=1, col=1, categoryorder='array', categoryarray=['Low', 'Medium', 'High', 'Unknown'])
-        urgency_fig.update_xaxes(title_text="Urgency Level", color='white', row=1, col=2, categoryorder='array', categoryarray=['Low', 'Medium', 'High', 'Unknown'])
-        urgency_fig.update_xaxes(title_text="Urgency Level", color='white', row=2, col=1, categoryorder='array', categoryarray=['Low', 'Medium', 'High', 'Unknown'])
-        urgency_fig.update_xaxes(title_text="Urgency Level", color='white', row=2, col=2, categoryorder='array', categoryarray=['Low', 'Medium', 'High', 'Unknown'])
-        urgency_fig.update_yaxes(title_text="CTR (%)", color='white', row=1, col=1)
-        urgency_fig.update_yaxes(title_text="CVR (%)", color='white', row=1, col=2)
-        urgency_fig.update_yaxes(title_text="ROAS", color='white', row=2, col=1)
-        urgency_fig.update_yaxes(title_text="CPA ($)", color='white', row=2, col=2)
-        urgency_fig.update_layout(
-            height=700,
-            paper_bgcolor='rgba(0,0,0,0)',
-            plot_bgcolor='rgba(30,30,40,0.3)',
-            showlegend=False,
-            font=dict(color='white')
-        )
-    else:
-        urgency_fig = go.Figure()    
-    # 10. NUMBER PRESENT - bubble chart
-    # 10. NUMBER PRESENT - bubble chart with top keywords
-    # Number Present - aggregate data for Yes/No
-    num_present_list = []
-    for num_val in d['Is_Number_Present'].dropna().unique():
-        num_subset = d[d['Is_Number_Present'] == num_val]
-        if len(num_subset) > 0:
-            top_keywords = num_subset.nlargest(3, 'Clicks')['Keyword'].tolist()
-            top_clicks = num_subset.nlargest(3, 'Clicks')['Clicks'].tolist()
-            keywords_text = '<br>'.join([f"• {kw} ({int(c)} clicks)" 
-                                     for kw, c in zip(top_keywords, top_clicks)])
-        
-            num_present_list.append({
-            'Is_Number_Present': num_val,
-            'Clicks': num_subset['Clicks'].sum(),
-            'CTR': weighted_ctr(num_subset),
-            'CVR': weighted_cvr(num_subset),
-            'CPA': weighted_cpa(num_subset),
-            'ROAS': weighted_roas(num_subset),
-            'top_keywords': keywords_text
-        })
-
-    num_grp = pd.DataFrame(num_present_list)
-    num_fig = make_subplots(rows=2, cols=2, 
-                        subplot_titles=("CTR", "CVR", "ROAS", "CPA"),
-                        vertical_spacing=0.15, horizontal_spacing=0.15)
-
-    max_num_clicks = num_grp['Clicks'].max()
-    for _, r in num_grp.iterrows():
-        size = 40 + (r['Clicks'] / max_num_clicks) * 60
-    
-        num_fig.add_trace(go.Scatter(
-         x=[r['Is_Number_Present']], y=[r['CTR']],
-         mode='markers+text',
-         text=[f"{r['CTR']:.1f}%"],
-         textposition='middle center',
-         textfont=dict(size=11, color='white'),
-         marker=dict(size=size, color=COLORS['info'], opacity=0.8),
-         customdata=[[r['Clicks'], r['top_keywords']]],
-         hovertemplate=f"<b>Number Present: %{{x}}</b><br>" +
-                     f"CTR: %{{y:.2f}}%<br>" +
-                     f"<b>Clicks: %{{customdata[0]:,}}</b><br>" +
-                     f"<b>Top Keywords:</b><br>%{{customdata[1]}}<extra></extra>",
-         showlegend=False), row=1, col=1)
-    
-        num_fig.add_trace(go.Scatter(
-         x=[r['Is_Number_Present']], y=[r['CVR']],
-         mode='markers+text',
-         text=[f"{r['CVR']:.1f}%"],
-         textposition='middle center',
-         textfont=dict(size=11, color='white'),
-         marker=dict(size=size, color=COLORS['success'], opacity=0.8),
-         customdata=[[r['Clicks'], r['top_keywords']]],
-         hovertemplate=f"<b>Number Present: %{{x}}</b><br>" +
-                     f"CVR: %{{y:.2f}}%<br>" +
-                     f"<b>Clicks: %{{customdata[0]:,}}</b><br>" +
-                     f"<b>Top Keywords:</b><br>%{{customdata[1]}}<extra></extra>",
-         showlegend=False), row=1, col=2)
-    
-        num_fig.add_trace(go.Scatter(
-         x=[r['Is_Number_Present']], y=[r['ROAS']],
-         mode='markers+text',
-         text=[f"{r['ROAS']:.1f}x"],
-         textposition='middle center',
-         textfont=dict(size=11, color='white'),
-         marker=dict(size=size, color=COLORS['primary'], opacity=0.8),
-         customdata=[[r['Clicks'], r['top_keywords']]],
-         hovertemplate=f"<b>Number Present: %{{x}}</b><br>" +
-                     f"ROAS: %{{y:.2f}}x<br>" +
-                     f"<b>Clicks: %{{customdata[0]:,}}</b><br>" +
-                     f"<b>Top Keywords:</b><br>%{{customdata[1]}}<extra></extra>",
-         showlegend=False), row=2, col=1)
-    
-        num_fig.add_trace(go.Scatter(
-         x=[r['Is_Number_Present']], y=[r['CPA']],
-         mode='markers+text',
-         text=[f"${r['CPA']:.1f}"],
-         textposition='middle center',
-         textfont=dict(size=11, color='white'),
-         marker=dict(size=size, color=COLORS['warning'], opacity=0.8),
-         customdata=[[r['Clicks'], r['top_keywords']]],
-         hovertemplate=f"<b>Number Present: %{{x}}</b><br>" +
-                     f"CPA: $%{{y:.2f}}<br>" +
-                     f"<b>Clicks: %{{customdata[0]:,}}</b><br>" +
-                     f"<b>Top Keywords:</b><br>%{{customdata[1]}}<extra></extra>",
-         showlegend=False), row=2, col=2)
-
-        num_fig.update_xaxes(title_text="Number Present", row=1, col=1)
-        num_fig.update_xaxes(title_text="Number Present", row=1, col=2)
-        num_fig.update_xaxes(title_text="Number Present", row=2, col=1)
-        num_fig.update_xaxes(title_text="Number Present", row=2, col=2)
-        num_fig.update_layout(
-            height=600, 
-            paper_bgcolor='rgba(0,0,0,0)', 
-            plot_bgcolor='rgba(30,30,40,0.3)',
-            font=dict(color='white'),
-            xaxis=dict(color='white'),
-            yaxis=dict(color='white'))
-        
-    # 11. NUMBER POSITION - bubble chart
-    # 11. NUMBER POSITION - bubble chart with top keywords
-    # Number Position - aggregate by position
-    num_pos_list = []
-    for pos in sorted(d[d['Position_of_Number'].notna()]['Position_of_Number'].unique()):
-       pos_subset = d[d['Position_of_Number'] == pos]
-       if len(pos_subset) > 0:
-            top_keywords = pos_subset.nlargest(3, 'Clicks')['Keyword'].tolist()
-            top_clicks = pos_subset.nlargest(3, 'Clicks')['Clicks'].tolist()
-            keywords_text = '<br>'.join([f"• {kw} ({int(c)} clicks)" 
-                                     for kw, c in zip(top_keywords, top_clicks)])
-        
-            num_pos_list.append({
-            'Position_of_Number': int(pos),  # Convert to int for cleaner display
-            'Clicks': pos_subset['Clicks'].sum(),
-            'CTR': weighted_ctr(pos_subset),
-            'CVR': weighted_cvr(pos_subset),
-            'CPA': weighted_cpa(pos_subset),
-            'ROAS': weighted_roas(pos_subset),
-            'top_keywords': keywords_text
-        })
-
-    num_pos_grp = pd.DataFrame(num_pos_list)
-    num_pos_fig = make_subplots(rows=2, cols=2,
-                            subplot_titles=("CTR by Number Position", "CVR by Number Position",
-                                          "ROAS by Number Position", "CPA by Number Position"),
-                            vertical_spacing=0.15, horizontal_spacing=0.15)
-    if not num_pos_grp.empty:
-        max_pos_clicks = num_pos_grp['Clicks'].max()
-        num_pos_grp['size'] = 10 + (num_pos_grp['Clicks'] / max_pos_clicks) * 30
-    
-    # CTR
-        num_pos_fig.add_trace(go.Scatter(
-            x=num_pos_grp['Position_of_Number'], y=num_pos_grp['CTR'],
-            mode='markers+text',
-            text=num_pos_grp['CTR'].apply(lambda x: f"{x:.1f}%"),
-            textposition='top center',
-            textfont=dict(size=10, color='white'),
-            marker=dict(size=num_pos_grp['size'], color=COLORS['info'], opacity=0.8),
-            customdata=list(zip(num_pos_grp['Clicks'], num_pos_grp['top_keywords'])),
-            hovertemplate='<b>Position: %{x}</b><br>CTR: %{y:.2f}%<br><b>Clicks: %{customdata[0]:,}</b><br><br>Top Keywords:<br>%{customdata[1]}<extra></extra>',
-            showlegend=False), row=1, col=1)
-    
-        num_pos_fig.add_trace(go.Scatter(
-            x=num_pos_grp['Position_of_Number'], y=num_pos_grp['CVR'],
-            mode='markers+text',
-            text=num_pos_grp['CVR'].apply(lambda x: f"{x:.1f}%"),
-            textposition='top center',
-            textfont=dict(size=10, color='white'),
-            marker=dict(size=num_pos_grp['size'], color=COLORS['success'], opacity=0.8),
-            customdata=list(zip(num_pos_grp['Clicks'], num_pos_grp['top_keywords'])),
-            hovertemplate='<b>Position: %{x}</b><br>CVR: %{y:.2f}%<br><b>Clicks: %{customdata[0]:,}</b><br><br>Top Keywords:<br>%{customdata[1]}<extra></extra>',
-            showlegend=False), row=1, col=2)
-    
-    # ROAS
-        num_pos_fig.add_trace(go.Scatter(
-            x=num_pos_grp['Position_of_Number'], y=num_pos_grp['ROAS'],
-            mode='markers+text',
-            text=num_pos_grp['ROAS'].apply(lambda x: f"{x:.1f}x"),
-            textposition='top center',
-            textfont=dict(size=10, color='white'),
-            marker=dict(size=num_pos_grp['size'], color=COLORS['primary'], opacity=0.8),
-            customdata=list(zip(num_pos_grp['Clicks'], num_pos_grp['top_keywords'])),
-            hovertemplate='<b>Position: %{x}</b><br>ROAS: %{y:.2f}x<br><b>Clicks: %{customdata[0]:,}</b><br><br>Top Keywords:<br>%{customdata[1]}<extra></extra>',
-            showlegend=False), row=2, col=1)
-    
-    # CPA
-        num_pos_fig.add_trace(go.Scatter(
-            x=num_pos_grp['Position_of_Number'], y=num_pos_grp['CPA'],
-            mode='markers+text',
-            text=num_pos_grp['CPA'].apply(lambda x: f"${x:.1f}"),
-            textposition='top center',
-            textfont=dict(size=10, color='white'),
-            marker=dict(size=num_pos_grp['size'], color=COLORS['warning'], opacity=0.8),
-            customdata=list(zip(num_pos_grp['Clicks'], num_pos_grp['top_keywords'])),
-            hovertemplate='<b>Position: %{x}</b><br>CPA: $%{y:.2f}<br><b>Clicks: %{customdata[0]:,}</b><br><br>Top Keywords:<br>%{customdata[1]}<extra></extra>',
-            showlegend=False), row=2, col=2)
-
-    num_pos_fig.update_xaxes(title_text="Position", row=1, col=1)
-    num_pos_fig.update_xaxes(title_text="Position", row=1, col=2)
-    num_pos_fig.update_xaxes(title_text="Position", row=2, col=1)
-    num_pos_fig.update_xaxes(title_text="Position", row=2, col=2)
-    num_pos_fig.update_layout(
-    height=600,
-    paper_bgcolor='rgba(0,0,0,0)',
-    plot_bgcolor='rgba(30,30,40,0.3)',
-    font=dict(color='white'),
-    xaxis=dict(color='white'),
-    yaxis=dict(color='white')
-)
-    
-    # 12. QUESTION ANALYSIS - bubble chart
-    # 12. QUESTION ANALYSIS - bubble chart with top keywords
-    question_data = []
-    for is_q in d['Is_Question'].dropna().unique():
-        q_subset = d[d['Is_Question'] == is_q]
-        top_keywords = q_subset.nlargest(3, 'Clicks')['Keyword'].tolist()
-        top_clicks = q_subset.nlargest(3, 'Clicks')['Clicks'].tolist()
-        keywords_text = '<br>'.join([f"• {kw} ({int(c)} clicks)" 
-                                 for kw, c in zip(top_keywords, top_clicks)])
-    
-        question_data.append({
-        'Is_Question': is_q,
-        'Clicks': q_subset['Clicks'].sum(),
-        'CTR': weighted_ctr(q_subset),
-        'CVR': weighted_cvr(q_subset),
-        'CPA': weighted_cpa(q_subset),
-        'ROAS': weighted_roas(q_subset),
-        'top_keywords': keywords_text
-    })
-
-    question_grp = pd.DataFrame(question_data)
-    question_fig = make_subplots(rows=2, cols=2,
-                            subplot_titles=("CTR", "CVR", "ROAS", "CPA"),
-                            vertical_spacing=0.15, horizontal_spacing=0.15)
-
-    max_q_clicks = question_grp['Clicks'].max()
-    for _, r in question_grp.iterrows():
-        size = 60 + (r['Clicks'] / max_q_clicks) * 80
-    
-        question_fig.add_trace(go.Scatter(
-          x=[r['Is_Question']], y=[r['CTR']],
-          mode='markers+text',
-          text=[f"{r['CTR']:.1f}%"],
-          textposition='middle center',
-          textfont=dict(size=11, color='white'),
-          marker=dict(size=size, color=COLORS['info'], opacity=0.8),
-          customdata=[[r['Clicks'], r['top_keywords']]],
-          hovertemplate=f"<b>Is Question: %{{x}}</b><br>CTR: %{{y:.2f}}%<br>" +
-                     f"<b>Clicks: %{{customdata[0]:,}}</b><br>" +
-                     f"<b>Top Keywords:</b><br>%{{customdata[1]}}<extra></extra>",showlegend=False), row=1, col=1)
-    
-        question_fig.add_trace(go.Scatter(
-          x=[r['Is_Question']], y=[r['CVR']],
-          mode='markers+text',
-          text=[f"{r['CVR']:.1f}%"],
-          textposition='middle center',
-          textfont=dict(size=11, color='white'),
-          marker=dict(size=size, color=COLORS['success'], opacity=0.8),
-          customdata=[[r['Clicks'], r['top_keywords']]],
-          hovertemplate=f"<b>Is Question: %{{x}}</b><br>CVR: %{{y:.2f}}%<br>" +
-                     f"<b>Clicks: %{{customdata[0]:,}}</b><br>" +
-                     f"<b>Top Keywords:</b><br>%{{customdata[1]}}<extra></extra>",showlegend=False), row=1, col=2)
-    
-        question_fig.add_trace(go.Scatter(
-          x=[r['Is_Question']], y=[r['ROAS']],
-          mode='markers+text',
-          text=[f"{r['ROAS']:.1f}x"],
-          textposition='middle center',
-          textfont=dict(size=11, color='white'),
-          marker=dict(size=size, color=COLORS['primary'], opacity=0.8),
-          customdata=[[r['Clicks'], r['top_keywords']]],
-          hovertemplate=f"<b>Is Question: %{{x}}</b><br>ROAS: %{{y:.2f}}x<br>" +
-                     f"<b>Clicks: %{{customdata[0]:,}}</b><br>" +
-                     f"<b>Top Keywords:</b><br>%{{customdata[1]}}<extra></extra>",showlegend=False), row=2, col=1)
-    
-        question_fig.add_trace(go.Scatter(
-          x=[r['Is_Question']], y=[r['CPA']],
-          mode='markers+text',
-          text=[f"${r['CPA']:.1f}"],
-          textposition='middle center',
-          textfont=dict(size=11, color='white'),
-          marker=dict(size=size, color=COLORS['warning'], opacity=0.8),
-          customdata=[[r['Clicks'], r['top_keywords']]],
-          hovertemplate=f"<b>Is Question: %{{x}}</b><br>CPA: $%{{y:.2f}}<br>" +
-                     f"<b>Clicks: %{{customdata[0]:,}}</b><br>" +
-                     f"<b>Top Keywords:</b><br>%{{customdata[1]}}<extra></extra>",showlegend=False), row=2, col=2)
+    if d.shape[0] == 0:
+        return None
 
-        question_fig.update_xaxes(title_text="Is Question", row=1, col=1)
-        question_fig.update_xaxes(title_text="Is Question", row=1, col=2)
-        question_fig.update_xaxes(title_text="Is Question", row=2, col=1)
-        question_fig.update_xaxes(title_text="Is Question", row=2, col=2)
-        question_fig.update_layout(
-            height=600,paper_bgcolor='rgba(0,0,0,0)',plot_bgcolor='rgba(30,30,40,0.3)',font=dict(color='white'),xaxis=dict(color='white'),yaxis=dict(color='white')
-)
-    # Table preview
-    # Table preview
-    preview_cols = ['Keyword', 'Clicks', 'CTR', 'CVR', 'CPA', 'ROAS', 'Campaign_Type', 'Query_Type']
-    # Only keep columns that exist in the dataframe
-    preview_cols = [col for col in preview_cols if col in d.columns]
-    preview_df = d[preview_cols].sort_values('Clicks', ascending=False).head(100)
-    
-    print(f"Preview table shape: {preview_df.shape}")  # Debug
-    print(f"Preview columns: {preview_df.columns.tolist()}")  # Debug
-    
-    table_children = dash_table.DataTable(
-    data=preview_df.to_dict('records'),
-    columns=[{"name": i, "id": i} for i in preview_df.columns],
-    page_size=30,
-    page_current=0,
-    style_table={'overflowX': 'auto'},
-    style_cell={
-        'textAlign': 'left',
-        'backgroundColor': '#121419',
-        'color': '#E5E7EB',
-        'border': '1px solid #2d3748',
-        'padding': '8px'
-    },
-    style_header={
-        'backgroundColor': '#1a1a1a',
-        'fontWeight': 'bold',
-        'color': '#00D9FF',
-        'border': '1px solid #2d3748'
-    },
-    style_data_conditional=[
-        {
-            'if': {'row_index': 'odd'},
-            'backgroundColor': '#1a1f2e'
-        }
-    ]
+    stat_row = stat_cards(c.get('totals'))
+    check_wanted(still_wanted)
+    charts = build_charts(KEYWORD_CHARTS, c, still_wanted)
+    last_computations['keyword'] = c
+    with span('encode figures'):
+        return stat_row, finish_figures(*(charts[i] for i in KEYWORD_FIGURE_IDS))
+@app.callback(
+    Output('keyword-table', 'data'),
+    Output('keyword-table', 'page_count'),
+    Input('keyword-table', 'page_current'),
+    Input('keyword-table', 'page_size'),
+    Input('keyword-table', 'sort_by'),
+    Input('keyword-table', 'filter_query'),
+    State('objective-dropdown','value'),
+    State('advertiser-dropdown','value'),
+    State('campaign-type-dropdown','value'),
+    State('campaign-dropdown','value')
 )
-    if hasattr(fig_cat, 'data') and len(fig_cat.data) > 0:
-        print(f"First trace type: {type(fig_cat.data[0])}")
-        print(f"First trace x data: {fig_cat.data[0].x if hasattr(fig_cat.data[0], 'x') else 'NO X'}")
-    gc.collect()
-    return (stat_row, treemap_ctr_cvr, treemap_cpa_roas,
-        fig_cat, keyword_category_fig, emo_ctr_cvr, emo_roas_cpa, char_fig, specificity_fig,urgency_fig, word_count_fig,
-        num_fig, num_pos_fig, question_fig, table_children)
-# Download callback
+def update_keyword_table(page_current, page_size, sort_by, filter_query, obj, adv, ctype, camp):
+    return table_page('keyword', KEYWORD_PREVIEW_COLS, (obj, adv, ctype, camp),
+                      page_current, page_size, sort_by, filter_query)
+# Download buttons queue a background export job; poll_export_job tracks it
 @app.callback(
-    Output("download-data", "data"),
+    Output('export-job', 'data', allow_duplicate=True),
     Input("download-btn", "n_clicks"),
     State('objective-dropdown','value'),
     State('advertiser-dropdown','value'),
@@ -1711,15 +1617,10 @@ def update_dashboard(obj, adv, ctype, camp, active_tab):
 def download_data(n, obj, adv, ctype, camp):
     if n is None:
         raise PreventUpdate
-    d = work.copy()
-    if obj: d = d[d['Campaign_Objective']==obj]
-    if adv: d = d[d['Advertiser']==adv]
-    if ctype: d = d[d['Campaign_Type']==ctype]
-    if camp: d = d[d['Campaign']==camp]
-    return dcc.send_data_frame(d.to_csv, "filtered_data.csv", index=False)
+    return {'id': start_export('filtered_data', (obj, adv, ctype, camp))}
 
 @app.callback(
-    Output("download-keyword-category", "data"),
+    Output('export-job', 'data', allow_duplicate=True),
     Input("download-keyword-category-btn", "n_clicks"),
     State('objective-dropdown','value'),
     State('advertiser-dropdown','value'),
@@ -1727,28 +1628,35 @@ def download_data(n, obj, adv, ctype, camp):
     State('campaign-dropdown','value'),
     prevent_initial_call=True
 )
-
-
-
 def download_keyword_category(n, obj, adv, ctype, camp):
     if n is None:
         raise PreventUpdate
-    d = work.copy()
-    if obj: d = d[d['Campaign_Objective']==obj]
-    if adv: d = d[d['Advertiser']==adv]
-    if ctype: d = d[d['Campaign_Type']==ctype]
-    if camp: d = d[d['Campaign']==camp]
-    
-    if 'Keyword_Category' in d.columns and d['Keyword_Category'].notna().any():
-        kw_cat = d.groupby('Keyword_Category').apply(lambda g: pd.Series({
-            'Clicks': g['Clicks'].sum(),
-            'CTR': weighted_ctr(g),
-            'CVR': weighted_cvr(g),
-            'CPA': weighted_cpa(g),
-            'ROAS': weighted_roas(g)
-        })).reset_index()
-        return dcc.send_data_frame(kw_cat.to_csv, "keyword_category_analysis.csv", index=False)
-    return None
+    return {'id': start_export('keyword_category_analysis', (obj, adv, ctype, camp))}
+
+@app.callback(
+    Output('export-status', 'children'),
+    Output('export-poll', 'disabled'),
+    Input('export-job', 'data'),
+    Input('export-poll', 'n_intervals'),
+    prevent_initial_call=True
+)
+def poll_export_job(job, _):
+    status = export_queue.status(job['id']) if job else None
+    if status is None:
+        return None, True
+    if status['state'] == 'done':
+        href = app.get_relative_path(f"/export/jobs/{status['id']}/file")
+        return dbc.Alert([f"✅ {status['filename']} is ready - ",
+                          html.A("download", href=href, className='alert-link')],
+                         color='success', dismissable=True), True
+    if status['state'] == 'failed':
+        return dbc.Alert(f"❌ Export failed: {status['error']}", color='danger', dismissable=True), True
+    pct = int(status['progress'] * 100)
+    rows = f" ({status['rows_done']:,} / {status['rows_total']:,} rows)" if status['rows_total'] else ""
+    return html.Div([
+        html.Div(f"⏳ Preparing {status['filename']}{rows}", className='small-muted'),
+        dbc.Progress(value=pct, label=f"{pct}%", striped=True, animated=True)
+    ]), False
 # ==================== DOMAIN TAB CALLBACKS ====================
 # Domain dropdown population
 # Domain main update
@@ -1762,310 +1670,65 @@ def download_keyword_category(n, obj, adv, ctype, camp):
     Output('domain_category_ctr_cvr','figure'),
     Output('domain_category_roas_cpa','figure'),
     Output('domain_table_preview','children'),
+    Output('domain-figure-signatures','data'),
     Input('objective-dropdown','value'),
     Input('advertiser-dropdown','value'),
     Input('campaign-type-dropdown','value'),
     Input('campaign-dropdown','value'),
-    Input('analysis-tabs', 'active_tab')
+    Input('analysis-tabs', 'active_tab'),
+    State('domain-figure-signatures','data'),
+    State('session-id','data')
     #prevent_initial_call=True
 )
 
-def update_domain_dashboard(obj, adv, ctype, camp, active_tab):
+def update_domain_dashboard(obj, adv, ctype, camp, active_tab, signatures=None, session=None):
     if active_tab != "domain-tab":  # ✅ Only run when domain tab is active
         raise PreventUpdate
-    d = work_domain.copy()
-    if obj: d = d[d['Campaign_Objective']==obj]
-    if adv: d = d[d['Advertiser']==adv]
-    if ctype: d = d[d['Campaign_Type']==ctype]
-    if camp: d = d[d['Campaign']==camp]
-    
-    
-
-    if d.shape[0] == 0:
+    with span('view'):
+        view = coalesced_view('domain', (obj, adv, ctype, camp), session, domain_view)
+    if view is None:
         empty_fig = go.Figure()
         empty_fig.update_layout(paper_bgcolor='rgba(0,0,0,0)', plot_bgcolor='rgba(0,0,0,0)', font=dict(color='white'))
         return (html.Div("No data"), empty_fig, empty_fig, empty_fig, empty_fig, 
-                empty_fig, empty_fig, empty_fig, html.Div("No data"))
+                empty_fig, html.Div("No data"), {})
+    stat_row, finished = view
+    # Table preview - rows are paged in by update_domain_table
+    table_children = preview_table('domain-table', 'domain', DOMAIN_PREVIEW_COLS)
+    with span('patch figures'):
+        figs, signatures = patch_figures(DOMAIN_FIGURE_IDS, finished, signatures, full=triggered_by_tab())
+    return (stat_row, *figs, table_children, signatures)
+def domain_view(filters, still_wanted=None):
+    """Stat row and finished figures of the domain tab, None when no rows match the filters"""
+    c = Computation(DOMAIN_NODES, dataset='domain', filters=filters)
+    d = c.get('rows')
+    if d.shape[0] == 0:
+        return None
 
     # Stats
-    total_clicks = int(d['Clicks'].sum())
-    total_impressions = int(d['Impressions'].sum())
-    avg_ctr = weighted_ctr(d)
-    avg_cvr = weighted_cvr(d)
-    avg_cpa = weighted_cpa(d)
-    avg_roas = weighted_roas(d)
-    
-    stat_row = dbc.Row([
-        dbc.Col(dbc.Card(dbc.CardBody([
-            html.Div("Total Impressions", className='small-muted'), 
-            html.Div(f"{total_impressions:,}", className='big-number')
-        ])), md=2),
-        dbc.Col(dbc.Card(dbc.CardBody([
-            html.Div("Total Clicks", className='small-muted'), 
-            html.Div(f"{total_clicks:,}", className='big-number', style={'color':COLORS['secondary']})
-        ])), md=2),
-        dbc.Col(dbc.Card(dbc.CardBody([
-            html.Div("Avg CTR (%)", className='small-muted'), 
-            html.Div(f"{avg_ctr:.2f}", className='big-number', style={'color':COLORS['info']})
-        ])), md=2),
-        dbc.Col(dbc.Card(dbc.CardBody([
-            html.Div("Avg CVR (%)", className='small-muted'), 
-            html.Div(f"{avg_cvr:.2f}", className='big-number', style={'color':COLORS['success']})
-        ])), md=2),
-        dbc.Col(dbc.Card(dbc.CardBody([
-            html.Div("Avg CPA", className='small-muted'), 
-            html.Div(f"${avg_cpa:.2f}", className='big-number', style={'color':COLORS['warning']})
-        ])), md=2),
-        dbc.Col(dbc.Card(dbc.CardBody([
-            html.Div("Avg ROAS", className='small-muted'), 
-            html.Div(f"{avg_roas:.2f}x", className='big-number', style={'color':COLORS['primary']})
-        ])), md=2),
-    ], className='mb-3')
-
-    # Domain aggregation
-    domain_agg = d.groupby('Domain').apply(lambda g: pd.Series({
-        'Clicks': g['Clicks'].sum(),
-        'Impressions': g['Impressions'].sum(),
-        'CTR': weighted_ctr(g),
-        'CVR': weighted_cvr(g),
-        'CPA': weighted_cpa(g),
-        'ROAS': weighted_roas(g)
-    })).reset_index().sort_values('Clicks', ascending=False).head(50)
-
-    # 1. Domain Treemap CTR/CVR
-    treemap_ctr_cvr = go.Figure()
-    if not domain_agg.empty:
-        text_labels = domain_agg.apply(
-            lambda r: f"<b>{r['Domain']}</b><br>CTR: {r['CTR']:.1f}% | CVR: {r['CVR']:.1f}%", axis=1
-        )
-        treemap_ctr_cvr = go.Figure(go.Treemap(
-            labels=domain_agg['Domain'],
-            parents=[''] * len(domain_agg),
-            values=domain_agg['Clicks'],
-            text=text_labels,
-            textposition="middle center",
-            marker=dict(
-                colors=domain_agg['CVR'].apply(lambda x: cvr_color(x, 'CVR')),
-                line=dict(width=2, color='#1a1a1a')
-            ),
-            textfont=dict(size=11, color='white')
-        ))
-        treemap_ctr_cvr.update_layout(
-            margin=dict(l=5,r=5,t=5,b=5), 
-            paper_bgcolor='rgba(0,0,0,0)', 
-            height=450,
-            font=dict(color='white')
-        )
-
-    # 2. Domain Treemap CPA/ROAS
-    treemap_cpa_roas = go.Figure()
-    if not domain_agg.empty:
-        text_labels = domain_agg.apply(
-            lambda r: f"<b>{r['Domain']}</b><br>CPA: ${r['CPA']:.1f} | ROAS: {r['ROAS']:.1f}x", axis=1
-        )
-        treemap_cpa_roas = go.Figure(go.Treemap(
-            labels=domain_agg['Domain'],
-            parents=[''] * len(domain_agg),
-            values=domain_agg['Clicks'],
-            text=text_labels,
-            textposition="middle center",
-            marker=dict(
-                colors=domain_agg['CPA'].apply(lambda x: cvr_color(x, 'CPA')),
-                line=dict(width=2, color='#1a1a1a')
-            ),
-            textfont=dict(size=11, color='white')
-        ))
-        treemap_cpa_roas.update_layout(
-            
-            margin=dict(l=5,r=5,t=5,b=5), 
-            paper_bgcolor='rgba(0,0,0,0)', 
-            height=450,
-            font=dict(color='white')
-        )
-
-    
-    # 5. Domain Category Overview
-    cat_overview = go.Figure()
-    if 'Domain_Category' in d.columns and d['Domain_Category'].notna().any():
-        cat_grp = d.groupby('Domain_Category').apply(lambda g: pd.Series({
-            'Clicks': g['Clicks'].sum(),
-            'CTR': weighted_ctr(g),
-            'CVR': weighted_cvr(g),
-            'CPA': weighted_cpa(g),
-            'ROAS': weighted_roas(g)
-        })).reset_index().sort_values('Clicks', ascending=False).head(10)
-        
-        if not cat_grp.empty:
-            fig_cat = make_subplots(
-                rows=1, cols=1,
-                specs=[[{"secondary_y": True}]]
-    )
-            
-            fig_cat.add_trace(go.Bar(x=cat_grp['Domain_Category'], y=cat_grp['CTR'], 
-                             name='CTR (%)', marker_color=COLORS['info']), secondary_y=False)
-            fig_cat.add_trace(go.Bar(x=cat_grp['Domain_Category'], y=cat_grp['CVR'], 
-                             name='CVR (%)', marker_color=COLORS['success']), secondary_y=False)
-    
-    # Plot CPA and ROAS on secondary y-axis
-            fig_cat.add_trace(go.Bar(x=cat_grp['Domain_Category'], y=cat_grp['CPA'], 
-                             name='CPA ($)', marker_color=COLORS['warning']), secondary_y=True)
-            fig_cat.add_trace(go.Bar(x=cat_grp['Domain_Category'], y=cat_grp['ROAS'], 
-                             name='ROAS (x)', marker_color=COLORS['primary']), secondary_y=True)
-            fig_cat.update_xaxes(title_text="Domain_Category", tickangle=-20)
-            fig_cat.update_yaxes(title_text="CTR/CVR (%)", secondary_y=False)
-            fig_cat.update_yaxes(title_text="CPA ($) / ROAS (x)", secondary_y=True)
-            fig_cat.update_layout(
-                barmode='group', height=500,
-                paper_bgcolor='rgba(0,0,0,0)', plot_bgcolor='rgba(0,0,0,0)',
-                font=dict(color='white'), xaxis=dict(color='white'), yaxis=dict(color='white')
-    )
-    # 6. Domain Category Bubble CTR/CVR
-    cat_ctr_cvr = go.Figure()
-    if 'Domain_Category' in d.columns and d['Domain_Category'].notna().any():
-    # Get top 3 domains per category
-        dom_cat_top = {}
-        for cat in d['Domain_Category'].dropna().unique():
-            cat_data = d[d['Domain_Category'] == cat]
-            if len(cat_data) > 0 and 'Domain' in cat_data.columns:
-                top_doms = cat_data.nlargest(3, 'Clicks')
-                dom_cat_top[cat] = '<br>'.join([f"• {dom} ({int(c)} clicks)" 
-                                            for dom, c in zip(top_doms['Domain'], top_doms['Clicks'])])
-            else:
-                dom_cat_top[cat] = 'N/A'
-    
-        cat_grp = d.groupby('Domain_Category').apply(lambda g: pd.Series({
-            'Clicks': g['Clicks'].sum(),
-            'CTR': weighted_ctr(g),
-            'CVR': weighted_cvr(g),
-            'CPA': weighted_cpa(g),
-            'ROAS': weighted_roas(g)})).reset_index().sort_values('Clicks', ascending=False).head(10)
-    
-        if not cat_grp.empty:
-            for col in ['Clicks', 'CTR', 'CVR', 'CPA', 'ROAS']:
-                min_val, max_val = cat_grp[col].min(), cat_grp[col].max()
-                cat_grp[f'{col}_norm'] = (cat_grp[col] - min_val) / (max_val - min_val + 1e-9) * 100
-        
-            cat_grp['top_domains'] = cat_grp['Domain_Category'].map(dom_cat_top)
-        
-            cat_overview = go.Figure()
-            cat_overview.add_trace(go.Bar(
-                x=cat_grp['Domain_Category'], 
-                y=cat_grp['CTR_norm'], 
-                name='CTR', 
-                marker_color=COLORS['info'],
-                customdata=list(zip(cat_grp['CTR'], cat_grp['Clicks'], cat_grp['top_domains'])),
-                hovertemplate='<b>%{x}</b><br>Normalized: %{y:.1f}<br><b>Actual CTR: %{customdata[0]:.2f}%</b><br><b>Total Clicks: %{customdata[1]:,}</b><br><br>Top Domains:<br>%{customdata[2]}<extra></extra>'))
-            cat_overview.add_trace(go.Bar(
-                x=cat_grp['Domain_Category'], 
-                y=cat_grp['CVR_norm'], 
-                name='CVR', 
-                marker_color=COLORS['success'],
-                customdata=list(zip(cat_grp['CVR'], cat_grp['Clicks'], cat_grp['top_domains'])),
-                hovertemplate='<b>%{x}</b><br>Normalized: %{y:.1f}<br><b>Actual CVR: %{customdata[0]:.2f}%</b><br><b>Total Clicks: %{customdata[1]:,}</b><br><br>Top Domains:<br>%{customdata[2]}<extra></extra>'))
-            cat_overview.add_trace(go.Bar(
-                x=cat_grp['Domain_Category'], 
-                y=cat_grp['CPA_norm'], 
-                name='CPA', 
-                marker_color=COLORS['warning'],
-                customdata=list(zip(cat_grp['CPA'], cat_grp['Clicks'], cat_grp['top_domains'])),
-                hovertemplate='<b>%{x}</b><br>Normalized: %{y:.1f}<br><b>Actual CPA: $%{customdata[0]:.2f}</b><br><b>Total Clicks: %{customdata[1]:,}</b><br><br>Top Domains:<br>%{customdata[2]}<extra></extra>'))
-            cat_overview.add_trace(go.Bar(
-                x=cat_grp['Domain_Category'], 
-                y=cat_grp['ROAS_norm'], 
-                name='ROAS', 
-                marker_color=COLORS['primary'],
-                customdata=list(zip(cat_grp['ROAS'], cat_grp['Clicks'], cat_grp['top_domains'])),
-                hovertemplate='<b>%{x}</b><br>Normalized: %{y:.1f}<br><b>Actual ROAS: %{customdata[0]:.2f}x</b><br><b>Total Clicks: %{customdata[1]:,}</b><br><br>Top Domains:<br>%{customdata[2]}<extra></extra>'))
-    if 'Domain_Category' in d.columns and d['Domain_Category'].notna().any():
-        cat_agg = d.groupby('Domain_Category').apply(lambda g: pd.Series({
-            'Clicks': g['Clicks'].sum(),
-            'CTR': weighted_ctr(g),
-            'CVR': weighted_cvr(g),
-            'CPA': weighted_cpa(g),
-            'ROAS': weighted_roas(g)
-        })).reset_index()
-        
-        max_cat_clicks = cat_agg['Clicks'].max()
-        palette = [COLORS['primary'], COLORS['secondary'], COLORS['success'], COLORS['info'], COLORS['warning'], COLORS['danger']]
-        
-        for i, r in cat_agg.iterrows():
-            size = 40 + (r['Clicks'] / max_cat_clicks) * 100
-            cat_ctr_cvr.add_trace(go.Scatter(
-                x=[r['CTR']], y=[r['CVR']],
-                mode='markers+text',
-                text=[r['Domain_Category']],
-                textposition='middle center',
-                textfont=dict(size=11, color='white', family='Arial'),  # optional: family
-                marker=dict(size=size, color=palette[i % len(palette)], opacity=0.8, line=dict(width=3, color='white')),
-                hovertemplate=f"<b>{r['Domain_Category']}</b><br>CTR: {r['CTR']:.2f}%<br>CVR: {r['CVR']:.2f}%<extra></extra>",
-                showlegend=False
-            ))
-        cat_ctr_cvr.update_layout(
-            xaxis_title="CTR (%)", yaxis_title="CVR (%)",
-            paper_bgcolor='rgba(0,0,0,0)', plot_bgcolor='rgba(30,30,40,0.3)', 
-            height=500,
-            font=dict(color='white'),
-            xaxis=dict(color='white', gridcolor='rgba(255,255,255,0.1)'),
-            yaxis=dict(color='white', gridcolor='rgba(255,255,255,0.1)')
-        )
-
-    # 7. Domain Category Bubble ROAS/CPA
-    cat_roas_cpa = go.Figure()
-    if 'Domain_Category' in d.columns and d['Domain_Category'].notna().any():
-        for i, r in cat_agg.iterrows():
-            size = 40 + (r['Clicks'] / max_cat_clicks) * 100
-            cat_roas_cpa.add_trace(go.Scatter(
-                x=[r['ROAS']], y=[r['CPA']],
-                mode='markers+text',
-                text=[r['Domain_Category']],
-                textposition='middle center',
-                textfont=dict(size=11, color='white', family='Arial'),  # optional: family
-                marker=dict(size=size, color=palette[i % len(palette)], opacity=0.8, line=dict(width=3, color='white')),
-                hovertemplate=f"<b>{r['Domain_Category']}</b><br>ROAS: {r['ROAS']:.2f}x<br>CPA: ${r['CPA']:.2f}<extra></extra>",
-                showlegend=False
-            ))
-        cat_roas_cpa.update_layout(
-            xaxis_title="ROAS", yaxis_title="CPA ($)",
-            paper_bgcolor='rgba(0,0,0,0)', plot_bgcolor='rgba(30,30,40,0.3)', 
-            height=500,
-            font=dict(color='white'),
-            xaxis=dict(color='white', gridcolor='rgba(255,255,255,0.1)'),
-            yaxis=dict(color='white', gridcolor='rgba(255,255,255,0.1)')
-        )
-
-    # Table preview
-    preview_cols = ['Domain', 'Domain_Category', 'Clicks', 'CTR', 'CVR', 'CPA', 'ROAS']
-    preview_df = d[preview_cols].sort_values('Clicks', ascending=False).head(100)  # Increased to 100
-    table_children = dash_table.DataTable(
-    data=preview_df.to_dict('records'),
-    columns=[{"name": i, "id": i} for i in preview_df.columns],
-    page_size=30,
-    page_current=0,
-    style_table={'overflowX': 'auto'},
-    style_cell={
-        'textAlign': 'left',
-        'backgroundColor': '#121419',
-        'color': '#E5E7EB',
-        'border': '1px solid #2d3748',
-        'padding': '8px'
-    },
-    style_header={
-        'backgroundColor': '#1a1a1a',
-        'fontWeight': 'bold',
-        'color': '#00D9FF',
-        'border': '1px solid #2d3748'
-    },
-    style_data_conditional=[
-        {
-            'if': {'row_index': 'odd'},
-            'backgroundColor': '#1a1f2e'
-        }
-    ]
+    stat_row = stat_cards(c.get('totals'))
+    check_wanted(still_wanted)
+    charts = build_charts(DOMAIN_CHARTS, c, still_wanted)
+    last_computations['domain'] = c
+    with span('encode figures'):
+        return stat_row, finish_figures(*(charts[i] for i in DOMAIN_FIGURE_IDS))
+@app.callback(
+    Output('domain-table', 'data'),
+    Output('domain-table', 'page_count'),
+    Input('domain-table', 'page_current'),
+    Input('domain-table', 'page_size'),
+    Input('domain-table', 'sort_by'),
+    Input('domain-table', 'filter_query'),
+    State('objective-dropdown','value'),
+    State('advertiser-dropdown','value'),
+    State('campaign-type-dropdown','value'),
+    State('campaign-dropdown','value')
 )
-
-    return (stat_row, treemap_ctr_cvr, treemap_cpa_roas, cat_overview, cat_ctr_cvr, cat_roas_cpa, table_children)# Domain download callback
+def update_domain_table(page_current, page_size, sort_by, filter_query, obj, adv, ctype, camp):
+    return table_page('domain', DOMAIN_PREVIEW_COLS, (obj, adv, ctype, camp),
+                      page_current, page_size, sort_by, filter_query)
+# Domain download callback
 @app.callback(
-    Output("download-domain-data", "data"),
+    Output('export-job', 'data', allow_duplicate=True),
     Input("download-domain-btn", "n_clicks"),
     State('objective-dropdown','value'),
     State('advertiser-dropdown','value'),
@@ -2076,14 +1739,181 @@ def update_domain_dashboard(obj, adv, ctype, camp, active_tab):
 def download_domain_data(n, obj, adv, ctype, camp):
     if n is None:
         raise PreventUpdate
-    d = work_domain.copy()
-    if obj: d = d[d['Campaign_Objective']==obj]
-    if adv: d = d[d['Advertiser']==adv]
-    if ctype: d = d[d['Campaign_Type']==ctype]
-    if camp: d = d[d['Campaign']==camp]
-    return dcc.send_data_frame(d.to_csv, "filtered_domain_data.csv", index=False)
+    return {'id': start_export('filtered_domain_data', (obj, adv, ctype, camp))}
 # Run
 
+# -----------------------------
+# WARM-UP
+# -----------------------------
+# The first user after a deploy or worker recycle would otherwise wait for a cold computation of
+# both tabs. start_warmup() builds the indexes a first page view needs and then fills
+# view_flight's cache on a background thread: the unfiltered views, the most requested views
+# from the access log, then each objective and the top advertisers, largest row count first.
+# The worker reports ready once the unfiltered views are cached; after that the warm-up sleeps
+# between views to stay at WARMUP_CPU_SHARE of a core and stops after WARMUP_BUDGET_SECONDS.
+# It goes through view_flight, so a user asking for a view being warmed shares that computation.
+VIEWS = {'keyword': keyword_view, 'domain': domain_view}
+UNFILTERED = (None, None, None, None)
+warmup_status = {'state': 'idle', 'done': 0, 'total': 0, 'seconds': 0.0}
+warmup_lock = threading.Lock()
+def build_indexes():
+    """Filter positions, dropdown options and default table order of the unfiltered page, and the
+    frame sizes for the memory budget (a deep measure, too slow for the first /healthz)"""
+    memory.used()
+    for name in DATASETS:
+        table_positions(name, UNFILTERED, '', 'Clicks', False)
+    for column in FILTER_COLS:
+        dropdown_options(column)
+def warmup_plan():
+    """(tab, filters) to precompute, most valuable first, at most VIEW_CACHE_SIZE of them"""
+    logged = [key for key, _ in view_access.most_common(VIEW_CACHE_SIZE // 2) if key[0] in VIEWS]
+    sized = [((str(obj), None, None, None), n) for obj, n in work['Campaign_Objective'].value_counts().items()]
+    sized += [((None, str(adv), None, None), n)
+              for adv, n in work['Advertiser'].value_counts().head(WARMUP_TOP_ADVERTISERS).items()]
+    sized.sort(key=lambda x: -x[1])
+    plan = [(tab, UNFILTERED) for tab in VIEWS] + logged + [(tab, filters) for filters, _ in sized for tab in VIEWS]
+    return list(dict.fromkeys(plan))[:VIEW_CACHE_SIZE]
+def run_warmup():
+    t0 = time.perf_counter()
+    set_phase('indexing')
+    try:
+        build_indexes()
+    except Exception as e:
+        log.warning("⚠️ Building indexes failed: %s", e)
+    plan = warmup_plan() if WARMUP else []
+    essential = {(tab, UNFILTERED) for tab in VIEWS} & set(plan)
+    set_phase('warming' if essential else 'ready')
+    warmup_status.update(state='running', total=len(plan))
+    for tab, filters in plan:
+        if time.perf_counter() - t0 > WARMUP_BUDGET_SECONDS:
+            warmup_status['state'] = 'out of budget'
+            break
+        t1 = time.perf_counter()
+        if not view_flight.cached((tab, filters)):
+            try:
+                view_flight.do((tab, filters), lambda still_wanted: VIEWS[tab](filters, still_wanted))
+            except Exception as e:
+                log.warning("⚠️ Warm-up of %s view %s failed: %s", tab, filters, e)
+        warmup_status['done'] += 1
+        if LOAD_STATE['phase'] == 'warming':
+            essential.discard((tab, filters))
+            if not essential:
+                set_phase('ready')
+        else:  # serving users - leave them most of the CPU
+            time.sleep((time.perf_counter() - t1) * (1 - WARMUP_CPU_SHARE) / WARMUP_CPU_SHARE)
+    else:
+        warmup_status['state'] = 'done'
+    if LOAD_STATE['phase'] != 'ready':
+        set_phase('ready')
+    warmup_status['seconds'] = round(time.perf_counter() - t0, 1)
+    log.info("🔥 Warm-up %s: %d/%d views in %ss", warmup_status['state'], warmup_status['done'],
+             warmup_status['total'], warmup_status['seconds'])
+def start_warmup():
+    """Build indexes and warm the caches in the background, once per process (gunicorn calls it
+    in every worker; the first /readyz does it otherwise)"""
+    with warmup_lock:
+        if LOAD_STATE['phase'] != 'starting':
+            return
+        LOAD_STATE['phase'] = 'indexing'
+    threading.Thread(target=run_warmup, name='warmup', daemon=True).start()
+# -----------------------------
+# HEALTH
+# -----------------------------
+def cache_sizes():
+    caches = {f.__name__: f.cache_info().currsize
+              for f in (filtered_positions, dropdown_options, column_order, table_positions)}
+    caches.update(views=len(view_flight.results), export_jobs=len(export_queue.jobs))
+    return caches
+def health_report():
+    return {'phase': LOAD_STATE['phase'], 'phase_seconds': round(time.time() - LOAD_STATE['since'], 1),
+            'error': LOAD_STATE['error'], 'uptime_seconds': round(time.time() - STARTED, 1), 'pid': os.getpid(),
+            'phase_timings': PHASE_SECONDS, 'memory': memory.report(),
+            'rows': {name: len(frame) for name, frame in DATASETS.items()},
+            'dataset_versions': DATASET_VERSIONS, 'rss_bytes': rss_bytes(),
+            'coercion_failures': {name: {col: r['failed'] for col, r in report.items()}
+                                  for name, report in COERCION_FAILURES.items()},
+            'caches': cache_sizes(), 'warmup': warmup_status}
+def is_ready():
+    start_warmup()
+    return LOAD_STATE['phase'] == 'ready'
+install_health(server, health_report, is_ready)
+# -----------------------------
+# METRICS
+# -----------------------------
+# /metrics in Prometheus text format: per-callback latency, outcome and response size (every
+# callback is wrapped below), rows scanned and compressed bytes (counted where they happen),
+# and cache hits / sizes, read from the caches themselves at scrape time.
+LRU_CACHES = (filtered_positions, dropdown_options, column_order, table_positions)
+REGISTRY.collect('dashboard_cache_hits_total', 'In-process cache lookups by cache and result',
+                 lambda: [({'cache': f.__name__, 'result': result}, getattr(f.cache_info(), result))
+                          for f in LRU_CACHES for result in ('hits', 'misses')], kind='counter')
+REGISTRY.collect('dashboard_view_requests_total', 'Dashboard view requests by how they were served',
+                 lambda: [({'result': k}, v) for k, v in coalescing_stats().items() if k != 'seconds_saved'],
+                 kind='counter')
+REGISTRY.collect('dashboard_view_seconds_saved_total', 'Computation time saved by coalescing identical views',
+                 lambda: [({}, round(view_flight.stats['seconds_saved'], 3))], kind='counter')
+REGISTRY.collect('dashboard_cache_entries', 'Entries per in-process cache',
+                 lambda: [({'cache': k}, v) for k, v in cache_sizes().items()])
+REGISTRY.collect('dashboard_ready', '1 once the worker reports ready',
+                 lambda: [({'phase': LOAD_STATE['phase']}, int(LOAD_STATE['phase'] == 'ready'))])
+REGISTRY.collect('process_resident_memory_bytes', 'Resident memory of this worker',
+                 lambda: [({}, rss_bytes() or 0)])
+REGISTRY.collect('dashboard_memory_bytes', 'Estimated bytes held by frames and caches',
+                 lambda: [({'part': k}, v) for k, v in memory.report()['parts'].items()])
+REGISTRY.collect('dashboard_memory_budget_bytes', 'Memory budget for frames and caches (absent = unlimited)',
+                 lambda: [({}, memory.limit)] if memory.limit else [])
+REGISTRY.collect('dashboard_memory_evictions_total', 'Cache entries evicted to stay within the memory budget',
+                 lambda: [({'part': k}, v) for k, v in memory.evictions.items()], kind='counter')
+REGISTRY.collect('dashboard_memory_refused_total', 'Exports refused by the memory budget',
+                 lambda: [({}, memory.refused)], kind='counter')
+REGISTRY.collect('dashboard_memory_stage_peak_bytes', 'Largest peak RSS growth seen per stage',
+                 lambda: [({'stage': k}, s['peak_bytes']) for k, s in memory.report()['stages'].items()])
+instrument_callbacks(app)
+install_metrics(server)
+# -----------------------------
+# TRACING
+# -----------------------------
+# The dashboard callbacks run as traces. Their stages are spans: the view (cached, coalesced or
+# computed), every Computation node (filtering, word / emotion tables, aggregates, top-K text,
+# each chart) wherever it runs, figure encoding and patching. What the root span has left over
+# is Dash's own work, mostly serializing the response to JSON.
+tracer = Tracer(TRACE_LOG, TRACE_SAMPLE_RATE, TRACE_SLOW_SECONDS)
+TRACED_CALLBACKS = ('update_dashboard', 'update_domain_dashboard')
+for entry in app.callback_map.values():
+    if entry['callback'].__name__ in TRACED_CALLBACKS:
+        entry['callback'] = traced(tracer, entry['callback'])
+# They show request timings and filter values: token-protected like the profiling routes
+# (profiler.require_token, see PROFILING), 404 while no PROFILE_TOKEN is set
+@server.route('/debug/traces')
+def debug_traces():
+    """Recent traces, newest first"""
+    profiler.require_token()
+    lines = [f"{t.id}  {time.strftime('%H:%M:%S', time.localtime(t.started))}  {t.seconds * 1000:8.1f} ms  {t.name}"
+             for t in reversed(list(tracer.recent))]
+    return Response('\n'.join(lines) + '\n', mimetype='text/plain')
+@server.route('/debug/traces/<trace_id>')
+def debug_trace(trace_id):
+    """Flame-style breakdown of one trace (?format=json for the raw spans)"""
+    profiler.require_token()
+    trace = tracer.get(trace_id)
+    if trace is None:
+        abort(404)
+    if flask_request.args.get('format') == 'json':
+        return jsonify(trace.as_dict())
+    return Response(trace.flame() + '\n\n(root self time = Dash dispatch + JSON serialization)\n',
+                    mimetype='text/plain; charset=utf-8')
+# -----------------------------
+# PROFILING
+# -----------------------------
+# A profiled callback request bypasses the view cache and coalescing and builds its charts on
+# its own thread (see coalesced_view / build_charts). Wrapped last, so the profile includes
+# metrics, tracing and Dash's JSON encoding of the response.
+profiler = Profiler(PROFILE_DIR, PROFILE_TOKEN, PROFILE_MAX_CONCURRENT, PROFILE_KEEP)
+profile_callbacks(app, profiler)
+install_profiling(server, profiler)
+set_phase('starting')
+
 if __name__ == '__main__':
+    start_warmup()
     app.run_server(debug=False, host='0.0.0.0', port=int(os.environ.get('PORT', 8050)))
 
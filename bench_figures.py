@@ -0,0 +1,98 @@
+# bench_figures.py
+# Per-figure build time: go.Figure / make_subplots (before) vs figure_specs dicts (after).
+# Usage: python bench_figures.py [--repeat N] [--sizes 10,50,500]
+import argparse
+import json
+import time
+import numpy as np
+import pandas as pd
+import plotly
+import plotly.graph_objects as go
+from plotly.subplots import make_subplots
+from figure_specs import (METRIC_PANELS, METRIC_Y_TITLES, cvr_color, cvr_colors,
+                          grid_2x2, treemap_figure, add_metric_markers, encode_figure)
+
+def make_group(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'label': [f'w{i}' for i in range(n)],
+        'Clicks': rng.integers(1, 10000, n),
+        'CTR': rng.random(n) * 10,
+        'CVR': rng.random(n) * 3,
+        'CPA': rng.random(n) * 200,
+        'ROAS': rng.random(n) * 5,
+        'top_keywords': ['<br>'.join(f"• kw{j} ({j} clicks)" for j in range(3))] * n,
+    })
+# -----------------------------
+# BEFORE: validated plotly objects
+# -----------------------------
+def treemap_go(grp):
+    fig = go.Figure(go.Treemap(
+        labels=grp['label'], parents=[''] * len(grp), values=grp['Clicks'],
+        text=grp['label'], textposition="middle center",
+        marker=dict(colors=grp['CVR'].apply(lambda x: cvr_color(x, 'CVR')),
+                    line=dict(width=2, color='#1a1a1a')),
+        textfont=dict(size=12, color='white')))
+    fig.update_layout(margin=dict(l=5, r=5, t=5, b=5), paper_bgcolor='rgba(0,0,0,0)',
+                      height=450, font=dict(color='white'))
+    return fig
+def grid_go(grp):
+    fig = make_subplots(rows=2, cols=2, subplot_titles=("CTR", "CVR", "ROAS", "CPA"),
+                        vertical_spacing=0.12, horizontal_spacing=0.1)
+    size = 10 + grp['Clicks'] / grp['Clicks'].max() * 40
+    for (metric, color, _, hover_value, row, col), y_title in zip(METRIC_PANELS, METRIC_Y_TITLES):
+        fig.add_trace(go.Scatter(
+            x=grp['label'], y=grp[metric], mode='markers',
+            marker=dict(size=size, color=color, opacity=0.7), customdata=grp['top_keywords'],
+            hovertemplate=f"<b>%{{x}}</b><br>{hover_value}<br><br>Top Keywords:<br>%{{customdata}}<extra></extra>",
+            name=metric), row=row, col=col)
+        fig.update_xaxes(title_text="Label", title_font=dict(color='white'), tickfont=dict(color='white'), row=row, col=col)
+        fig.update_yaxes(title_text=y_title, title_font=dict(color='white'), tickfont=dict(color='white'), row=row, col=col)
+    fig.update_layout(height=700, paper_bgcolor='rgba(0,0,0,0)', plot_bgcolor='rgba(30,30,40,0.3)',
+                      showlegend=False, font=dict(color='white'))
+    return fig
+# -----------------------------
+# AFTER: plain dict specs
+# -----------------------------
+def treemap_spec(grp):
+    return treemap_figure(grp['label'], grp['Clicks'], grp['label'], cvr_colors(grp['CVR'], 'CVR'))
+def grid_spec(grp):
+    fig = grid_2x2(("CTR", "CVR", "ROAS", "CPA"), x_title="Label", y_titles=METRIC_Y_TITLES,
+                   height=700, showlegend=False)
+    size = 10 + grp['Clicks'] / grp['Clicks'].max() * 40
+    return add_metric_markers(fig, grp.assign(x=grp['label']), 'x', 'Label', size)
+
+def timed(fn, grp, repeat):
+    best_build, best_json = float('inf'), float('inf')
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fig = fn(grp)
+        t1 = time.perf_counter()
+        payload = json.dumps(fig, cls=plotly.utils.PlotlyJSONEncoder)
+        t2 = time.perf_counter()
+        best_build, best_json = min(best_build, t1 - t0), min(best_json, t2 - t1)
+    return best_build * 1000, best_json * 1000, len(payload)
+
+def main():
+    ap = argparse.ArgumentParser(description='Per-figure build time before/after figure_specs')
+    ap.add_argument('--repeat', type=int, default=20)
+    ap.add_argument('--sizes', default='10,50,500')
+    args = ap.parse_args()
+    cases = [('treemap', treemap_go, treemap_spec), ('grid_2x2', grid_go, grid_spec)]
+    print(f"{'figure':<10}{'points':>8}{'before ms':>12}{'after ms':>11}{'speedup':>9}"
+          f"{'json before':>13}{'json after':>12}{'binary':>10}")
+    for n in [int(x) for x in args.sizes.split(',')]:
+        grp = make_group(n)
+        for name, before, after in cases:
+            b_ms, _, b_bytes = timed(before, grp, args.repeat)
+            a_ms, _, a_bytes = timed(after, grp, args.repeat)
+            _, _, bin_bytes = timed(lambda g: encode_figure(after(g)), grp, 1)
+            print(f"{name:<10}{n:>8}{b_ms:>12.2f}{a_ms:>11.2f}{b_ms / a_ms:>8.1f}x"
+                  f"{b_bytes:>13,}{a_bytes:>12,}{bin_bytes:>10,}")
+    c = np.random.default_rng(1).random(100000) * 3
+    t0 = time.perf_counter(); pd.Series(c).apply(lambda x: cvr_color(x, 'CVR')); t1 = time.perf_counter()
+    cvr_colors(c, 'CVR'); t2 = time.perf_counter()
+    print(f"cvr_color on 100k values: apply {1000 * (t1 - t0):.1f} ms, np.select {1000 * (t2 - t1):.1f} ms")
+
+if __name__ == '__main__':
+    main()
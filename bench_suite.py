@@ -0,0 +1,222 @@
+# bench_suite.py
+# End-to-end benchmarks on generated data (make_data.py) at several sizes: ingest
+# (load_keyword_data / load_domain_data), preprocessing, the dropdown cascade, both dashboard
+# updates and the three download exports, over a few representative filter tuples. Each
+# benchmark reports wall time (median of --repeat cold runs, caches cleared before each), peak
+# traced memory (from a separate tracemalloc pass, which would skew the timings) and payload
+# size. Every size runs in fresh processes, as the app loads its data at import.
+# Usage: python bench_suite.py [--sizes 10000,100000,1000000] [--repeat 3] [--out bench.json]
+#        python bench_suite.py --compare baseline.json [--tolerance 0.25]   (exit 1 on regressions)
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+DATA_ROOT = os.path.join(tempfile.gettempdir(), 'dashboard_bench_data')
+NOISE_SECONDS = 0.005  # smaller slowdowns are never reported as regressions
+
+# -----------------------------
+# WORKER (one process per size and pass, run from the data folder)
+# -----------------------------
+def filter_tuples(D):
+    """all rows, the biggest objective, its biggest advertiser, and its biggest campaign"""
+    work = D.work
+    obj = work['Campaign_Objective'].value_counts().index[0]
+    rows = work[work['Campaign_Objective'] == obj]
+    adv = rows['Advertiser'].value_counts().index[0]
+    rows = rows[rows['Advertiser'] == adv]
+    ctype, camp = rows.groupby(['Campaign_Type', 'Campaign']).size().idxmax()
+    return {'all': (None, None, None, None), 'objective': (obj, None, None, None),
+            'advertiser': (obj, adv, None, None), 'campaign': (obj, adv, ctype, camp)}
+def reset_caches(D):
+    """Cold start for the next run: filter / dropdown / view caches and cached export files"""
+    for f in (D.filtered_positions, D.dropdown_options, D.column_order, D.table_positions):
+        f.cache_clear()
+    D.view_flight.clear()
+    for jid in list(D.export_queue.jobs):
+        D.export_queue._drop(jid, D.export_queue.path(jid))
+def benchmarks(D, callback_body):
+    """name -> fn() returning the payload size in bytes (or None)"""
+    client = D.server.test_client()
+    def callback(name, values):
+        body = callback_body(name, values)
+        def run():
+            r = client.post('/_dash-update-component', json=body)
+            assert r.status_code in (200, 204), f"{name}: HTTP {r.status_code}"
+            return len(r.data)
+        return run
+    def download(name, filters):
+        body = callback_body(name, [1, *filters])
+        def run():
+            r = client.post('/_dash-update-component', json=body)
+            assert r.status_code == 200, f"{name}: HTTP {r.status_code}"
+            jid = json.loads(r.data)['response']['export-job']['data']['id']
+            while D.export_queue.status(jid)['state'] in ('queued', 'running'):
+                time.sleep(0.002)
+            assert D.export_queue.status(jid)['state'] == 'done', f"{name}: export failed"
+            return os.path.getsize(D.export_queue.path(jid))
+        return run
+    def frame_loader(fn):
+        def run():
+            fn()
+        return run
+    benches = {'ingest/load_keyword_data': frame_loader(D.load_keyword_data),
+               'ingest/load_domain_data': frame_loader(D.load_domain_data)}
+    for label, (obj, adv, ctype, camp) in filter_tuples(D).items():
+        benches.update({
+            f"load_advertisers/{label}": callback('load_advertisers', [obj]),
+            f"load_campaign_types/{label}": callback('load_campaign_types', [obj, adv]),
+            f"load_campaigns/{label}": callback('load_campaigns', [obj, adv, ctype]),
+            f"update_dashboard/{label}": callback('update_dashboard', [obj, adv, ctype, camp, 'keyword-tab']),
+            f"update_domain_dashboard/{label}": callback('update_domain_dashboard', [obj, adv, ctype, camp, 'domain-tab']),
+            f"download_data/{label}": download('download_data', (obj, adv, ctype, camp)),
+            f"download_keyword_category/{label}": download('download_keyword_category', (obj, adv, ctype, camp)),
+            f"download_domain_data/{label}": download('download_domain_data', (obj, adv, ctype, camp)),
+        })
+    return benches
+def worker(repeat, memory):
+    """Import the app from the current folder, run every benchmark, print one JSON line"""
+    os.environ.update(WARMUP='0', ACCESS_LOG=os.path.join(tempfile.mkdtemp(), 'access.json'),
+                      EXPORT_DIR=tempfile.mkdtemp(), TRACE_SAMPLE_RATE='0', LOG_LEVEL='WARNING')
+    sys.path.insert(0, HERE)
+    if memory:
+        import tracemalloc
+        tracemalloc.start()
+    t0 = time.perf_counter()
+    import Dashboard as D
+    results = {'startup': {'seconds': [time.perf_counter() - t0]}}
+    for phase in ('loading', 'preprocessing', 'building'):
+        results[f"startup/{phase}"] = {'seconds': [D.PHASE_SECONDS[phase]]}
+        if memory:
+            results[f"startup/{phase}"]['peak_bytes'] = D.PHASE_PEAK_BYTES[phase]
+    if memory:
+        results['startup']['peak_bytes'] = max(D.PHASE_PEAK_BYTES.values())
+    from bench_threads import callback_body
+    for name, fn in benchmarks(D, callback_body).items():
+        times = []
+        for _ in range(1 if memory else repeat):
+            reset_caches(D)
+            if memory:
+                tracemalloc.reset_peak()
+                base = tracemalloc.get_traced_memory()[0]
+            t = time.perf_counter()
+            payload = fn()
+            times.append(time.perf_counter() - t)
+        results[name] = {'seconds': times, 'payload_bytes': payload}
+        if memory:
+            results[name]['peak_bytes'] = tracemalloc.get_traced_memory()[1] - base
+    results['_rows'] = {'keyword': len(D.work), 'domain': len(D.work_domain)}
+    print(json.dumps(results))
+
+# -----------------------------
+# DRIVER
+# -----------------------------
+def dataset_dir(rows, seed):
+    """Folder with generated CSVs for rows, created with make_data.py on first use"""
+    path = os.path.join(DATA_ROOT, f"{rows}-seed{seed}")
+    from make_data import KEYWORD_FILE, DOMAIN_FILE
+    if not all(os.path.exists(os.path.join(path, f)) for f in (KEYWORD_FILE, DOMAIN_FILE)):
+        subprocess.run([sys.executable, os.path.join(HERE, 'make_data.py'), '--rows', str(rows),
+                        '--seed', str(seed), '--out', path], check=True)
+    return path
+def run_pass(data, repeat, memory):
+    args = [sys.executable, os.path.abspath(__file__), '--worker', '--repeat', str(repeat)]
+    if memory:
+        args.append('--memory')
+    out = subprocess.run(args, cwd=data, capture_output=True, text=True)
+    if out.returncode != 0:
+        raise SystemExit(f"benchmark worker failed in {data}:\n{out.stderr[-3000:]}")
+    return json.loads(out.stdout.strip().splitlines()[-1])
+def run_size(rows, seed, repeat, memory=True):
+    data = dataset_dir(rows, seed)
+    timed = run_pass(data, repeat, memory=False)
+    traced = run_pass(data, 1, memory=True) if memory else {}
+    dataset_rows = timed.pop('_rows')
+    traced.pop('_rows', None)
+    out = {}
+    for name, r in timed.items():
+        out[name] = {'median_s': round(statistics.median(r['seconds']), 5), 'min_s': round(min(r['seconds']), 5),
+                     'runs': len(r['seconds']), 'payload_bytes': r.get('payload_bytes'),
+                     'peak_bytes': traced.get(name, {}).get('peak_bytes')}
+    return dataset_rows, out
+
+def compare(current, baseline, tolerance):
+    """Rows of (key, metric, baseline, current, ratio, regressed) for benchmarks in both runs.
+    Time is compared on the best run, which is far less noisy than the median on a shared box."""
+    rows = []
+    for size, benches in current['results'].items():
+        for name, r in benches['benchmarks'].items():
+            b = baseline['results'].get(size, {}).get('benchmarks', {}).get(name)
+            if b is None:
+                continue
+            for metric in ('min_s', 'peak_bytes', 'payload_bytes'):
+                old, new = b.get(metric), r.get(metric)
+                if not old or new is None:
+                    continue
+                ratio = new / old
+                regressed = ratio > 1 + tolerance and not (metric == 'min_s' and new - old < NOISE_SECONDS)
+                rows.append((f"{size}/{name}", metric, old, new, ratio, regressed))
+    return rows
+def fmt(metric, v):
+    if metric.endswith('_s'):
+        return f"{v * 1000:.1f} ms"
+    return f"{v / 1e6:.2f} MB" if v >= 1e5 else f"{v / 1e3:.1f} kB"
+def print_results(results):
+    print(f"{'benchmark':<48}{'median':>12}{'peak mem':>12}{'payload':>12}")
+    for size, r in results.items():
+        print(f"--- {int(size):,} rows (keyword {r['rows']['keyword']:,}, domain {r['rows']['domain']:,})")
+        for name, b in r['benchmarks'].items():
+            print(f"{name:<48}{fmt('median_s', b['median_s']):>12}"
+                  f"{fmt('peak_bytes', b['peak_bytes']) if b['peak_bytes'] is not None else '-':>12}"
+                  f"{fmt('payload_bytes', b['payload_bytes']) if b['payload_bytes'] else '-':>12}")
+
+def main():
+    ap = argparse.ArgumentParser(description='Ingest / preprocessing / callback benchmarks on generated data')
+    ap.add_argument('--sizes', default='10000,100000', help='keyword (and domain) rows per dataset')
+    ap.add_argument('--repeat', type=int, default=3)
+    ap.add_argument('--seed', type=int, default=42)
+    ap.add_argument('--no-memory', action='store_true', help='skip the tracemalloc pass')
+    ap.add_argument('--out', default='bench_results.json')
+    ap.add_argument('--compare', help='baseline JSON from an earlier run')
+    ap.add_argument('--tolerance', type=float, default=0.25, help='allowed slowdown / growth before a regression')
+    ap.add_argument('--worker', action='store_true', help=argparse.SUPPRESS)
+    ap.add_argument('--memory', action='store_true', help=argparse.SUPPRESS)
+    args = ap.parse_args()
+    if args.worker:
+        return worker(args.repeat, args.memory)
+
+    import dash, numpy, pandas
+    run = {'meta': {'date': time.strftime('%Y-%m-%d %H:%M:%S'), 'python': platform.python_version(),
+                    'pandas': pandas.__version__, 'numpy': numpy.__version__, 'dash': dash.__version__,
+                    'platform': platform.platform(), 'cpus': os.cpu_count(), 'seed': args.seed,
+                    'repeat': args.repeat},
+           'results': {}}
+    for rows in [int(s) for s in args.sizes.split(',')]:
+        t0 = time.perf_counter()
+        dataset_rows, benches = run_size(rows, args.seed, args.repeat, memory=not args.no_memory)
+        run['results'][str(rows)] = {'rows': dataset_rows, 'benchmarks': benches}
+        print(f"✅ {rows:,} rows benchmarked in {time.perf_counter() - t0:.0f}s", file=sys.stderr)
+    with open(args.out, 'w') as f:
+        json.dump(run, f, indent=1)
+    print_results(run['results'])
+    print(f"\nSaved to {args.out}")
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        rows = compare(run, baseline, args.tolerance)
+        regressions = [r for r in rows if r[5]]
+        print(f"\nCompared with {args.compare} ({baseline['meta']['date']}): {len(rows)} figures, "
+              f"{len(regressions)} regressions over {args.tolerance:.0%}")
+        for key, metric, old, new, ratio, _ in sorted(regressions, key=lambda r: -r[4]):
+            print(f"  ❌ {key:<56}{metric:<14}{fmt(metric, old):>12} -> {fmt(metric, new):>12}  ({ratio:.2f}x)")
+        if regressions:
+            sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+# bench_threads.py
+# Throughput of a mixed dropdown + dashboard workload by number of request threads, i.e. what
+# gunicorn's THREADS setting buys. Requests go through the Flask app (test client, one per
+# thread), so compression and Dash dispatch are included.
+# Usage (from the folder with the CSVs): python bench_threads.py [--threads 1,2,4,8] [--requests 200]
+import argparse
+import random
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import Dashboard as D
+
+FILTER_STATES = ['objective-dropdown', 'advertiser-dropdown', 'campaign-type-dropdown', 'campaign-dropdown']
+
+def callback_body(name, values):
+    """_dash-update-component request body for the callback function called name (states not given are None)"""
+    for output, cb in D.app.callback_map.items():
+        if getattr(cb['callback'], '__name__', '') == name:
+            break
+    else:
+        raise KeyError(name)
+    n_in = len(cb['inputs'])
+    inputs = [dict(i, value=v) for i, v in zip(cb['inputs'], values[:n_in])]
+    state = [dict(i, value=v) for i, v in zip(cb['state'], list(values[n_in:]) + [None] * len(cb['state']))]
+    if output.startswith('..'):
+        outputs = [dict(zip(('id', 'property'), o.split('.'))) for o in output.strip('.').split('...')]
+    else:
+        outputs = dict(zip(('id', 'property'), output.split('.')))
+    return {'output': output, 'outputs': outputs, 'inputs': inputs, 'state': state,
+            'changedPropIds': [f"{inputs[0]['id']}.{inputs[0]['property']}"]}
+def workload(n, dashboard_share, seed=0):
+    """n (kind, body) requests: dropdown cascades plus a share of full keyword-tab updates"""
+    rng = random.Random(seed)
+    objs = [None] + list(D.dropdown_options('Campaign_Objective'))
+    reqs = []
+    for _ in range(n):
+        obj = rng.choice(objs)
+        adv = rng.choice([None] + list(D.dropdown_options('Advertiser', obj)))
+        if rng.random() < dashboard_share:
+            reqs.append(('dashboard', callback_body('update_dashboard', [obj, adv, None, None, 'keyword-tab', None])))
+        else:
+            name, values = rng.choice([('load_advertisers', [obj]), ('load_campaign_types', [obj, adv]),
+                                       ('load_campaigns', [obj, adv, None])])
+            reqs.append(('dropdown', callback_body(name, values)))
+    return reqs
+def clear_caches():
+    """Cold filter, dropdown, sort, table and view caches, so every thread count does the same work"""
+    for f in (D.filtered_positions, D.dropdown_options, D.column_order, D.table_positions):
+        f.cache_clear()
+    D.view_flight.clear()
+def run(reqs, threads):
+    local = threading.local()
+    def send(req):
+        kind, body = req
+        if not hasattr(local, 'client'):
+            local.client = D.server.test_client()
+        t0 = time.perf_counter()
+        r = local.client.post('/_dash-update-component', json=body, headers={'Accept-Encoding': 'gzip'})
+        assert r.status_code == 200, r.status_code
+        return kind, time.perf_counter() - t0
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        results = list(pool.map(send, reqs))
+    return time.perf_counter() - t0, results
+
+def main():
+    ap = argparse.ArgumentParser(description='Mixed workload throughput by thread count')
+    ap.add_argument('--threads', default='1,2,4,8')
+    ap.add_argument('--requests', type=int, default=200)
+    ap.add_argument('--dashboard-share', type=float, default=0.2)
+    args = ap.parse_args()
+    reqs = workload(args.requests, args.dashboard_share)
+    run(reqs[:20], 1)  # warm up imports and code paths; the caches are cleared before each pass
+    print(f"{'threads':>8}{'req/s':>9}{'speedup':>9}{'dropdown p50 ms':>17}{'p95 ms':>9}{'dashboard p50 ms':>18}")
+    base = None
+    for threads in [int(t) for t in args.threads.split(',')]:
+        clear_caches()
+        wall, results = run(reqs, threads)
+        rps = len(reqs) / wall
+        base = base or rps
+        lat = {k: sorted(dt * 1000 for kind, dt in results if kind == k) for k in ('dropdown', 'dashboard')}
+        p95 = lat['dropdown'][int(len(lat['dropdown']) * 0.95) - 1] if lat['dropdown'] else 0
+        print(f"{threads:>8}{rps:>9.1f}{rps / base:>8.2f}x{statistics.median(lat['dropdown'] or [0]):>17.1f}"
+              f"{p95:>9.1f}{statistics.median(lat['dashboard'] or [0]):>18.1f}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,136 @@
+# coalesce.py
+# Request coalescing for expensive callback work.
+# SingleFlight runs one computation per key at a time and hands its result to every caller
+# that asked for the same key meanwhile; LatestOnly tells a request that a newer one from the
+# same session has replaced it, so it can stop before doing (more) heavy work. SingleFlight can
+# also keep the last cache_size results, so a repeated request is not recomputed at all.
+import threading
+import time
+from collections import OrderedDict
+
+class Superseded(Exception):
+    """Raised inside a computation nobody is waiting for any more"""
+
+class _Call:
+    def __init__(self, wanted):
+        self.done = threading.Event()
+        self.wanted = [wanted]
+        self.result = self.error = None
+        self.seconds = 0.0
+class SingleFlight:
+    """One in-flight computation per key, shared by all concurrent callers of that key, plus an
+    LRU of the cache_size most recent results (0 = no caching). Only results are cached, never
+    errors, and cached values are shared - callers must not mutate them.
+
+    With sizer(result) -> bytes, .bytes holds the size of the cached results, evict() drops the
+    oldest one and on_store() is called after each new result is cached (memory budgets).
+    """
+    def __init__(self, cache_size=0, sizer=None, on_store=None):
+        self.lock = threading.Lock()
+        self.calls = {}
+        self.results = OrderedDict()
+        self.cache_size = cache_size
+        self.sizer, self.on_store = sizer, on_store
+        self.sizes = {}
+        self.bytes = 0
+        self.stats = {'computed': 0, 'coalesced': 0, 'cached': 0, 'superseded': 0, 'seconds_saved': 0.0}
+
+    def do(self, key, fn, wanted=None):
+        """fn(still_wanted) for key, or the result of the identical call already running.
+
+        wanted() says whether this caller still needs the result (None = always). still_wanted()
+        is False once every caller sharing the call has been superseded; fn should then raise
+        Superseded, which is re-raised to all of them.
+        """
+        while True:
+            with self.lock:
+                if key in self.results:
+                    self.results.move_to_end(key)
+                    self.stats['cached'] += 1
+                    return self.results[key]
+                call = self.calls.get(key)
+                leader = call is None
+                if leader:
+                    call = self.calls[key] = _Call(wanted)
+                    self.stats['computed'] += 1
+                else:
+                    call.wanted.append(wanted)
+                    self.stats['coalesced'] += 1
+            if leader:
+                return self._lead(key, call, fn)
+            call.done.wait()
+            if isinstance(call.error, Superseded) and (wanted is None or wanted()):
+                continue  # joined just as the call gave up - run it again
+            if call.error is not None:
+                raise call.error
+            with self.lock:
+                self.stats['seconds_saved'] += call.seconds
+            return call.result
+    def _lead(self, key, call, fn):
+        t0 = time.perf_counter()
+        try:
+            call.result = fn(lambda: any(w is None or w() for w in call.wanted))
+            if self.cache_size:
+                size = self.sizer(call.result) if self.sizer else 0
+                with self.lock:
+                    self.results[key] = call.result
+                    self._sized(key, size)
+                    while len(self.results) > self.cache_size:
+                        self._sized(self.results.popitem(last=False)[0], None)
+                if self.on_store:
+                    self.on_store()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            if isinstance(e, Superseded):
+                with self.lock:
+                    self.stats['superseded'] += 1
+            raise
+        finally:
+            call.seconds = time.perf_counter() - t0
+            with self.lock:
+                del self.calls[key]
+            call.done.set()
+    def cached(self, key):
+        return key in self.results
+    def _sized(self, key, size):
+        """Account for key's cached result (size None = removed); call with the lock held"""
+        self.bytes += (size or 0) - self.sizes.pop(key, 0)
+        if size is not None:
+            self.sizes[key] = size
+    def evict(self):
+        """Drop the least recently used result; bytes freed (0 when the cache is empty)"""
+        with self.lock:
+            if not self.results:
+                return 0
+            key = self.results.popitem(last=False)[0]
+            freed = self.sizes.get(key, 0)
+            self._sized(key, None)
+            return freed
+    def clear(self):
+        with self.lock:
+            self.results.clear()
+            self.sizes.clear()
+            self.bytes = 0
+class LatestOnly:
+    """Generation counter per key (e.g. (session, tab)): a request stays current until a newer
+    request for the same key starts. Only the most recent max_keys keys are tracked."""
+    def __init__(self, max_keys=10000):
+        self.lock = threading.Lock()
+        self.generations = OrderedDict()
+        self.max_keys = max_keys
+        self.dropped = 0
+
+    def start(self, key):
+        """Register a new request for key; returns its is_current() check"""
+        with self.lock:
+            gen = self.generations.pop(key, 0) + 1
+            self.generations[key] = gen
+            if len(self.generations) > self.max_keys:
+                self.generations.popitem(last=False)
+        def is_current():
+            return self.generations.get(key, gen) == gen
+        return is_current
+    def drop(self):
+        with self.lock:
+            self.dropped += 1
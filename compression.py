@@ -0,0 +1,84 @@
+# compression.py
+# gzip / brotli compression of Flask responses, installed as an after_request hook
+# so it needs no extra package (brotli is used only when it is importable).
+import gzip
+import threading
+import time
+from collections import OrderedDict
+from flask import request
+try:
+    import brotli
+except ImportError:  # optional - gzip only
+    brotli = None
+
+COMPRESSIBLE_TYPES = {
+    'application/json', 'application/javascript', 'text/javascript',
+    'text/html', 'text/css', 'text/plain', 'text/csv',
+}
+
+def pick_encoding(accept_encoding):
+    accept = (accept_encoding or '').lower()
+    if brotli is not None and 'br' in accept:
+        return 'br'
+    if 'gzip' in accept:
+        return 'gzip'
+    return None
+def compress_bytes(data, encoding, gzip_level=6, brotli_quality=5):
+    if encoding == 'br':
+        return brotli.compress(data, quality=brotli_quality)
+    return gzip.compress(data, compresslevel=gzip_level)
+# Paths whose GET responses never change while the process runs (Dash bundles, layout and
+# dependencies, also under a url prefix); only these are served from the compressed-body cache
+STATIC_PATHS = ('/_dash-component-suites/', '/_dash-layout', '/_dash-dependencies')
+
+def cacheable(response, static_paths):
+    if request.method != 'GET' or 'no-store' in response.headers.get('Cache-Control', ''):
+        return False
+    return any(p in request.path for p in static_paths)
+def install_compression(server, min_size=1024, gzip_level=6, brotli_quality=5,
+                        on_response=None, static_cache_size=64, static_paths=STATIC_PATHS):
+    """Compress responses of at least min_size bytes for clients that accept gzip/br.
+
+    on_response(raw_bytes, sent_bytes, encoding, seconds) is called for every compressible
+    response. GET responses under static_paths never change while the process runs, so
+    their compressed bodies are kept in a small LRU keyed by path (locked, as gthread workers
+    serve several requests at once). Everything else - /metrics, health, stats, export job
+    status - is compressed afresh, and so is any response marked Cache-Control: no-store.
+    """
+    static_cache = OrderedDict()
+    lock = threading.Lock()
+
+    @server.after_request
+    def compress_response(response):
+        if (response.status_code != 200 or response.direct_passthrough or response.is_streamed
+                or 'Content-Encoding' in response.headers
+                or response.mimetype not in COMPRESSIBLE_TYPES):
+            return response
+        encoding = pick_encoding(request.headers.get('Accept-Encoding'))
+        response.vary.add('Accept-Encoding')
+        data = response.get_data()
+        if encoding is None or len(data) < min_size:
+            if on_response:
+                on_response(len(data), len(data), None, 0.0)
+            return response
+        t0 = time.perf_counter()
+        key = (request.full_path, encoding)
+        cache = static_cache_size and cacheable(response, static_paths)
+        with lock:
+            body = static_cache.get(key) if cache else None
+            if body is not None:
+                static_cache.move_to_end(key)
+        if body is None:
+            body = compress_bytes(data, encoding, gzip_level, brotli_quality)
+            if cache:
+                with lock:
+                    static_cache[key] = body
+                    if len(static_cache) > static_cache_size:
+                        static_cache.popitem(last=False)
+        response.set_data(body)
+        response.headers['Content-Encoding'] = encoding
+        if on_response:
+            on_response(len(data), len(body), encoding, time.perf_counter() - t0)
+        return response
+
+    return compress_response
@@ -0,0 +1,87 @@
+# computation.py
+# Per-request computation graph. Chart code asks a Computation for named nodes (the filtered
+# slice, a per-dimension aggregate, a top-K table, a chart) instead of computing them itself;
+# a node is evaluated lazily the first time it is asked for, at most once per request, and the
+# graph remembers what ran, what it depended on, how often it was reused and how long it took.
+# Inside a trace every evaluated node is also a span.
+import threading
+import time
+from tracing import span
+
+class _Node:
+    def __init__(self, key, order):
+        self.key, self.order = key, order
+        self.done = threading.Event()
+        self.value = self.error = None
+        self.deps = []
+        self.hits = 0
+        self.seconds = 0.0
+        self.dep_seconds = 0.0  # spent inside get() of its dependencies, computing or waiting
+class Computation:
+    """Lazily evaluated, memoized nodes for one request.
+
+    nodes maps a node name to fn(comp, *args); comp.get(name, *args) runs it on first use
+    and returns the same value afterwards - also to other threads, which wait for the one
+    evaluation instead of starting their own. Values are shared, so callers must not mutate
+    them. inputs become nodes without a function (comp.get('filters') etc.).
+    """
+    def __init__(self, nodes, **inputs):
+        self.fns = nodes
+        self.lock = threading.Lock()
+        self.nodes = {}
+        self.local = threading.local()
+        for name, value in inputs.items():
+            node = self.nodes[(name,)] = _Node((name,), len(self.nodes))
+            node.value = value
+            node.done.set()
+
+    def get(self, name, *args):
+        key = (name,) + args
+        with self.lock:
+            node = self.nodes.get(key)
+            owner = node is None
+            if owner:
+                node = self.nodes[key] = _Node(key, len(self.nodes))
+            else:
+                node.hits += 1
+        stack = self.local.__dict__.setdefault('stack', [])
+        parent = stack[-1] if stack else None
+        if parent is not None and key not in parent.deps:
+            parent.deps.append(key)
+        t0 = time.perf_counter()
+        if owner:
+            stack.append(node)
+            try:
+                with span(node_label(key)):
+                    node.value = self.fns[name](self, *args)
+            except BaseException as e:
+                node.error = e
+            finally:
+                node.seconds = time.perf_counter() - t0
+                stack.pop()
+                node.done.set()
+        else:
+            node.done.wait()
+        if parent is not None:
+            parent.dep_seconds += time.perf_counter() - t0
+        if node.error is not None:
+            raise node.error
+        return node.value
+    def report(self):
+        """One dict per evaluated node, in evaluation order: key, ms (including its dependencies),
+        self_ms, hits (times it was reused) and deps"""
+        rows = []
+        for node in sorted(self.nodes.values(), key=lambda n: n.order):
+            rows.append({'node': node_label(node.key), 'ms': round(node.seconds * 1000, 2),
+                         'self_ms': round(max(node.seconds - node.dep_seconds, 0) * 1000, 2),
+                         'hits': node.hits, 'deps': [node_label(k) for k in node.deps]})
+        return rows
+    def summary(self, top=3):
+        """'N nodes, M reused, slowest: ...' by self time"""
+        rows = self.report()
+        slowest = sorted(rows, key=lambda r: -r['self_ms'])[:top]
+        return (f"{len(rows)} nodes, {sum(r['hits'] for r in rows)} reused, slowest: " +
+                ", ".join(f"{r['node']} {r['self_ms']:.0f} ms" for r in slowest))
+def node_label(key):
+    name, args = key[0], key[1:]
+    return f"{name}({', '.join(map(repr, args))})" if args else name
@@ -0,0 +1,207 @@
+# export_jobs.py
+# Background export jobs: exports are written to disk by a small local thread pool so a
+# large download never runs inside a web request (and never hits the gunicorn timeout).
+# Jobs are content-addressed - the id is a hash of what they export (dataset version,
+# filters, format) - so identical requests share one job and a finished file is reused,
+# even by a later worker process, until it is evicted. Each finished file has a <job id>.meta
+# next to it (filename, format), so any worker can serve it after a restart.
+import hashlib
+import json
+import logging
+import os
+import re
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from exports import EXPORT_CHUNK_ROWS, iter_export
+
+log = logging.getLogger('dashboard.exports')
+EXPORT_DIR = os.environ.get('EXPORT_DIR', os.path.join(tempfile.gettempdir(), 'dashboard_exports'))
+EXPORT_WORKERS = int(os.environ.get('EXPORT_WORKERS', 2))
+EXPORT_TTL = int(os.environ.get('EXPORT_TTL', 7 * 24 * 3600))  # seconds an unused file is kept
+EXPORT_CACHE_BYTES = int(os.environ.get('EXPORT_CACHE_BYTES', 512 * 1024 * 1024))
+
+JOB_ID = re.compile(r'[0-9a-f]{16}')
+
+def job_id(key):
+    return hashlib.sha1(json.dumps(key, default=str).encode()).hexdigest()[:16]
+def write_export(path, frame, positions=None, fmt='csv', progress=None, chunk_rows=EXPORT_CHUNK_ROWS):
+    """Write an export to path via a .part file, so a half-written file is never served"""
+    tmp = f"{path}.part"
+    with open(tmp, 'wb') as f:
+        for piece in iter_export(frame, positions, fmt, chunk_rows, progress):
+            f.write(piece)
+    os.replace(tmp, path)
+def _remove(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+class ExportJobs:
+    """Thread-pool export queue with progress, deduplication and a size-bounded file cache.
+
+    build() passed to submit runs on a worker thread and returns (frame, positions); the
+    rows are then written to EXPORT_DIR/<job id>.<fmt>. Files unused for ttl seconds are
+    deleted, and least recently used files go first once the cache exceeds max_bytes.
+    guard(filename, frame, positions), if given, returns a context manager the file is written
+    in; raising from it fails the job with that message (memory budget).
+    """
+    def __init__(self, directory=EXPORT_DIR, max_workers=EXPORT_WORKERS, ttl=EXPORT_TTL,
+                 max_bytes=EXPORT_CACHE_BYTES, guard=None):
+        self.directory, self.ttl, self.max_bytes, self.guard = directory, ttl, max_bytes, guard
+        os.makedirs(directory, exist_ok=True)
+        self.pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='export')
+        self.jobs = {}
+        self.lock = threading.Lock()
+
+    def path(self, jid, fmt=None):
+        if fmt is None:
+            job = self.jobs.get(jid)
+            fmt = job and job['format']
+        return fmt and os.path.join(self.directory, f"{jid}.{fmt}")
+    def submit(self, key, filename, fmt, build):
+        """Job id for key; a job is started only if there is no live job or cached file for it"""
+        jid = job_id([key, fmt])
+        self.expire()
+        with self.lock:
+            job = self.jobs.get(jid)
+            gone = job and job['state'] == 'done' and not os.path.exists(self.path(jid))
+            if job and job['state'] != 'failed' and not gone:
+                self.touch(jid)
+                return jid
+            job = {'id': jid, 'state': 'queued', 'filename': f"{filename}.{fmt}", 'format': fmt,
+                   'rows_done': 0, 'rows_total': None, 'error': None,
+                   'created': time.time(), 'finished': None}
+            self.jobs[jid] = job
+            if os.path.exists(self.path(jid)):  # written earlier, possibly by another worker process
+                job['state'], job['finished'] = 'done', time.time()
+                if not os.path.exists(self.meta_path(jid)):
+                    self._write_meta(job)
+                self.touch(jid)
+                return jid
+        self.pool.submit(self._run, jid, build)
+        return jid
+    def _run(self, jid, build):
+        job = self.jobs[jid]
+        job['state'] = 'running'
+        def progress(done, total):
+            job['rows_done'], job['rows_total'] = done, total
+        try:
+            frame, positions = build()
+            with self.guard(job['filename'], frame, positions) if self.guard else nullcontext():
+                write_export(self.path(jid), frame, positions, job['format'], progress)
+            self._write_meta(job)
+            job['state'] = 'done'
+        except Exception as e:
+            log.error("❌ Export %s failed: %s", jid, e)
+            job['state'], job['error'] = 'failed', str(e)
+        job['finished'] = time.time()
+        self.evict()
+    def meta_path(self, jid):
+        return os.path.join(self.directory, f"{jid}.meta")
+    def _write_meta(self, job):
+        tmp = f"{self.meta_path(job['id'])}.part"
+        with open(tmp, 'w') as f:
+            json.dump({'filename': job['filename'], 'format': job['format']}, f)
+        os.replace(tmp, self.meta_path(job['id']))
+    def _restore(self, jid):
+        """Job record for a finished file on disk that this process has no job for (written by
+        another worker, or before this one was recycled); None if there is none"""
+        if not JOB_ID.fullmatch(jid):
+            return None
+        try:
+            with open(self.meta_path(jid)) as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if not os.path.exists(self.path(jid, meta['format'])):
+            return None
+        finished = os.path.getmtime(self.path(jid, meta['format']))
+        with self.lock:
+            return self.jobs.setdefault(jid, {
+                'id': jid, 'state': 'done', 'filename': meta['filename'], 'format': meta['format'],
+                'rows_done': 0, 'rows_total': None, 'error': None, 'created': finished, 'finished': finished})
+    def status(self, jid):
+        """Job state and progress; None for unknown jobs and for finished ones whose file is gone"""
+        job = self.jobs.get(jid) or self._restore(jid)
+        if job is None or (job['state'] == 'done' and not os.path.exists(self.path(jid))):
+            self.forget(jid)
+            return None
+        status = dict(job)
+        total = job['rows_total']
+        status['progress'] = 1.0 if job['state'] == 'done' else (job['rows_done'] / total if total else 0.0)
+        return status
+    def forget(self, jid):
+        """Drop a finished job whose file was deleted (e.g. by another worker's evict() or expire()),
+        so the next submit writes it again"""
+        with self.lock:
+            job = self.jobs.get(jid)
+            if job is not None and job['state'] == 'done':
+                del self.jobs[jid]
+    def cached_file(self, key, fmt):
+        """(job id, path) of the finished file for key, or (job id, None) if it is not on disk yet"""
+        jid = job_id([key, fmt])
+        job = self.jobs.get(jid)
+        path = self.path(jid, fmt)
+        if (job is None or job['state'] == 'done') and os.path.exists(path):
+            self.touch(jid, fmt)
+            return jid, path
+        return jid, None
+    def touch(self, jid, fmt=None):
+        """Mark a file as just used - the mtime is what expiry and LRU eviction go by"""
+        try:
+            os.utime(self.path(jid, fmt))
+        except (OSError, TypeError):
+            pass
+    def _files(self):
+        """(mtime, size, job id, path) of the finished export files - not .part files still being
+        written (possibly by another worker) nor the .meta files"""
+        files = []
+        for name in os.listdir(self.directory):
+            if name.endswith(('.part', '.meta')):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            files.append((st.st_mtime, st.st_size, name.split('.')[0], path))
+        return files
+    def _drop(self, jid, path):
+        job = self.jobs.get(jid)
+        if job is not None and job['state'] in ('queued', 'running'):
+            return False
+        self.jobs.pop(jid, None)
+        _remove(path)
+        _remove(self.meta_path(jid))
+        return True
+    def expire(self):
+        """Delete files (and forget their jobs) not used for ttl seconds"""
+        now = time.time()
+        with self.lock:
+            for jid, job in list(self.jobs.items()):
+                if job['state'] == 'failed' and now - job['finished'] > self.ttl:
+                    del self.jobs[jid]
+            for mtime, _, jid, path in self._files():
+                if now - mtime > self.ttl:
+                    self._drop(jid, path)
+            for name in os.listdir(self.directory):  # left behind by a worker killed mid-write
+                path = os.path.join(self.directory, name)
+                try:
+                    stale = name.endswith('.part') and now - os.path.getmtime(path) > self.ttl
+                except OSError:
+                    continue
+                if stale:
+                    _remove(path)
+    def evict(self):
+        """Delete least recently used files until the cache fits in max_bytes"""
+        with self.lock:
+            files = sorted(self._files())
+            total = sum(size for _, size, _, _ in files)
+            for _, size, jid, path in files:
+                if total <= self.max_bytes:
+                    break
+                if self._drop(jid, path):
+                    total -= size
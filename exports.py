@@ -0,0 +1,89 @@
+# exports.py
+# Streamed data exports: a frame (optionally restricted to row positions) is serialized
+# chunk by chunk, so an export never holds more than chunk_rows rows of output in memory
+# and the first bytes reach the browser before the last rows are formatted.
+import zlib
+from flask import Response, stream_with_context
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # optional - csv / csv.gz only
+    pa = pq = None
+
+EXPORT_CHUNK_ROWS = 20000
+EXPORT_FORMATS = {
+    'csv': 'text/csv',
+    'csv.gz': 'application/gzip',
+    'parquet': 'application/vnd.apache.parquet',
+}
+
+def available_formats():
+    return [f for f in EXPORT_FORMATS if f != 'parquet' or pq is not None]
+def iter_chunks(frame, positions=None, chunk_rows=EXPORT_CHUNK_ROWS, progress=None):
+    """Row slices of frame (or of frame.iloc[positions]), chunk_rows at a time.
+
+    progress(rows_done, rows_total) is called before each chunk is handed out and once at the end.
+    """
+    n = len(frame) if positions is None else len(positions)
+    for start in range(0, n, chunk_rows):
+        if progress:
+            progress(start, n)
+        if positions is None:
+            yield frame.iloc[start:start + chunk_rows]
+        else:
+            yield frame.iloc[positions[start:start + chunk_rows]]
+    if progress:
+        progress(n, n)
+def iter_csv(frame, positions=None, chunk_rows=EXPORT_CHUNK_ROWS, progress=None):
+    yield frame.iloc[:0].to_csv(index=False).encode('utf-8')
+    for chunk in iter_chunks(frame, positions, chunk_rows, progress):
+        yield chunk.to_csv(index=False, header=False).encode('utf-8')
+def iter_gzip(pieces, level=6):
+    """gzip-compress a byte stream piece by piece (wbits=31 writes the gzip header/trailer)"""
+    z = zlib.compressobj(level, zlib.DEFLATED, 31)
+    for piece in pieces:
+        out = z.compress(piece)
+        if out:
+            yield out
+    yield z.flush()
+class _ParquetSink:
+    """Write-only file object for ParquetWriter that hands written bytes back to the generator"""
+    def __init__(self):
+        self.pieces, self.pos, self.closed = [], 0, False
+    def write(self, data):
+        self.pieces.append(bytes(data))
+        self.pos += len(data)
+        return len(data)
+    def tell(self):
+        return self.pos
+    def flush(self):
+        pass
+    def close(self):
+        self.closed = True
+    def drain(self):
+        pieces, self.pieces = self.pieces, []
+        return b''.join(pieces)
+def iter_parquet(frame, positions=None, chunk_rows=EXPORT_CHUNK_ROWS, progress=None):
+    """One parquet row group per chunk"""
+    sink, writer = _ParquetSink(), None
+    for chunk in iter_chunks(frame, positions, chunk_rows, progress):
+        table = pa.Table.from_pandas(chunk, preserve_index=False)
+        if writer is None:
+            writer = pq.ParquetWriter(sink, table.schema)
+        writer.write_table(table)
+        yield sink.drain()
+    if writer is None:
+        writer = pq.ParquetWriter(sink, pa.Schema.from_pandas(frame.iloc[:0], preserve_index=False))
+    writer.close()
+    yield sink.drain()
+def iter_export(frame, positions=None, fmt='csv', chunk_rows=EXPORT_CHUNK_ROWS, progress=None):
+    if fmt == 'parquet':
+        return iter_parquet(frame, positions, chunk_rows, progress)
+    pieces = iter_csv(frame, positions, chunk_rows, progress)
+    return iter_gzip(pieces) if fmt == 'csv.gz' else pieces
+def export_response(frame, positions, filename, fmt='csv', chunk_rows=EXPORT_CHUNK_ROWS):
+    """Chunked download response for frame.iloc[positions] (whole frame if positions is None)"""
+    return Response(stream_with_context(iter_export(frame, positions, fmt, chunk_rows)),
+                    mimetype=EXPORT_FORMATS[fmt],
+                    headers={'Content-Disposition': f'attachment; filename="{filename}.{fmt}"',
+                             'X-Accel-Buffering': 'no'})
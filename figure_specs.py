@@ -0,0 +1,270 @@
+# figure_specs.py
+# Plain-dict figure builders for the dashboard charts.
+# dcc.Graph accepts {'data': [...], 'layout': {...}} directly, so building figures
+# as dicts skips the property-by-property validation go.Figure / make_subplots do.
+import base64
+import copy
+import hashlib
+import json
+import numpy as np
+import plotly.io as pio
+
+COLORS = {
+    'primary': '#00D9FF',
+    'secondary': '#FF6B9D',
+    'success': '#00F5A0',
+    'warning': '#FFD93D',
+    'danger': '#FF6B6B',
+    'info': '#A78BFA',
+    'background': '#0F1419',
+    'card_bg': '#121419',
+    'text': '#E5E7EB',
+    'muted': '#9CA3AF'
+}
+PLOT_TEMPLATE = {
+    'layout': {
+        'font': {'color': 'white', 'family': 'Arial, sans-serif'},
+        'xaxis': {'gridcolor': 'rgba(255,255,255,0.1)', 'color': 'white'},
+        'yaxis': {'gridcolor': 'rgba(255,255,255,0.1)', 'color': 'white'},
+        'paper_bgcolor': 'rgba(0,0,0,0)',
+        'plot_bgcolor': 'rgba(30,30,40,0.3)'
+    }
+}
+# plotly's default layout template (zerolines, hover labels, colorway, ...), which go.Figure embeds
+# in every figure; the dict figures carry the same one. Shared by all of them, never modified.
+DEFAULT_TEMPLATE = pio.templates[pio.templates.default].to_plotly_json()
+# Stands in for DEFAULT_TEMPLATE in figure signatures, so it is serialized once, not per figure
+TEMPLATE_HASH = hashlib.md5(json.dumps(DEFAULT_TEMPLATE, sort_keys=True).encode()).hexdigest()
+# Above this many points a bubble trace is rendered with WebGL instead of SVG
+SCATTERGL_THRESHOLD = 1000
+# (metric, color, text format, hover value, subplot row, subplot col) for the 2x2 metric grids
+METRIC_PANELS = [
+    ('CTR', COLORS['info'], '{:.1f}%', 'CTR: %{y:.2f}%', 1, 1),
+    ('CVR', COLORS['success'], '{:.1f}%', 'CVR: %{y:.2f}%', 1, 2),
+    ('ROAS', COLORS['primary'], '{:.1f}x', 'ROAS: %{y:.2f}x', 2, 1),
+    ('CPA', COLORS['warning'], '${:.1f}', 'CPA: $%{y:.2f}', 2, 2),
+]
+METRIC_Y_TITLES = ("CTR (%)", "CVR (%)", "ROAS", "CPA ($)")
+# Float arrays are sent as float32 when every value round-trips within this relative tolerance
+FLOAT32_RTOL = 1e-6
+# Shorter arrays stay JSON lists; the {'dtype', 'bdata'} wrapper costs more than it saves
+TYPED_ARRAY_MIN_LEN = 8
+# Smallest integer typed arrays plotly.js can decode, tried in order (it has no int64)
+_INT_DTYPES = [('i1', np.int8), ('u1', np.uint8), ('i2', np.int16), ('u2', np.uint16),
+               ('i4', np.int32), ('u4', np.uint32)]
+# -----------------------------
+# COLORS
+# -----------------------------
+def cvr_color(val, metric='CVR'):
+    if metric == 'CVR':
+        if val >= 1.0:
+            return COLORS['success']
+        if val < 0.5:
+            return COLORS['danger']
+        return COLORS['warning']
+    elif metric == 'CPA':
+        if val <= 50:
+            return COLORS['success']
+        if val > 150:
+            return COLORS['danger']
+        return COLORS['warning']
+    elif metric == 'ROAS':
+        if val >= 3.0:
+            return COLORS['success']
+        if val < 1.5:
+            return COLORS['danger']
+        return COLORS['warning']
+    return COLORS['info']
+def cvr_colors(values, metric='CVR'):
+    """Vectorized cvr_color: one np.select over the whole column instead of .apply"""
+    v = np.asarray(values, dtype=float)
+    if metric == 'CVR':
+        conds = [v >= 1.0, v < 0.5]
+    elif metric == 'CPA':
+        conds = [v <= 50, v > 150]
+    elif metric == 'ROAS':
+        conds = [v >= 3.0, v < 1.5]
+    else:
+        return np.full(v.shape, COLORS['info'], dtype=object)
+    return np.select(conds, [COLORS['success'], COLORS['danger']], default=COLORS['warning']).astype(object)
+# -----------------------------
+# LAYOUTS
+# -----------------------------
+def _merge(base, overrides):
+    for k, v in overrides.items():
+        if isinstance(v, dict) and isinstance(base.get(k), dict):
+            _merge(base[k], v)
+        else:
+            base[k] = v
+    return base
+def dark_layout(**overrides):
+    """Copy of the PLOT_TEMPLATE layout with overrides deep-merged in, on plotly's default template"""
+    layout = _merge(copy.deepcopy(PLOT_TEMPLATE['layout']), overrides)
+    layout.setdefault('template', DEFAULT_TEMPLATE)
+    return layout
+def figure_spec(data=None, **layout):
+    return {'data': list(data or []), 'layout': dark_layout(**layout)}
+def grid_2x2(titles, vertical_spacing=0.12, horizontal_spacing=0.1, x_title=None, y_titles=None,
+             x_axis=None, y_axis=None, **layout):
+    """Empty 2x2 subplot figure, laid out the same way make_subplots(rows=2, cols=2) does"""
+    w = (1 - horizontal_spacing) / 2
+    h = (1 - vertical_spacing) / 2
+    x_domains = [[0, w], [w + horizontal_spacing, 1]]
+    y_domains = [[1 - h, 1], [0, h]]
+    fig = figure_spec(**layout)
+    lay = fig['layout']
+    axis_style = PLOT_TEMPLATE['layout']
+    annotations = []
+    for i in range(4):
+        row, col = divmod(i, 2)
+        n = '' if i == 0 else str(i + 1)
+        xaxis = dict(axis_style['xaxis'], anchor=f'y{n}', domain=x_domains[col])
+        yaxis = dict(axis_style['yaxis'], anchor=f'x{n}', domain=y_domains[row])
+        if x_title:
+            xaxis['title'] = {'text': x_title}
+        if y_titles:
+            yaxis['title'] = {'text': y_titles[i]}
+        _merge(xaxis, copy.deepcopy(x_axis or {}))
+        _merge(yaxis, copy.deepcopy(y_axis or {}))
+        lay[f'xaxis{n}'] = xaxis
+        lay[f'yaxis{n}'] = yaxis
+        if titles and i < len(titles):
+            annotations.append({
+                'text': titles[i], 'x': sum(x_domains[col]) / 2, 'y': y_domains[row][1],
+                'xref': 'paper', 'yref': 'paper', 'xanchor': 'center', 'yanchor': 'bottom',
+                'showarrow': False, 'font': {'size': 16}
+            })
+    lay['annotations'] = annotations + lay.get('annotations', [])
+    return fig
+def add_trace(fig, trace, row=None, col=None):
+    if row is not None:
+        n = (row - 1) * 2 + col
+        trace['xaxis'] = 'x' if n == 1 else f'x{n}'
+        trace['yaxis'] = 'y' if n == 1 else f'y{n}'
+    fig['data'].append(trace)
+    return fig
+# -----------------------------
+# TRACES
+# -----------------------------
+def scatter_trace(n_points, **props):
+    """One scatter trace for all points; switches to scattergl for large point counts"""
+    props['type'] = 'scattergl' if n_points > SCATTERGL_THRESHOLD else 'scatter'
+    return props
+def treemap_figure(labels, values, text, colors, textfont_size=12, height=450):
+    return figure_spec([{
+        'type': 'treemap',
+        'labels': labels,
+        'parents': [''] * len(labels),
+        'values': values,
+        'text': text,
+        'textposition': 'middle center',
+        'marker': {'colors': colors, 'line': {'width': 2, 'color': '#1a1a1a'}},
+        'textfont': {'size': textfont_size, 'color': 'white'}
+    }], margin=dict(l=5, r=5, t=5, b=5), height=height)
+def add_metric_markers(fig, grp, x_col, x_label, size):
+    """Marker-only CTR/CVR/ROAS/CPA traces, hover shows the group's top keywords"""
+    for metric, color, _, hover_value, row, col in METRIC_PANELS:
+        add_trace(fig, scatter_trace(
+            len(grp),
+            x=grp[x_col], y=grp[metric],
+            mode='markers',
+            marker=dict(size=size, color=color, opacity=0.7),
+            customdata=grp['top_keywords'],
+            hovertemplate=f"<b>{x_label}: %{{x}}</b><br>{hover_value}<br><br>Top Keywords:<br>%{{customdata}}<extra></extra>",
+            name=metric), row=row, col=col)
+    return fig
+def add_metric_bubbles(fig, grp, x_col, x_label, size, textposition='middle center'):
+    """Labelled CTR/CVR/ROAS/CPA bubbles, hover shows clicks and top keywords"""
+    customdata = list(zip(grp['Clicks'], grp['top_keywords']))
+    for metric, color, text_fmt, hover_value, row, col in METRIC_PANELS:
+        add_trace(fig, scatter_trace(
+            len(grp),
+            x=grp[x_col], y=grp[metric],
+            mode='markers+text',
+            text=[text_fmt.format(v) for v in grp[metric]],
+            textposition=textposition,
+            textfont=dict(size=11, color='white'),
+            marker=dict(size=size, color=color, opacity=0.8),
+            customdata=customdata,
+            hovertemplate=f"<b>{x_label}: %{{x}}</b><br>{hover_value}<br>" +
+                          "<b>Clicks: %{customdata[0]:,}</b><br>" +
+                          "<b>Top Keywords:</b><br>%{customdata[1]}<extra></extra>",
+            showlegend=False), row=row, col=col)
+    return fig
+# -----------------------------
+# BINARY ENCODING
+# -----------------------------
+def typed_array(values, float32_rtol=FLOAT32_RTOL):
+    """Base64 typed array ({'dtype', 'bdata'}) for a 1-D numeric array, None for anything else"""
+    a = np.asarray(values)
+    if a.ndim != 1 or a.size < TYPED_ARRAY_MIN_LEN or a.dtype.kind not in 'iuf':
+        return None
+    if a.dtype.kind == 'f' and np.isfinite(a).all() and (a == np.trunc(a)).all() and np.abs(a).max() < 2 ** 31:
+        a = a.astype(np.int64)  # integral floats such as summed clicks pack into int arrays
+    if a.dtype.kind in 'iu':
+        lo, hi = a.min(), a.max()
+        for code, dt in _INT_DTYPES:
+            info = np.iinfo(dt)
+            if lo >= info.min and hi <= info.max:
+                a = a.astype(dt)
+                break
+        else:
+            code, a = 'f8', a.astype(np.float64)
+    else:
+        with np.errstate(over='ignore', invalid='ignore'):
+            f4 = a.astype(np.float32)
+            fits = np.allclose(f4, a, rtol=float32_rtol, atol=0, equal_nan=True)
+        code, a = ('f4', f4) if fits else ('f8', a.astype(np.float64))
+    a = a.astype(a.dtype.newbyteorder('<'), copy=False)
+    return {'dtype': code, 'bdata': base64.b64encode(a.tobytes()).decode('ascii')}
+def _encode_arrays(node):
+    for k, v in node.items():
+        if isinstance(v, dict):
+            _encode_arrays(v)
+        elif isinstance(v, (list, tuple)) or hasattr(v, '__array__'):
+            enc = typed_array(v)
+            if enc is not None:
+                node[k] = enc
+def encode_figure(fig):
+    """Replace the numeric arrays of every trace with base64 typed arrays (needs plotly.js >= 2.28).
+
+    Dict figures are encoded in place; go.Figure objects are converted to a dict first.
+    """
+    if hasattr(fig, 'to_dict'):
+        fig = fig.to_dict()
+    for trace in fig.get('data', []):
+        _encode_arrays(trace)
+    return fig
+# -----------------------------
+# INCREMENTAL UPDATES
+# -----------------------------
+def _is_array(v):
+    return isinstance(v, (list, tuple)) or hasattr(v, '__array__') or (isinstance(v, dict) and 'bdata' in v)
+def _split(node, path, updates):
+    skeleton = {}
+    for k, v in node.items():
+        if _is_array(v):
+            updates.append((path + (k,), v))
+            skeleton[k] = None
+        elif isinstance(v, dict):
+            skeleton[k] = _split(v, path + (k,), updates)
+        else:
+            skeleton[k] = v
+    return skeleton
+def figure_structure(fig):
+    """(signature, updates) for a dict figure.
+
+    The signature hashes everything except trace arrays and layout annotations, so two
+    figures with the same signature differ only in those. updates lists (path, value) for
+    each of them - what a dash.Patch has to replace to turn one into the other.
+    """
+    updates = []
+    data = [_split(trace, ('data', i), updates) for i, trace in enumerate(fig.get('data', []))]
+    layout = dict(fig.get('layout', {}))
+    if 'annotations' in layout:
+        updates.append((('layout', 'annotations'), layout['annotations']))
+        layout['annotations'] = None
+    if layout.get('template') is DEFAULT_TEMPLATE:
+        layout['template'] = TEMPLATE_HASH
+    key = json.dumps([data, layout], sort_keys=True, default=str)
+    return hashlib.md5(key.encode()).hexdigest(), updates
@@ -0,0 +1,39 @@
+# health.py
+# Liveness / readiness endpoints for load balancers. /healthz answers as long as the process
+# can serve at all; /readyz only once ready() says the worker can take user traffic (data
+# loaded, indexes and essential caches built), so a half-loaded worker gets none.
+import os
+from flask import jsonify
+try:
+    import resource
+except ImportError:  # Windows - no RSS figure
+    resource = None
+
+class StartupFailed(SystemExit):
+    """Raised by the app module when it cannot start; carries a fallback server that still
+    answers /healthz and /readyz (see wsgi.py)"""
+    def __init__(self, message, server):
+        super().__init__(message)
+        self.server = server
+
+def rss_bytes():
+    """Current resident set size (Linux), else the peak reported by getrusage, else None"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        if resource is None:
+            return None
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if os.uname().sysname == 'Darwin' else peak * 1024
+def install_health(server, report, ready):
+    """GET /healthz -> 200 + report(); GET /readyz -> report() with 200 once ready() is true, 503 before"""
+    # no-store: the phase changes during startup, so no cache (compression.py) may hold an answer
+    headers = {'Cache-Control': 'no-store'}
+    @server.route('/healthz')
+    def healthz():
+        return jsonify(dict(report(), status='ok')), 200, headers
+    @server.route('/readyz')
+    def readyz():
+        ok = ready()
+        return jsonify(dict(report(), status='ready' if ok else 'not ready')), 200 if ok else 503, headers
@@ -0,0 +1,135 @@
+# ingest.py
+# Loading and typing of the CSV datasets, driven by one schema per dataset: canonical column
+# name -> Column(aliases, kind, absent). read_dataset() parses the schema's columns plus the
+# extra ones asked for (EXTRA_COLUMNS in the app): the header is read first, each column is
+# matched through its aliases, and read_csv gets usecols and nrows, so the frame is renamed and
+# projected as it is parsed and no raw copy is kept next to the working one. prepare() then
+# types the frame in place - all 'number' columns that came in as text are parsed together in
+# one vectorized pass - and reports the values that did not parse. A new dataset only needs a
+# schema.
+import io
+import logging
+import os
+import re
+from collections import namedtuple
+import numpy as np
+import pandas as pd
+import requests
+
+log = logging.getLogger('dashboard.ingest')
+
+# kind: 'text' (kept as read), 'label' (text; blanks and stray ',' become 'Unknown') or 'number'
+# (see parse_numbers; blanks and unparsable values become 0). absent: the column's value when
+# the CSV has no such column (None: leave it out).
+Column = namedtuple('Column', ['aliases', 'kind', 'absent'], defaults=('text', np.nan))
+# currency signs, thousands separators, spaces and a trailing % ('$1,234', '1.2%' -> 1234, 1.2:
+# the percent metrics are in percent already)
+NUMBER_NOISE = re.compile(r'[$€£,%\s]')
+# A comma is only read as a thousands separator between groups of three digits. Decimal commas
+# are not supported: '1,5' or '1,23' fails (and is reported) instead of becoming 15 or 123;
+# '1,500' is always fifteen hundred.
+THOUSANDS = re.compile(r'[^\d,]*\d{1,3}(,\d{3})+(\.\d*)?[^\d,]*')
+BLANKS = ('', '-', '--')
+FAILED_SAMPLE = 5  # rows listed per column in the coercion report
+
+def find_col(df, candidates):
+    for c in candidates:
+        if c in df.columns:
+            return c
+    lower_cols = {col.lower(): col for col in df.columns}
+    for c in candidates:
+        if c.lower() in lower_cols:
+            return lower_cols[c.lower()]
+    return None
+
+def fetch_source(local_file, file_id, label):
+    """The local file's path, or the CSV downloaded from Google Drive (always on Render, else
+    when the local file is missing) as a StringIO"""
+    if not os.environ.get('RENDER'):
+        if os.path.exists(local_file):
+            log.info("📂 Loading %s data from local file...", label)
+            return local_file
+        log.warning("⚠️ Local file not found, loading from Google Drive...")
+    else:
+        log.info("📥 Loading %s data from Google Drive...", label)
+    response = requests.get(f"https://drive.google.com/uc?export=download&id={file_id}", timeout=120)
+    response.raise_for_status()
+    return io.StringIO(response.text)
+def rewind(source):
+    if not isinstance(source, str):
+        source.seek(0)
+    return source
+
+def read_dataset(source, schema, extra=(), nrows=None):
+    """Frame of the schema's columns found in the CSV, renamed, plus the extra ones as they are
+    ('*' = all) - in file order, at most nrows rows"""
+    header = pd.read_csv(rewind(source), nrows=0)
+    rename = {}
+    for name, column in schema.items():
+        col = find_col(header, column.aliases)
+        if col:
+            rename[col] = name
+    keep = [c for c in header.columns if c in rename or c in extra or '*' in extra]
+    frame = pd.read_csv(rewind(source), usecols=keep, nrows=nrows, low_memory=False)
+    frame.rename(columns=rename, inplace=True)
+    dropped = len(header.columns) - len(keep)
+    if dropped:
+        log.info("✂️ Skipped %d unused columns: %s", dropped, ', '.join(c for c in header.columns if c not in keep))
+    return frame
+def load_dataset(local_file, file_id, label, schema, extra=(), nrows=None):
+    """read_dataset() from the local file or Google Drive; an empty frame when loading fails"""
+    try:
+        frame = read_dataset(fetch_source(local_file, file_id, label), schema, extra, nrows)
+        log.info("✅ Loaded %d %s rows, %d columns%s", len(frame), label, len(frame.columns),
+                 f" (limited to {nrows})" if nrows else "")
+        return frame
+    except Exception as e:
+        log.error("❌ Error loading %s data: %s", label, e)
+        return pd.DataFrame()
+
+def parse_numbers(frame, columns):
+    """Parse columns as numbers in place, blanks and failures -> 0. Columns read_csv already
+    typed are only filled; the text ones are stacked and cleaned / parsed in a single pass.
+    Returns {column: (row positions, raw values)} of the values that did not parse."""
+    failures = {}
+    text = []
+    for c in columns:
+        if pd.api.types.is_numeric_dtype(frame[c]):
+            frame[c] = frame[c].fillna(0)
+        else:
+            text.append(c)
+    if not text:
+        return failures
+    raw = pd.concat([frame[c] for c in text], ignore_index=True)
+    as_text = raw.astype(str).str.strip()
+    ambiguous = (as_text.str.contains(',', regex=False) & ~as_text.str.fullmatch(THOUSANDS)).to_numpy()
+    cleaned = as_text.str.replace(NUMBER_NOISE, '', regex=True)
+    cleaned = cleaned.str.replace(r'^\((.*)\)$', r'-\1', regex=True)  # accounting negatives: (12) -> -12
+    values = pd.to_numeric(cleaned, errors='coerce').to_numpy(dtype=float)
+    values[ambiguous] = np.nan
+    failed = np.isnan(values) & raw.notna().to_numpy() & ~cleaned.isin(BLANKS).to_numpy()
+    n = len(frame)
+    for i, c in enumerate(text):
+        bad = np.flatnonzero(failed[i * n:(i + 1) * n])
+        if len(bad):
+            failures[c] = (bad, frame[c].iloc[bad[:FAILED_SAMPLE]].tolist())
+        frame[c] = np.nan_to_num(values[i * n:(i + 1) * n], nan=0.0)
+    return failures
+def prepare(frame, schema, label):
+    """Type frame in place by its schema and add the absent columns. Returns the coercion
+    report {column: {'failed': count, 'lines': CSV line numbers, 'values': raw values}} (samples)."""
+    present = [name for name in schema if name in frame.columns]
+    failures = parse_numbers(frame, [name for name in present if schema[name].kind == 'number'])
+    for name in present:
+        if schema[name].kind == 'label':
+            frame[name] = frame[name].fillna('Unknown').astype(str).replace(',', 'Unknown')
+    for name, column in schema.items():
+        if name not in frame.columns and column.absent is not None:
+            frame[name] = column.absent
+    report = {}
+    for name, (rows, values) in failures.items():
+        lines = [int(r) + 2 for r in rows[:FAILED_SAMPLE]]  # + header, 1-based
+        report[name] = {'failed': len(rows), 'lines': lines, 'values': values}
+        log.warning("⚠️ %s %s: %d values are not numbers and were set to 0 (CSV lines %s: %s)",
+                    label, name, len(rows), ', '.join(map(str, lines)), ', '.join(map(repr, values)))
+    return report
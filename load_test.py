@@ -0,0 +1,265 @@
+# load_test.py
+# Load generator for a running dashboard. Virtual analysts replay realistic sessions against
+# /_dash-update-component: open the page, pick an objective, an advertiser and sometimes a
+# campaign, switch to the domain tab and sometimes download, with think time between steps.
+# Request bodies are built from the server's /_dash-dependencies, and each analyst keeps the
+# props the server sends back (dropdown options, session id, figure signatures) like the
+# browser does, so caching, coalescing and patching behave as in real use. The callbacks one
+# action triggers are sent one after another, in the order the renderer resolves them.
+# Reports throughput and per-callback p50/p95/p99 latency, error and timeout rates.
+# Usage: gunicorn wsgi:server --config gunicorn_config.py (or python Dashboard.py), then
+#        python load_test.py [--url http://127.0.0.1:8050] [--users 10] [--duration 60] [--think 3]
+import argparse
+import json
+import random
+import statistics
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import requests
+
+# name -> an output (or input, for the download buttons) that identifies the callback
+CALLBACKS = {
+    'render_tab_content': 'tab-content.children',
+    'init_session': 'session-id.data',
+    'init_objective': 'objective-dropdown.options',
+    'load_advertisers': 'advertiser-dropdown.options',
+    'load_campaign_types': 'campaign-type-dropdown.options',
+    'load_campaigns': 'campaign-dropdown.options',
+    'update_dashboard': 'stats.children',
+    'update_keyword_table': 'keyword-table.data',
+    'download_data': 'download-btn.n_clicks',
+    'poll_export_job': 'export-status.children',
+    'update_domain_dashboard': 'domain-stats.children',
+    'update_domain_table': 'domain-table.data',
+    'download_domain_data': 'download-domain-btn.n_clicks',
+}
+# what changing a dropdown / the tab sends, in order
+CASCADES = {
+    'objective': ['load_advertisers', 'load_campaign_types', 'load_campaigns', 'update_dashboard'],
+    'advertiser': ['load_campaign_types', 'load_campaigns', 'update_dashboard'],
+    'campaign': ['update_dashboard'],
+    'keyword-tab': ['render_tab_content', 'update_dashboard', 'update_keyword_table'],
+    'domain-tab': ['render_tab_content', 'update_domain_dashboard', 'update_domain_table'],
+}
+
+def ref(d):
+    return f"{d['id']}.{d['property']}"
+def split_outputs(output):
+    """'..a.b...c.d..' or 'a.b' -> [{'id', 'property'}, ...]"""
+    parts = output.strip('.').split('...') if output.startswith('..') else [output]
+    return [dict(zip(('id', 'property'), p.split('.', 1))) for p in parts]
+def find_callbacks(deps):
+    found = {}
+    for name, key in CALLBACKS.items():
+        for dep in deps:
+            if key in dep['output'] or key in [ref(i) for i in dep['inputs']]:
+                found[name] = dep
+                break
+    missing = set(CALLBACKS) - set(found)
+    if missing:
+        raise SystemExit(f"callbacks not found on the server: {', '.join(sorted(missing))}")
+    return found
+def find_href(value):
+    """First href in a (serialized) component tree"""
+    if isinstance(value, dict):
+        if isinstance(value.get('href'), str):
+            return value['href']
+        value = list(value.values())
+    if isinstance(value, list):
+        for v in value:
+            href = find_href(v)
+            if href:
+                return href
+    return None
+
+class Stats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latency = {}  # name -> [seconds of successful requests]
+        self.counts = {}  # name -> {'ok', 'prevented', 'error', 'timeout'}
+        self.sessions = 0
+    def record(self, name, outcome, seconds=None):
+        with self.lock:
+            counts = self.counts.setdefault(name, {'ok': 0, 'prevented': 0, 'error': 0, 'timeout': 0})
+            counts[outcome] += 1
+            if seconds is not None:
+                self.latency.setdefault(name, []).append(seconds)
+
+class Analyst:
+    """One virtual user: a requests session plus the client-side props the server has sent"""
+    def __init__(self, base, callbacks, stats, rng, args):
+        self.base, self.callbacks, self.stats, self.rng, self.args = base, callbacks, stats, rng, args
+        self.http = requests.Session()
+        self.props = {}
+
+    def get(self, name, path):
+        t0 = time.perf_counter()
+        try:
+            r = self.http.get(self.base + path, timeout=self.args.timeout)
+        except requests.Timeout:
+            self.stats.record(name, 'timeout')
+            return None
+        except requests.RequestException:
+            self.stats.record(name, 'error')
+            return None
+        ok = r.status_code < 400
+        self.stats.record(name, 'ok' if ok else 'error', time.perf_counter() - t0 if ok else None)
+        return r if ok else None
+    def fire(self, name, changed=None):
+        """Send one callback with the current props; apply its response. False on failure."""
+        dep = self.callbacks[name]
+        def value(d):
+            return d['id'] if d['property'] == 'id' else self.props.get(ref(d))
+        inputs = [dict(i, value=value(i)) for i in dep['inputs']]
+        body = {'output': dep['output'], 'outputs': split_outputs(dep['output']), 'inputs': inputs,
+                'state': [dict(s, value=value(s)) for s in dep['state']],
+                'changedPropIds': [changed or ref(dep['inputs'][0])]}
+        if not dep['output'].startswith('..'):
+            body['outputs'] = body['outputs'][0]
+        t0 = time.perf_counter()
+        try:
+            r = self.http.post(self.base + '_dash-update-component', json=body, timeout=self.args.timeout)
+        except requests.Timeout:
+            self.stats.record(name, 'timeout')
+            return False
+        except requests.RequestException:
+            self.stats.record(name, 'error')
+            return False
+        seconds = time.perf_counter() - t0
+        if r.status_code == 204:
+            self.stats.record(name, 'prevented', seconds)
+            return True
+        if r.status_code >= 400:
+            self.stats.record(name, 'error')
+            return False
+        self.stats.record(name, 'ok', seconds)
+        for cid, props in r.json().get('response', {}).items():
+            for prop, v in props.items():
+                self.props[f"{cid}.{prop.split('@')[0]}"] = v
+        return True
+    def action(self, cascade, changed):
+        for name in CASCADES[cascade]:
+            if not self.fire(name, changed):
+                return False
+        return True
+    def pick(self, dropdown):
+        """Choose one of the dropdown's current options (None if it has none)"""
+        options = self.props.get(f"{dropdown}.options") or []
+        value = self.rng.choice(options)['value'] if options else None
+        self.props[f"{dropdown}.value"] = value
+        return value
+    def think(self):
+        if self.args.think > 0:
+            time.sleep(min(self.rng.expovariate(1 / self.args.think), self.args.think * 3))
+    def download(self, name):
+        """Click a download button, poll the job like the page's interval does, fetch the file"""
+        self.props[f"{self.callbacks[name]['inputs'][0]['id']}.n_clicks"] = 1
+        if not self.fire(name):
+            return
+        for _ in range(int(self.args.timeout)):
+            if not self.fire('poll_export_job', 'export-job.data'):
+                return
+            if self.props.get('export-poll.disabled'):
+                break
+            time.sleep(1)
+        href = find_href(self.props.get('export-status.children'))
+        if href:
+            self.get('export file', href.lstrip('/'))
+
+    def session(self):
+        self.props = {'analysis-tabs.active_tab': 'keyword-tab'}
+        for path in ('', '_dash-layout', '_dash-dependencies'):
+            if self.get('page load', path) is None:
+                return
+        if not (self.fire('init_session') and self.fire('init_objective') and
+                self.action('keyword-tab', 'analysis-tabs.active_tab')):
+            return
+        self.think()
+        if self.pick('objective-dropdown') is None or not self.action('objective', 'objective-dropdown.value'):
+            return
+        self.think()
+        if self.pick('advertiser-dropdown') is not None:
+            if not self.action('advertiser', 'advertiser-dropdown.value'):
+                return
+            self.think()
+            if self.rng.random() < 0.5 and self.pick('campaign-dropdown') is not None:
+                if not self.action('campaign', 'campaign-dropdown.value'):
+                    return
+                self.think()
+        if self.rng.random() < self.args.download_share:
+            self.download('download_data')
+            self.think()
+        self.props['analysis-tabs.active_tab'] = 'domain-tab'
+        if not self.action('domain-tab', 'analysis-tabs.active_tab'):
+            return
+        self.think()
+        if self.rng.random() < self.args.download_share / 2:
+            self.download('download_domain_data')
+        with self.stats.lock:
+            self.stats.sessions += 1
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(p / 100 * (len(values) - 1))))] if values else 0.0
+def report(stats, wall, args):
+    rows = {}
+    for name in sorted(stats.counts, key=lambda n: -sum(stats.counts[n].values())):
+        counts, lat = stats.counts[name], stats.latency.get(name, [])
+        total = sum(counts.values())
+        rows[name] = dict(counts, requests=total, error_rate=counts['error'] / total,
+                          timeout_rate=counts['timeout'] / total,
+                          p50_ms=percentile(lat, 50) * 1000, p95_ms=percentile(lat, 95) * 1000,
+                          p99_ms=percentile(lat, 99) * 1000, max_ms=max(lat, default=0) * 1000,
+                          mean_ms=statistics.fmean(lat) * 1000 if lat else 0.0)
+    total = sum(r['requests'] for r in rows.values())
+    errors = sum(r['error'] for r in rows.values())
+    timeouts = sum(r['timeout'] for r in rows.values())
+    summary = {'users': args.users, 'think_s': args.think, 'wall_s': round(wall, 1), 'requests': total,
+               'throughput_rps': total / wall, 'sessions': stats.sessions, 'sessions_per_min': stats.sessions / wall * 60,
+               'error_rate': errors / total if total else 0.0, 'timeout_rate': timeouts / total if total else 0.0}
+    print(f"\n{args.users} users, think {args.think}s, {wall:.0f}s: {total} requests ({summary['throughput_rps']:.1f}/s), "
+          f"{stats.sessions} sessions ({summary['sessions_per_min']:.1f}/min), "
+          f"errors {summary['error_rate']:.2%}, timeouts {summary['timeout_rate']:.2%}\n")
+    print(f"{'callback':<26}{'reqs':>7}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'max ms':>9}{'204':>6}{'err':>6}{'t/o':>6}")
+    for name, r in rows.items():
+        print(f"{name:<26}{r['requests']:>7}{r['p50_ms']:>9.0f}{r['p95_ms']:>9.0f}{r['p99_ms']:>9.0f}{r['max_ms']:>9.0f}"
+              f"{r['prevented']:>6}{r['error']:>6}{r['timeout']:>6}")
+    return {'summary': summary, 'callbacks': rows}
+
+def main():
+    ap = argparse.ArgumentParser(description='Replay analyst sessions against a running dashboard')
+    ap.add_argument('--url', default='http://127.0.0.1:8050/', help='dashboard base URL (with any path prefix)')
+    ap.add_argument('--users', type=int, default=10, help='concurrent analysts')
+    ap.add_argument('--duration', type=float, default=60, help='seconds to run; sessions under way finish')
+    ap.add_argument('--think', type=float, default=3.0, help='mean think time between actions, seconds (0 = none)')
+    ap.add_argument('--ramp', type=float, default=5.0, help='seconds over which the users start')
+    ap.add_argument('--timeout', type=float, default=30.0, help='per-request timeout, seconds')
+    ap.add_argument('--download-share', type=float, default=0.2, help='share of sessions that download')
+    ap.add_argument('--seed', type=int, default=0)
+    ap.add_argument('--out', help='write the results as JSON')
+    args = ap.parse_args()
+    base = args.url if args.url.endswith('/') else args.url + '/'
+    try:
+        callbacks = find_callbacks(requests.get(base + '_dash-dependencies', timeout=args.timeout).json())
+    except requests.RequestException as e:
+        raise SystemExit(f"dashboard not reachable at {base}: {e}")
+    stats = Stats()
+    deadline = time.perf_counter() + args.ramp + args.duration
+    def user(i):
+        time.sleep(args.ramp * i / args.users)
+        analyst = Analyst(base, callbacks, stats, random.Random(args.seed * 1000 + i), args)
+        while time.perf_counter() < deadline:
+            analyst.session()
+    print(f"▶️ {args.users} users against {base} for {args.duration:.0f}s (+{args.ramp:.0f}s ramp-up)...", file=sys.stderr)
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.users) as pool:
+        list(pool.map(user, range(args.users)))
+    results = report(stats, time.perf_counter() - t0, args)
+    if args.out:
+        with open(args.out, 'w') as f:
+            json.dump(results, f, indent=1)
+
+if __name__ == '__main__':
+    main()
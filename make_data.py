@@ -0,0 +1,190 @@
+# make_data.py
+# Synthetic "Max Learning" keyword and "Domain Analysis" CSVs with the columns Dashboard.py's
+# find_col looks for, so performance work can be reproduced without client exports. Rows hang
+# off a fixed campaign -> advertiser -> objective hierarchy; keywords and domains are drawn from
+# pools with Zipf-like popularity, impressions are heavy-tailed and clicks / conversions / cost
+# are drawn from them, so CTR, CVR, CPA and ROAS agree with the counts. Same seed and row
+# counts -> byte-identical files. Written in chunks, so 10M rows need little memory.
+# Usage: python make_data.py [--rows 100000] [--domain-rows N] [--seed 42] [--out .]
+import argparse
+import os
+import time
+import numpy as np
+import pandas as pd
+
+# Same names as KEYWORD_DATA_FILE / DOMAIN_DATA_FILE in Dashboard.py
+KEYWORD_FILE = "Max Learning_5Dec202517_54_48_27Nov2025_03Dec2025.csv"
+DOMAIN_FILE = "Domain Analysis_27Nov2025_03Dec2025.csv"
+CHUNK_ROWS = 500_000
+
+OBJECTIVES = ['Leads', 'Sales', 'Traffic', 'Awareness', 'App Installs']
+OBJECTIVE_WEIGHTS = [0.35, 0.3, 0.2, 0.1, 0.05]
+CAMPAIGN_TYPES = ['Search', 'Display', 'Native', 'Video', 'Shopping']
+CAMPAIGN_TYPE_WEIGHTS = [0.45, 0.25, 0.15, 0.1, 0.05]
+QUERY_TYPES = ['Informational', 'Transactional', 'Commercial', 'Navigational', 'Local']
+QUERY_TYPE_WEIGHTS = [0.35, 0.25, 0.2, 0.12, 0.08]
+EMOTIONS = ['curiosity', 'trust', 'urgency', 'excitement', 'anticipation', 'joy', 'fear',
+            'frustration', 'surprise', 'anger', 'sadness', 'neutral']
+LEVELS = ['Low', 'Medium', 'High']
+KEYWORD_CATEGORIES = ['Finance', 'Insurance', 'Auto', 'Retail', 'Travel', 'Health', 'Education',
+                      'Real Estate', 'Technology', 'Home & Garden', 'Legal', 'Beauty', 'Fitness',
+                      'Food & Drink', 'Entertainment', 'Jobs', 'Pets', 'Sports', 'Telecom', 'Energy']
+DOMAIN_CATEGORIES = ['News', 'Sports', 'Technology', 'Finance', 'Entertainment', 'Lifestyle',
+                     'Health', 'Travel', 'Automotive', 'Food', 'Gaming', 'Education', 'Weather',
+                     'Shopping', 'Parenting', 'Science', 'Music', 'Business', 'Local', 'Reference']
+QUESTION_WORDS = ['how', 'what', 'why', 'where', 'when', 'which', 'who', 'can', 'is', 'does']
+WORDS = ('best cheap buy online near me free top deals price cost quote compare review reviews new used '
+         'sale discount coupon car auto loan loans insurance home house mortgage credit card bank '
+         'account rates rate fast quick easy instant approval bad no check online store shop delivery '
+         'shipping local service services repair company companies plan plans health dental life pet '
+         'travel flight flights hotel hotels vacation package cruise rental apartment apartments rent '
+         'job jobs hiring remote course courses degree online school training certificate phone phones '
+         'laptop tv tablet shoes dress jeans watch bag gift gifts wedding baby kids women men senior '
+         'small business software app tool tools guide tips ideas vs alternative alternatives solar '
+         'energy electric gas water lawyer attorney injury accident tax taxes refund invest investing '
+         'stock crypto gold retirement pension bitcoin fitness gym diet weight loss protein vegan '
+         'recipe recipes restaurant pizza coffee to for in with the a of and').split()
+
+def zipf_weights(n, s=1.1):
+    """Normalized 1/rank**s popularity for n items"""
+    w = 1.0 / np.arange(1, n + 1) ** s
+    return w / w.sum()
+
+class Hierarchy:
+    """Advertisers with an objective each, campaigns with an advertiser and a campaign type"""
+    def __init__(self, rng, advertisers):
+        self.adv_objective = rng.choice(OBJECTIVES, advertisers, p=OBJECTIVE_WEIGHTS)
+        per_adv = rng.integers(2, 15, advertisers)
+        self.camp_adv = np.repeat(np.arange(advertisers), per_adv)
+        self.camp_type = rng.choice(CAMPAIGN_TYPES, len(self.camp_adv), p=CAMPAIGN_TYPE_WEIGHTS)
+        # a few big advertisers carry most of the traffic, their campaigns share it unevenly
+        weights = zipf_weights(advertisers, 0.9)[self.camp_adv] * rng.pareto(1.5, len(self.camp_adv))
+        self.camp_weights = weights / weights.sum()
+        self.adv_names = np.array([f"Advertiser {i + 1:03d}" for i in range(advertisers)], dtype=object)
+        self.camp_names = np.array([f"{self.adv_names[a]} | {t} {i + 1}" for i, (a, t) in
+                                    enumerate(zip(self.camp_adv, self.camp_type))], dtype=object)
+    def sample(self, rng, n):
+        camp = rng.choice(len(self.camp_adv), n, p=self.camp_weights)
+        adv = self.camp_adv[camp]
+        return {
+            '[Learning] Campaign Objective': self.adv_objective[adv],
+            'Advertiser': self.adv_names[adv],
+            'Campaign Type': self.camp_type[camp],
+            'Campaign': self.camp_names[camp],
+        }
+
+def keyword_pool(rng, size):
+    """size distinct-ish keywords with the per-keyword columns derived from their text"""
+    words = np.array(WORDS, dtype=object)
+    lengths = rng.choice([1, 2, 3, 4, 5, 6, 7], size, p=[0.08, 0.27, 0.3, 0.18, 0.1, 0.05, 0.02])
+    keywords, phrases, positions = [], [], []
+    for n in lengths:
+        kw = list(words[rng.integers(0, len(words), n)])
+        r = rng.random()
+        if r < 0.1:
+            kw[0] = QUESTION_WORDS[rng.integers(0, len(QUESTION_WORDS))]
+        if rng.random() < 0.12:
+            kw.insert(rng.integers(0, len(kw) + 1), str(rng.choice([2024, 2025, 10, 24, 5, 100, 3])))
+        keywords.append(' '.join(kw))
+        sep = ';' if rng.random() < 0.6 else ', '
+        phrases.append(sep.join(kw) if rng.random() < 0.9 else None)
+        positions.append(next((i + 1 for i, w in enumerate(kw) if w.isdigit()), np.nan))
+    keywords = np.array(keywords, dtype=object)
+    position = np.array(positions, dtype=float)
+    return pd.DataFrame({
+        'Keyword': keywords,
+        'Keyword Category': np.where(rng.random(size) < 0.1, None,
+                                     rng.choice(KEYWORD_CATEGORIES, size, p=zipf_weights(len(KEYWORD_CATEGORIES), 0.7))),
+        'Query_Type': rng.choice(QUERY_TYPES, size, p=QUERY_TYPE_WEIGHTS),
+        'Emotional_Intent': emotions(rng, size),
+        'Individual_Words': np.array(phrases, dtype=object),
+        'Number_of_Words': [len(k.split()) for k in keywords],
+        'Number_of_Characters': [len(k) for k in keywords],
+        'Is_Question': np.where([k.split()[0] in QUESTION_WORDS for k in keywords], 'Yes', 'No'),
+        'Specificity_Score': np.where(rng.random(size) < 0.05, None,
+                                      rng.choice(LEVELS, size, p=[0.3, 0.45, 0.25])),
+        'Urgency_Level': np.where(rng.random(size) < 0.05, None, rng.choice(LEVELS, size, p=[0.5, 0.35, 0.15])),
+        'Is_Number_Present': np.where(np.isnan(position), 'No', 'Yes'),
+        'Position_of_Number': position,
+    })
+def emotions(rng, size, combos=300):
+    """One to three emotions per keyword, ';' or ', ' separated, some missing - drawn from a pool
+    of combinations, as the real column has a few hundred distinct values"""
+    weights = zipf_weights(len(EMOTIONS), 0.6)
+    pool = []
+    for n in rng.choice([1, 2, 3], combos, p=[0.6, 0.3, 0.1]):
+        picks = rng.choice(EMOTIONS, n, replace=False, p=weights)
+        pool.append((';' if rng.random() < 0.5 else ', ').join(picks))
+    out = np.array(pool, dtype=object)[rng.choice(combos, size, p=zipf_weights(combos))]
+    out[rng.random(size) < 0.08] = None
+    return out
+
+def performance(rng, n, ctr_scale):
+    """Impressions, clicks and conversions drawn from each other, with cost and the rate columns"""
+    impressions = np.floor(rng.lognormal(4.0, 1.8, n)).astype(np.int64)
+    ctr = rng.beta(1.2, 60, n) * ctr_scale
+    clicks = rng.binomial(impressions, np.clip(ctr, 0, 1))
+    conversions = rng.binomial(clicks, np.clip(rng.beta(1.1, 25, n), 0, 1))
+    weighted = np.round(conversions * rng.uniform(0.6, 1.4, n), 2)
+    cost = np.round(clicks * rng.lognormal(0.2, 0.7, n), 2)
+    revenue = weighted * rng.lognormal(3.5, 0.8, n)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return {
+            'Ad Impressions': impressions,
+            'Clicks': clicks,
+            'CTR': np.round(np.where(impressions > 0, clicks / impressions * 100, 0), 2),
+            'CVR': np.round(np.where(clicks > 0, conversions / clicks * 100, 0), 2),
+            'CPA': np.round(np.where(weighted > 0, cost / weighted, 0), 2),
+            'roas': np.round(np.where(cost > 0, revenue / cost, 0), 2),
+            'Max System Cost': cost,
+            'Weighted Conversion': weighted,
+        }
+
+def write_chunks(path, rows, make_chunk):
+    """make_chunk(n) -> DataFrame, written to path CHUNK_ROWS at a time"""
+    t0 = time.perf_counter()
+    for start in range(0, rows, CHUNK_ROWS):
+        make_chunk(min(CHUNK_ROWS, rows - start)).to_csv(path, mode='w' if start == 0 else 'a',
+                                                         header=start == 0, index=False)
+    print(f"✅ {rows:,} rows -> {path} ({os.path.getsize(path) / 1e6:.1f} MB, {time.perf_counter() - t0:.1f}s)")
+def make_keywords(rng, hierarchy, rows, path):
+    pool = keyword_pool(rng, int(np.clip(rows // 4, 1000, 2_000_000)))
+    weights = zipf_weights(len(pool), 0.9)
+    def chunk(n):
+        out = pd.DataFrame(hierarchy.sample(rng, n))
+        kw = pool.iloc[rng.choice(len(pool), n, p=weights)].reset_index(drop=True)
+        out = pd.concat([out, kw], axis=1)
+        for col, values in performance(rng, n, ctr_scale=3.0).items():
+            out[col] = values
+        return out
+    write_chunks(path, rows, chunk)
+def make_domains(rng, hierarchy, rows, path):
+    size = int(np.clip(rows // 20, 200, 500_000))
+    domains = np.array([f"{w}{i}.{rng.choice(['com', 'net', 'org', 'co.uk', 'io'], p=[0.7, 0.1, 0.1, 0.05, 0.05])}"
+                        for i, w in enumerate(rng.choice(WORDS, size))], dtype=object)
+    categories = np.where(rng.random(size) < 0.05, None,
+                          rng.choice(DOMAIN_CATEGORIES, size, p=zipf_weights(len(DOMAIN_CATEGORIES), 0.8)))
+    weights = zipf_weights(size, 1.0)
+    def chunk(n):
+        out = hierarchy.sample(rng, n)
+        d = rng.choice(size, n, p=weights)
+        out['Domain'] = domains[d]
+        out['Sprig Domain Category'] = categories[d]
+        out.update(performance(rng, n, ctr_scale=0.5))
+        return pd.DataFrame(out)
+    write_chunks(path, rows, chunk)
+
+if __name__ == '__main__':
+    ap = argparse.ArgumentParser(description='Write synthetic keyword and domain CSVs')
+    ap.add_argument('--rows', type=int, default=100_000, help='keyword rows (10k .. 10M)')
+    ap.add_argument('--domain-rows', type=int, default=None, help='domain rows (default: same as --rows)')
+    ap.add_argument('--advertisers', type=int, default=None, help='default: grows with --rows, 20..400')
+    ap.add_argument('--seed', type=int, default=42)
+    ap.add_argument('--out', default='.', help='folder to write the CSVs to')
+    args = ap.parse_args()
+    os.makedirs(args.out, exist_ok=True)
+    rng = np.random.default_rng(args.seed)
+    advertisers = args.advertisers or int(np.clip(args.rows // 2500, 20, 400))
+    hierarchy = Hierarchy(rng, advertisers)
+    make_keywords(rng, hierarchy, args.rows, os.path.join(args.out, KEYWORD_FILE))
+    make_domains(rng, hierarchy, args.domain_rows or args.rows, os.path.join(args.out, DOMAIN_FILE))
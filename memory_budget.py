@@ -0,0 +1,225 @@
+# memory_budget.py
+# Memory accounting for one worker. The app registers what it holds - frames as fixed holders,
+# caches as evictable parts - and MemoryBudget keeps their estimated bytes under a limit by
+# evicting cache entries (least valuable part first, oldest entry first) whenever a cache grows.
+# Work that needs memory up front (exports) asks admit() first and is refused with a clear
+# message when it does not fit. stage() records the peak RSS growth of named stages (startup
+# phases, view builds, exports). Sizes are estimates: shared objects are counted once per holder.
+import functools
+import logging
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from contextlib import contextmanager
+import numpy as np
+import pandas as pd
+from health import rss_bytes
+
+log = logging.getLogger('dashboard.memory')
+
+class MemoryBudgetExceeded(Exception):
+    """Work refused because it would not fit in the memory budget"""
+
+def nbytes(value):
+    """Estimated bytes held by a value: frames (deep), arrays, strings, containers, Dash components"""
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(index=True, deep=True).sum())
+    if isinstance(value, pd.Series):
+        return int(value.memory_usage(index=True, deep=True))
+    if isinstance(value, (str, bytes)):
+        return sys.getsizeof(value)
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(nbytes(k) + nbytes(v) for k, v in value.items())
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return sys.getsizeof(value) + sum(nbytes(v) for v in value)
+    if hasattr(value, 'to_plotly_json'):  # Dash components, plotly figures
+        return nbytes(value.to_plotly_json())
+    return sys.getsizeof(value)
+def cgroup_limit():
+    """Container memory limit in bytes (cgroup v2 or v1), None when unlimited or unknown"""
+    for path in ('/sys/fs/cgroup/memory.max', '/sys/fs/cgroup/memory/memory.limit_in_bytes'):
+        try:
+            with open(path) as f:
+                value = f.read().strip()
+        except OSError:
+            continue
+        if value.isdigit() and int(value) < 1 << 60:
+            return int(value)
+    return None
+
+CacheInfo = namedtuple('CacheInfo', ['hits', 'misses', 'maxsize', 'currsize'])
+class SizedLRU:
+    """functools.lru_cache replacement that knows the bytes of each entry and can drop its oldest
+    entries one at a time (cache_info() / cache_clear() as in lru_cache). on_grow() is called after
+    every insert - the budget's enforce()."""
+    def __init__(self, fn, maxsize, on_grow=None):
+        functools.update_wrapper(self, fn)
+        self.fn, self.maxsize, self.on_grow = fn, maxsize, on_grow
+        self.entries = OrderedDict()  # key -> (value, bytes)
+        self.bytes = 0
+        self.hits = self.misses = 0
+        self.lock = threading.Lock()
+
+    def __call__(self, *args, **kwargs):
+        key = args + tuple(sorted(kwargs.items())) if kwargs else args
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+        value = self.fn(*args, **kwargs)
+        size = nbytes(value)
+        with self.lock:
+            if key not in self.entries:
+                self.entries[key] = (value, size)
+                self.bytes += size
+                while len(self.entries) > self.maxsize:
+                    self.bytes -= self.entries.popitem(last=False)[1][1]
+        if self.on_grow:
+            self.on_grow()
+        return value
+    def evict(self):
+        """Drop the least recently used entry; bytes freed (0 when empty)"""
+        with self.lock:
+            if not self.entries:
+                return 0
+            size = self.entries.popitem(last=False)[1][1]
+            self.bytes -= size
+            return size
+    def cache_info(self):
+        return CacheInfo(self.hits, self.misses, self.maxsize, len(self.entries))
+    def cache_clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.bytes = 0
+
+class MemoryBudget:
+    """Estimated bytes of registered holders and caches, kept under limit (None = only track).
+
+    hold(name, fn): fixed memory, fn() -> bytes, measured once (frames never change).
+    cache(name, part): evictable memory; part has .bytes and .evict() -> bytes freed (0 = empty).
+    Caches are evicted in registration order, so register the cheapest to lose first.
+    """
+    def __init__(self, limit=None, sample_interval=0.02):
+        self.limit = limit
+        self.holders, self.caches = OrderedDict(), OrderedDict()
+        self.held = {}
+        self.evictions = {}
+        self.refused = 0
+        self.lock = threading.Lock()
+        self.stages = {}
+        self.active = {}  # stage token -> [name, rss at start, peak rss seen, start time]
+        self.sample_interval = sample_interval
+        self.sampler = None
+        self.wake = threading.Event()
+        os.register_at_fork(after_in_child=self._after_fork)
+
+    def _after_fork(self):
+        """gunicorn forks workers from a preloaded app: threads are gone, locks may be held"""
+        self.lock, self.wake, self.sampler = threading.Lock(), threading.Event(), None
+        self.active.clear()
+
+    def hold(self, name, fn):
+        self.holders[name] = fn
+        self.held.pop(name, None)
+    def cache(self, name, part):
+        self.caches[name] = part
+        return part
+    def sized_cache(self, maxsize):
+        """Decorator: a SizedLRU registered under the function's name"""
+        def decorate(fn):
+            return self.cache(fn.__name__, SizedLRU(fn, maxsize, self.enforce))
+        return decorate
+
+    def held_bytes(self):
+        for name, fn in list(self.holders.items()):
+            if name not in self.held:
+                self.held[name] = fn()
+        return sum(self.held.values())
+    def used(self):
+        return self.held_bytes() + sum(part.bytes for part in self.caches.values())
+    def enforce(self, need=0):
+        """Evict cache entries until used() + need fits the limit; True if it does"""
+        if self.limit is None:
+            return True
+        with self.lock:
+            used = self.used()
+            for name, part in self.caches.items():
+                evicted = 0
+                while used + need > self.limit:
+                    freed = part.evict()
+                    if not freed:
+                        break
+                    used -= freed
+                    evicted += 1
+                if evicted:
+                    self.evictions[name] = self.evictions.get(name, 0) + evicted
+                    log.info("🧹 Evicted %d %s entries to stay within the %.0f MB memory budget",
+                             evicted, name, self.limit / 1e6)
+            return used + need <= self.limit
+    def admit(self, what, need):
+        """Raise MemoryBudgetExceeded unless need more bytes fit (after evicting caches)"""
+        if self.enforce(need):
+            return
+        self.refused += 1
+        free = max(self.limit - self.used(), 0)
+        raise MemoryBudgetExceeded(
+            f"{what} needs about {need / 1e6:.0f} MB but only {free / 1e6:.0f} MB of the "
+            f"{self.limit / 1e6:.0f} MB memory budget is free - narrow the filters or try again later")
+
+    def begin(self, name):
+        """Start measuring a stage; pass the token to end()"""
+        token = object()
+        rss = rss_bytes() or 0
+        with self.lock:
+            self.active[token] = [name, rss, rss, time.perf_counter()]
+            if self.sampler is None:
+                self.sampler = threading.Thread(target=self._sample, name='memory-sampler', daemon=True)
+                self.sampler.start()
+        self.wake.set()
+        return token
+    def end(self, token):
+        rss = rss_bytes() or 0
+        with self.lock:
+            name, start, peak, t0 = self.active.pop(token)
+            stage = self.stages.setdefault(name, {'count': 0, 'peak_bytes': 0, 'last_peak_bytes': 0, 'seconds': 0.0})
+            growth = max(peak, rss, start) - start
+            stage['count'] += 1
+            stage['seconds'] += time.perf_counter() - t0
+            stage['last_peak_bytes'] = growth
+            stage['peak_bytes'] = max(stage['peak_bytes'], growth)
+    @contextmanager
+    def stage(self, name):
+        """Record the peak RSS growth of the block under name. Concurrent stages see each
+        other's allocations, so figures are upper bounds under load."""
+        token = self.begin(name)
+        try:
+            yield
+        finally:
+            self.end(token)
+    def _sample(self):
+        while True:
+            if not self.active:
+                self.wake.clear()
+                if not self.active:
+                    self.wake.wait()
+            rss = rss_bytes() or 0
+            with self.lock:
+                for entry in self.active.values():
+                    entry[2] = max(entry[2], rss)
+            time.sleep(self.sample_interval)
+
+    def report(self):
+        self.held_bytes()
+        parts = dict(self.held) | {name: part.bytes for name, part in self.caches.items()}
+        used = sum(parts.values())
+        return {'limit_bytes': self.limit, 'used_bytes': used, 'rss_bytes': rss_bytes(), 'parts': parts,
+                'evictions': dict(self.evictions), 'refused': self.refused,
+                'stages': {name: {k: round(v, 3) if isinstance(v, float) else v for k, v in s.items()}
+                           for name, s in self.stages.items()}}
@@ -0,0 +1,142 @@
+# metrics.py
+# Minimal Prometheus metrics in the text exposition format, so /metrics needs no client library:
+# labelled counters and histograms updated by the app, plus collectors that read existing
+# state (cache sizes, hit counts) only when /metrics is scraped. Values are per worker process.
+import functools
+import threading
+import time
+from flask import Response
+from dash.exceptions import PreventUpdate
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+BYTES_BUCKETS = (1000, 10000, 100000, 300000, 1000000, 3000000, 10000000)
+
+_local = threading.local()
+def current_callback():
+    """Name of the Dash callback running on this thread, 'background' outside callbacks"""
+    return getattr(_local, 'callback', 'background')
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+def _label_text(labels):
+    labels = list(labels)
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{k}="{_escape(v)}"' for k, v in labels) + '}'
+class Counter:
+    def __init__(self, name, help, labels=()):
+        self.name, self.help, self.labels = name, help, tuple(labels)
+        self.values = {}
+        self.lock = threading.Lock()
+    def inc(self, amount=1, **labels):
+        key = tuple(labels[k] for k in self.labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        for key, value in sorted(self.values.items(), key=lambda kv: str(kv[0])):
+            lines.append(f"{self.name}{_label_text(zip(self.labels, key))} {value}")
+        return lines
+class Histogram:
+    def __init__(self, name, help, labels=(), buckets=LATENCY_BUCKETS):
+        self.name, self.help, self.labels, self.buckets = name, help, tuple(labels), tuple(buckets)
+        self.values = {}  # label values -> [count per bucket..., +Inf count, sum]
+        self.lock = threading.Lock()
+    def observe(self, value, **labels):
+        key = tuple(labels[k] for k in self.labels)
+        with self.lock:
+            counts = self.values.setdefault(key, [0] * (len(self.buckets) + 2))
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+                    break
+            else:
+                counts[-2] += 1
+            counts[-1] += value
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for key, counts in sorted(self.values.items(), key=lambda kv: str(kv[0])):
+            labels = list(zip(self.labels, key))
+            cumulative = 0
+            for bound, n in zip(self.buckets + ('+Inf',), counts[:-1]):
+                cumulative += n
+                lines.append(f"{self.name}_bucket{_label_text(labels + [('le', bound)])} {cumulative}")
+            lines.append(f"{self.name}_sum{_label_text(labels)} {counts[-1]}")
+            lines.append(f"{self.name}_count{_label_text(labels)} {cumulative}")
+        return lines
+class Collector:
+    """Metric read at scrape time: fn() returns [(labels dict, value), ...]"""
+    def __init__(self, name, help, kind, fn):
+        self.name, self.help, self.kind, self.fn = name, help, kind, fn
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for labels, value in self.fn():
+            lines.append(f"{self.name}{_label_text(sorted(labels.items()))} {value}")
+        return lines
+class Registry:
+    def __init__(self):
+        self.metrics = []
+    def counter(self, name, help, labels=()):
+        return self._add(Counter(name, help, labels))
+    def histogram(self, name, help, labels=(), buckets=LATENCY_BUCKETS):
+        return self._add(Histogram(name, help, labels, buckets))
+    def collect(self, name, help, fn, kind='gauge'):
+        return self._add(Collector(name, help, kind, fn))
+    def _add(self, metric):
+        self.metrics.append(metric)
+        return metric
+    def render(self):
+        lines = []
+        for metric in self.metrics:
+            try:
+                lines += metric.render()
+            except Exception as e:  # one broken collector must not take the endpoint down
+                lines.append(f"# {metric.name} failed: {e}")
+        return '\n'.join(lines) + '\n'
+
+REGISTRY = Registry()
+CALLBACK_SECONDS = REGISTRY.histogram('dash_callback_seconds', 'Dash callback latency', ['callback'])
+CALLBACK_CALLS = REGISTRY.counter('dash_callback_calls_total', 'Dash callback calls by outcome (ok, prevented, error)',
+                                  ['callback', 'outcome'])
+CALLBACK_BYTES = REGISTRY.histogram('dash_callback_response_bytes', 'Uncompressed Dash callback response size',
+                                    ['callback'], BYTES_BUCKETS)
+
+def instrument_callbacks(app):
+    """Wrap every registered Dash callback with latency / outcome / response size metrics.
+
+    Call once, after the last @app.callback. The wrapped function keeps its __name__, which is
+    the callback label.
+    """
+    for entry in app.callback_map.values():
+        fn = entry['callback']
+        if getattr(fn, 'instrumented', False):
+            continue
+        entry['callback'] = _instrumented(fn)
+def _instrumented(fn):
+    name = fn.__name__
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        _local.callback = name
+        outcome = 'error'
+        t0 = time.perf_counter()
+        try:
+            result = fn(*args, **kwargs)
+            outcome = 'ok'
+            if isinstance(result, str):
+                CALLBACK_BYTES.observe(len(result), callback=name)
+            return result
+        except PreventUpdate:
+            outcome = 'prevented'
+            raise
+        finally:
+            CALLBACK_SECONDS.observe(time.perf_counter() - t0, callback=name)
+            CALLBACK_CALLS.inc(callback=name, outcome=outcome)
+            _local.callback = 'background'
+    wrapper.instrumented = True
+    return wrapper
+def install_metrics(server, registry=REGISTRY, path='/metrics'):
+    @server.route(path)
+    def metrics():
+        # no-store: scrapes change every time, keep them out of any response cache (compression.py)
+        return Response(registry.render(), mimetype='text/plain; version=0.0.4',
+                        headers={'Cache-Control': 'no-store'})
@@ -0,0 +1,172 @@
+# profiling.py
+# On-demand profiling of live Dash callbacks. With PROFILE_TOKEN set, a callback request runs
+# under cProfile plus a stack sampler when it carries the token (X-Profile header), or when it
+# is the next request matching an armed switch (/debug/profile/arm?callback=...&match=...).
+# Each profile is stored as a .pstats file, a .txt summary and a collapsed-stack .collapsed file
+# (flamegraph.pl / speedscope input). Only max_concurrent profiles run at once; requests over
+# the cap just run unprofiled, so this is safe on a single live worker.
+import cProfile
+import functools
+import hmac
+import io
+import os
+import pstats
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from flask import abort, jsonify, request, send_file
+
+_local = threading.local()
+def same_token(given, token):
+    """Constant-time comparison; on bytes, as compare_digest rejects non-ASCII str"""
+    return hmac.compare_digest(given.encode(), token.encode())
+def profiling_active():
+    """True on a thread currently running a profiled callback"""
+    return getattr(_local, 'active', False)
+
+class StackSampler(threading.Thread):
+    """Samples one thread's Python stack every interval seconds into collapsed-stack counts"""
+    def __init__(self, ident, interval=0.005):
+        super().__init__(name='profile-sampler', daemon=True)
+        self.target, self.interval = ident, interval
+        self.stacks = Counter()
+        self.stopped = threading.Event()
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.target)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            if stack:
+                self.stacks[';'.join(reversed(stack))] += 1
+    def collapsed(self):
+        return ''.join(f"{stack} {n}\n" for stack, n in self.stacks.most_common())
+
+class Profiler:
+    def __init__(self, directory, token=None, max_concurrent=1, keep=20, sample_interval=0.005):
+        self.directory, self.token, self.keep, self.sample_interval = directory, token, keep, sample_interval
+        self.slots = threading.BoundedSemaphore(max_concurrent)
+        self.armed = []  # [callback name, body substring, remaining count]
+        self.lock = threading.Lock()
+        if token:
+            os.makedirs(directory, exist_ok=True)
+
+    def authorized(self):
+        given = request.headers.get('X-Debug-Token') or request.args.get('token') or ''
+        return bool(self.token) and same_token(given, self.token)
+    def require_token(self):
+        """Abort the request unless it carries the token: 404 while no token is configured, 403 if wrong"""
+        if not self.token:
+            abort(404)
+        if not self.authorized():
+            abort(403)
+    def arm(self, callback, match='', count=1):
+        with self.lock:
+            self.armed.append([callback, match, count])
+    def wants(self, name):
+        """Should this callback request be profiled? Consumes an armed switch when it matches"""
+        if not self.token:
+            return False
+        if same_token(request.headers.get('X-Profile', ''), self.token):
+            return True
+        if not self.armed:
+            return False
+        body = request.get_data(as_text=True)
+        with self.lock:
+            for switch in self.armed:
+                if switch[0] in ('', name) and switch[1] in body:
+                    switch[2] -= 1
+                    if switch[2] <= 0:
+                        self.armed.remove(switch)
+                    return True
+        return False
+    def run(self, name, fn, *args, **kwargs):
+        """fn(*args, **kwargs) under cProfile and the stack sampler - or plainly if all slots are busy"""
+        if not self.slots.acquire(blocking=False):
+            return fn(*args, **kwargs)
+        try:
+            profile, sampler = cProfile.Profile(), StackSampler(threading.get_ident(), self.sample_interval)
+            _local.active = True
+            t0 = time.perf_counter()
+            sampler.start()
+            profile.enable()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                profile.disable()
+                sampler.stopped.set()
+                sampler.join()
+                _local.active = False
+                self.save(name, time.perf_counter() - t0, profile, sampler)
+        finally:
+            self.slots.release()
+    def save(self, name, seconds, profile, sampler):
+        pid = f"{time.strftime('%Y%m%d-%H%M%S')}-{name}-{uuid.uuid4().hex[:6]}"
+        base = os.path.join(self.directory, pid)
+        profile.dump_stats(f"{base}.pstats")
+        summary = io.StringIO()
+        summary.write(f"{name}: {seconds * 1000:.1f} ms\n\n")
+        pstats.Stats(profile, stream=summary).sort_stats('cumulative').print_stats(60)
+        with open(f"{base}.txt", 'w') as f:
+            f.write(summary.getvalue())
+        with open(f"{base}.collapsed", 'w') as f:
+            f.write(sampler.collapsed())
+        self.prune()
+    def profiles(self):
+        """Stored profile ids, newest first"""
+        names = {f.rsplit('.', 1)[0] for f in os.listdir(self.directory) if f.endswith('.pstats')}
+        return sorted(names, reverse=True)
+    def prune(self):
+        for pid in self.profiles()[self.keep:]:
+            for ext in ('pstats', 'txt', 'collapsed'):
+                try:
+                    os.remove(os.path.join(self.directory, f"{pid}.{ext}"))
+                except OSError:
+                    pass
+
+def profile_callbacks(app, profiler):
+    """Wrap every registered Dash callback so profiler.wants() requests run under the profiler"""
+    for entry in app.callback_map.values():
+        fn = entry['callback']
+        entry['callback'] = _profiled(profiler, fn)
+def _profiled(profiler, fn):
+    name = fn.__name__
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        if profiler.wants(name):
+            return profiler.run(name, fn, *args, **kwargs)
+        return fn(*args, **kwargs)
+    return wrapper
+def install_profiling(server, profiler):
+    """Token-protected routes (X-Debug-Token header or ?token=); all 404 while no token is configured:
+    /debug/profile/arm?callback=&match=&count=  profile the next matching callback request(s)
+    /debug/profiles                             stored profiles, newest first
+    /debug/profiles/<id>.<pstats|txt|collapsed> download one
+    """
+    check = profiler.require_token
+    @server.route('/debug/profile/arm', methods=['GET', 'POST'])
+    def profile_arm():
+        check()
+        callback, match = request.args.get('callback', ''), request.args.get('match', '')
+        try:
+            count = max(1, min(int(request.args.get('count', 1)), 10))
+        except ValueError:
+            abort(400, "count must be a whole number")
+        profiler.arm(callback, match, count)
+        return jsonify({'armed': {'callback': callback or '*', 'match': match, 'count': count}})
+    @server.route('/debug/profiles')
+    def profile_list():
+        check()
+        return jsonify(profiler.profiles())
+    @server.route('/debug/profiles/<pid>.<kind>')
+    def profile_file(pid, kind):
+        check()
+        if kind not in ('pstats', 'txt', 'collapsed') or pid not in profiler.profiles():
+            abort(404)
+        return send_file(os.path.join(profiler.directory, f"{pid}.{kind}"), as_attachment=kind == 'pstats',
+                         mimetype='application/octet-stream' if kind == 'pstats' else 'text/plain')
@@ -0,0 +1,25 @@
+# Shared fixtures. The dashboard loads its data when imported, so `dashboard` generates a small
+# seeded dataset (make_data.py) in a temp folder and imports Dashboard from there, once per run.
+import os
+import subprocess
+import sys
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+@pytest.fixture(scope='session')
+def dashboard(tmp_path_factory):
+    data = tmp_path_factory.mktemp('data')
+    subprocess.run([sys.executable, os.path.join(ROOT, 'make_data.py'), '--rows', '3000', '--seed', '7',
+                    '--out', str(data)], check=True, capture_output=True)
+    os.environ.update(WARMUP='0', LOG_LEVEL='WARNING', TRACE_SAMPLE_RATE='0',
+                      EXPORT_DIR=str(tmp_path_factory.mktemp('exports')),
+                      ACCESS_LOG=str(data / 'access.json'), TRACE_LOG=str(data / 'traces.jsonl'))
+    cwd = os.getcwd()
+    os.chdir(data)
+    try:
+        import Dashboard
+    finally:
+        os.chdir(cwd)
+    return Dashboard
@@ -0,0 +1,114 @@
+# coalesce.py: SingleFlight / LatestOnly under concurrent callers
+import threading
+import time
+import pytest
+from coalesce import LatestOnly, SingleFlight, Superseded
+
+def wait_for(check, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not check():
+        assert time.monotonic() < deadline, 'timed out'
+        time.sleep(0.001)
+
+def run_all(targets):
+    """Start each target in a thread; returns the threads and {index: result or exception}"""
+    out = {}
+    def call(i, target):
+        try:
+            out[i] = target()
+        except Exception as e:
+            out[i] = e
+    threads = [threading.Thread(target=call, args=(i, t), daemon=True) for i, t in enumerate(targets)]
+    for t in threads:
+        t.start()
+    return threads, out
+def join(threads):
+    for t in threads:
+        t.join(5)
+        assert not t.is_alive()
+
+class Blocking:
+    """fn for SingleFlight.do that blocks until released, then returns or raises"""
+    def __init__(self, result=None, error=None):
+        self.started, self.release = threading.Event(), threading.Event()
+        self.runs = 0
+        self.result, self.error = result, error
+    def __call__(self, still_wanted):
+        self.runs += 1
+        self.started.set()
+        assert self.release.wait(5)
+        if self.error:
+            raise self.error
+        if not still_wanted():
+            raise Superseded()
+        return self.result
+
+def test_identical_keys_run_once():
+    sf = SingleFlight()
+    fn = Blocking(result=['shared'])
+    threads, out = run_all([lambda: sf.do('k', fn)] * 8)
+    wait_for(lambda: sf.stats['coalesced'] == 7)
+    fn.release.set()
+    join(threads)
+    assert fn.runs == 1 and sf.stats['computed'] == 1
+    assert all(out[i] is out[0] for i in range(8)) and out[0] == ['shared']
+def test_different_keys_run_separately():
+    sf = SingleFlight()
+    fn = Blocking(result=1)
+    fn.release.set()
+    assert [sf.do(k, fn) for k in 'abc'] == [1, 1, 1] and fn.runs == 3
+
+def test_exception_reaches_every_waiter():
+    sf = SingleFlight(cache_size=4)
+    error = ValueError('boom')
+    fn = Blocking(error=error)
+    threads, out = run_all([lambda: sf.do('k', fn)] * 5)
+    wait_for(lambda: sf.stats['coalesced'] == 4)
+    fn.release.set()
+    join(threads)
+    assert fn.runs == 1 and all(out[i] is error for i in range(5))
+    assert not sf.cached('k') and not sf.calls
+    # errors are not cached: the next call runs again
+    assert sf.do('k', lambda still_wanted: 'ok') == 'ok'
+
+def test_results_are_cached():
+    sf = SingleFlight(cache_size=2, sizer=len)
+    for key in 'abc':
+        sf.do(key, lambda still_wanted, key=key: key * 10)
+    assert not sf.cached('a') and sf.cached('b') and sf.cached('c') and sf.bytes == 20
+    assert sf.do('c', lambda still_wanted: pytest.fail('recomputed')) == 'cccccccccc'
+    assert sf.evict() == 10 and sf.bytes == 10
+
+def test_superseded_request_raises_and_is_not_cached():
+    sf, latest = SingleFlight(cache_size=4, sizer=len), LatestOnly()
+    fn = Blocking(result='old')
+    is_current = latest.start('session')
+    threads, out = run_all([lambda: sf.do('k', fn, is_current)])
+    assert fn.started.wait(5)
+    latest.start('session')  # a newer request from the same session
+    assert not is_current()
+    fn.release.set()
+    join(threads)
+    assert isinstance(out[0], Superseded)
+    assert sf.stats['superseded'] == 1
+    assert not sf.cached('k') and sf.bytes == 0 and not sf.calls
+
+def test_superseded_only_when_every_waiter_is():
+    sf, latest = SingleFlight(cache_size=4), LatestOnly()
+    fn = Blocking(result='kept')
+    mine, theirs = latest.start('a'), latest.start('b')
+    threads, out = run_all([lambda: sf.do('k', fn, mine), lambda: sf.do('k', fn, theirs)])
+    wait_for(lambda: sf.stats['coalesced'] == 1)
+    latest.start('a')
+    fn.release.set()
+    join(threads)
+    assert out == {0: 'kept', 1: 'kept'} and sf.cached('k')
+
+def test_latest_only():
+    latest = LatestOnly(max_keys=2)
+    first = latest.start('a')
+    assert first()
+    second = latest.start('a')
+    assert not first() and second()
+    latest.start('b'), latest.start('c')  # 'a' falls out of the table: nothing left to compare
+    assert second()
@@ -0,0 +1,82 @@
+# figure_specs.py: typed array encoding and the figure signatures used for incremental updates
+import base64
+import copy
+import numpy as np
+import pandas as pd
+import pytest
+import figure_specs as fs
+
+def decoded(enc):
+    return np.frombuffer(base64.b64decode(enc['bdata']), dtype='<' + enc['dtype'])
+
+@pytest.mark.parametrize('values, dtype', [
+    (np.arange(-5, 5), 'i1'),
+    (np.arange(246, 256), 'u1'),
+    (np.arange(-300, 300, 60), 'i2'),
+    (np.arange(60000, 60010), 'u2'),
+    (np.arange(-70000, 70000, 14000), 'i4'),
+    (np.arange(3_000_000_000, 3_000_000_010), 'u4'),
+    (np.arange(-3, 7) * 1_000_000_000, 'f8'),  # no int64 in plotly.js
+    (np.arange(10) * 12.0, 'i1'),  # integral floats pack as ints
+    (np.arange(10) / 4, 'f4'),  # exact in float32
+    (np.arange(1, 11) / 3, 'f4'),  # within FLOAT32_RTOL
+    (np.arange(1, 11) * 1e-50, 'f8'),  # underflows float32
+])
+def test_typed_array_dtypes(values, dtype):
+    enc = fs.typed_array(values)
+    assert enc['dtype'] == dtype
+    assert np.allclose(decoded(enc), values, rtol=fs.FLOAT32_RTOL, atol=0)
+
+def test_typed_array_nan():
+    a = np.array([1.5, np.nan, 2.5] * 4)
+    enc = fs.typed_array(a)
+    assert enc['dtype'] == 'f4'
+    assert np.array_equal(decoded(enc), a, equal_nan=True)
+    assert fs.typed_array(np.array([1.0, np.nan] * 4))['dtype'] == 'f4'  # integral but not finite
+
+@pytest.mark.parametrize('values', [
+    pd.Series(['a', 'b'] * 5),  # object
+    pd.Series([1, 'b'] * 5),  # mixed object
+    [True, False] * 5,  # bool
+    list(range(fs.TYPED_ARRAY_MIN_LEN - 1)),  # too short
+    np.zeros((4, 4)),  # not 1-D
+])
+def test_typed_array_fallback(values):
+    assert fs.typed_array(values) is None
+
+def test_encode_figure():
+    fig = fs.figure_spec([{'type': 'scatter', 'x': list(range(10)), 'y': pd.Series(np.arange(10) / 4),
+                           'text': ['t'] * 10, 'marker': {'size': np.full(10, 12), 'color': 'red'}}])
+    fs.encode_figure(fig)
+    trace = fig['data'][0]
+    assert trace['x']['dtype'] == 'i1' and trace['y']['dtype'] == 'f4' and trace['marker']['size']['dtype'] == 'i1'
+    assert trace['text'] == ['t'] * 10 and trace['marker']['color'] == 'red'
+    assert fig['layout']['template'] is fs.DEFAULT_TEMPLATE  # layout is left alone
+
+def bars(y, **layout):
+    return fs.figure_spec([{'type': 'bar', 'x': list(range(len(y))), 'y': y, 'name': 'Clicks'}], **layout)
+def test_signature_ignores_data_arrays_and_annotations():
+    a = bars([1, 2, 3], height=300, annotations=[{'text': 'a'}])
+    b = bars(np.arange(50) * 2.5, height=300, annotations=[{'text': 'b'}])
+    sig_a, updates = fs.figure_structure(a)
+    sig_b, _ = fs.figure_structure(fs.encode_figure(b))
+    assert sig_a == sig_b
+    assert [path for path, _ in updates] == [('data', 0, 'x'), ('data', 0, 'y'), ('layout', 'annotations')]
+
+@pytest.mark.parametrize('change', [
+    lambda fig: fig['layout'].update(height=400),
+    lambda fig: fig['data'][0].update(name='Cost'),
+    lambda fig: fig['data'].append({'type': 'bar', 'x': [1], 'y': [1]}),
+    lambda fig: fig['layout'].update(template={'layout': {}}),
+])
+def test_signature_changes_with_structure(change):
+    fig = bars([1, 2, 3], height=300)
+    changed = copy.deepcopy(fig)
+    change(changed)
+    assert fs.figure_structure(fig)[0] != fs.figure_structure(changed)[0]
+
+def test_signature_does_not_touch_the_figure():
+    fig = bars([1, 2, 3], annotations=[{'text': 'a'}])
+    before = copy.deepcopy(fig)
+    fs.figure_structure(fig)
+    assert fig == before and fig['layout']['template'] is fs.DEFAULT_TEMPLATE
@@ -0,0 +1,100 @@
+# ingest.py: number parsing and its coercion report, column aliases, projection and absent columns
+import io
+import numpy as np
+import pandas as pd
+import pytest
+import ingest
+from ingest import Column
+
+def parsed(values):
+    frame = pd.DataFrame({'x': pd.Series(values, dtype=object)})
+    failures = ingest.parse_numbers(frame, ['x'])
+    return frame['x'].tolist(), failures
+
+@pytest.mark.parametrize('raw, expected', [
+    ('$1,234.50', 1234.5),
+    ('€ 12', 12.0),
+    ('£3', 3.0),
+    ('1.2%', 1.2),
+    ('45 %', 45.0),
+    ('12,345', 12345.0),
+    ('1,234,567', 1234567.0),
+    ('1,500', 1500.0),
+    ('(7)', -7.0),
+    ('-3.5', -3.5),
+    ('  42 ', 42.0),
+])
+def test_parse_numbers(raw, expected):
+    values, failures = parsed([raw])
+    assert values == [expected] and failures == {}
+
+@pytest.mark.parametrize('raw', ['abc', '12abc', '1.2.3', '1,5', '1,23', '12,34.5', '1,2345'])
+def test_junk_and_decimal_commas_fail(raw):
+    values, failures = parsed(['1', raw])
+    assert values == [1.0, 0.0]
+    rows, sample = failures['x']
+    assert list(rows) == [1] and sample == [raw]
+
+def test_blanks_are_zero_and_not_reported():
+    values, failures = parsed(['', '-', '--', '  ', None, np.nan, '5'])
+    assert values == [0, 0, 0, 0, 0, 0, 5] and failures == {}
+
+def test_numeric_column_is_only_filled():
+    frame = pd.DataFrame({'x': [1.5, np.nan, 3.0]})
+    assert ingest.parse_numbers(frame, ['x']) == {}
+    assert frame['x'].tolist() == [1.5, 0.0, 3.0]
+
+def test_text_columns_are_parsed_together():
+    frame = pd.DataFrame({'a': ['1', 'x', '3'], 'b': ['4', '5', 'y'], 'c': [1, 2, 3]})
+    failures = ingest.parse_numbers(frame, ['a', 'b', 'c'])
+    assert frame['a'].tolist() == [1, 0, 3] and frame['b'].tolist() == [4, 5, 0]
+    assert {c: list(rows) for c, (rows, _) in failures.items()} == {'a': [1], 'b': [2]}
+
+def test_failed_sample_is_capped():
+    values, failures = parsed(['bad'] * (ingest.FAILED_SAMPLE + 3))
+    rows, sample = failures['x']
+    assert len(rows) == ingest.FAILED_SAMPLE + 3 and len(sample) == ingest.FAILED_SAMPLE
+
+@pytest.mark.parametrize('candidates, expected', [
+    (['Clicks'], 'Clicks'),
+    (['clicks'], 'Clicks'),
+    (['Impr.', 'Impressions'], 'Impressions'),
+    (['impressions', 'Impr'], 'Impr'),  # an exact match wins over a case-insensitive one
+    (['Cost', 'Spend'], None),
+])
+def test_find_col(candidates, expected):
+    header = pd.DataFrame(columns=['Clicks', 'Impr', 'Impressions'])
+    assert ingest.find_col(header, candidates) == expected
+
+CSV = "clicks,Impr,Notes,Unused\n1,10,a,x\n\"1,200\",20,b,y\n,oops,c,z\n"
+SCHEMA = {
+    'Clicks': Column(['Clicks'], 'number'),
+    'Impressions': Column(['Impressions', 'Impr'], 'number'),
+    'Cost': Column(['Cost'], 'number', 0),
+    'CTR': Column(['CTR'], 'number'),
+    'Keyword': Column(['Keyword'], 'text', None),
+    'Match': Column(['Match type'], 'label', 'Unknown'),
+}
+
+def test_read_dataset_renames_and_projects():
+    frame = ingest.read_dataset(io.StringIO(CSV), SCHEMA)
+    assert list(frame.columns) == ['Clicks', 'Impressions']
+    assert len(ingest.read_dataset(io.StringIO(CSV), SCHEMA, nrows=2)) == 2
+def test_read_dataset_extra_columns():
+    assert list(ingest.read_dataset(io.StringIO(CSV), SCHEMA, ['Notes']).columns) == ['Clicks', 'Impressions', 'Notes']
+    assert list(ingest.read_dataset(io.StringIO(CSV), SCHEMA, ['*']).columns) == ['Clicks', 'Impressions', 'Notes', 'Unused']
+
+def test_prepare_types_and_adds_absent_columns():
+    frame = ingest.read_dataset(io.StringIO(CSV), SCHEMA)
+    report = ingest.prepare(frame, SCHEMA, 'test')
+    assert frame['Clicks'].tolist() == [1, 1200, 0]
+    assert frame['Impressions'].tolist() == [10, 20, 0]
+    assert (frame['Cost'] == 0).all() and frame['CTR'].isna().all()
+    assert (frame['Match'] == 'Unknown').all()
+    assert 'Keyword' not in frame.columns
+    assert report == {'Impressions': {'failed': 1, 'lines': [4], 'values': ['oops']}}
+
+def test_prepare_labels():
+    frame = pd.DataFrame({'Match': ['exact', None, ',', 'broad']})
+    assert ingest.prepare(frame, {'Match': Column(['Match'], 'label')}, 'test') == {}
+    assert frame['Match'].tolist() == ['exact', 'Unknown', 'Unknown', 'broad']
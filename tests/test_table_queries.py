@@ -0,0 +1,72 @@
+# DataTable filter_query parsing, custom sorting and paging (apply_filter_query / table_positions)
+import numpy as np
+import pandas as pd
+import pytest
+
+NO_FILTERS = (None, None, None, None)
+
+@pytest.fixture(scope='module')
+def work(dashboard):
+    return dashboard.DATASETS['keyword']
+def query(dashboard, q):
+    positions = dashboard.filtered_positions('keyword', *NO_FILTERS)
+    return dashboard.apply_filter_query(dashboard.DATASETS['keyword'], positions, q)
+
+@pytest.mark.parametrize('part, expected', [
+    ('{Clicks} > 10', ('Clicks', 'gt', 10.0)),
+    ('{Clicks} >= 10', ('Clicks', 'ge', 10.0)),
+    ('{CTR} < 1.5', ('CTR', 'lt', 1.5)),
+    ('{Advertiser} = Adv1', ('Advertiser', 'eq', 'Adv1')),
+    ('{Advertiser} != Adv1', ('Advertiser', 'ne', 'Adv1')),
+    ('{Keyword} contains car', ('Keyword', 'contains', 'car')),
+    ('{Keyword} = "best car"', ('Keyword', 'eq', 'best car')),
+    ("{Keyword} = 'it\\'s'", ('Keyword', 'eq', "it's")),
+    ('{Campaign} = `C1`', ('Campaign', 'eq', 'C1')),
+    ('no operator here', (None, None, None)),
+])
+def test_split_filter_part(dashboard, part, expected):
+    assert dashboard.split_filter_part(part) == expected
+
+def test_equals(dashboard, work):
+    adv = work['Advertiser'].iloc[0]
+    pos = query(dashboard, f'{{Advertiser}} = "{adv}"')
+    assert len(pos) and (work['Advertiser'].iloc[pos] == adv).all()
+    assert len(pos) == (work['Advertiser'] == adv).sum()
+def test_greater_than(dashboard, work):
+    pos = query(dashboard, '{Clicks} > 10')
+    assert np.array_equal(pos, np.flatnonzero(work['Clicks'] > 10))
+def test_contains_is_case_insensitive(dashboard, work):
+    word = work['Keyword'].iloc[0].split()[0]
+    pos = query(dashboard, f'{{Keyword}} contains {word.upper()}')
+    expected = work['Keyword'].astype(str).str.contains(word, case=False, regex=False)
+    assert np.array_equal(pos, np.flatnonzero(expected))
+def test_clauses_are_anded(dashboard, work):
+    adv = work['Advertiser'].iloc[0]
+    pos = query(dashboard, f'{{Advertiser}} = {adv} && {{Clicks}} > 10')
+    assert np.array_equal(pos, np.flatnonzero((work['Advertiser'] == adv) & (work['Clicks'] > 10)))
+
+@pytest.mark.parametrize('q', ['garbage', '{Nope} = 1', '{Clicks} > many', '{Clicks} >', ''])
+def test_malformed_or_unusable_clauses_are_ignored(dashboard, work, q):
+    assert np.array_equal(query(dashboard, q), np.arange(len(work)))
+
+@pytest.mark.parametrize('column', ['Clicks', 'CTR', 'Keyword', 'Advertiser', 'Position_of_Number'])
+@pytest.mark.parametrize('ascending', [True, False])
+def test_sorting(dashboard, work, column, ascending):
+    adv = work['Advertiser'].iloc[0]
+    pos = dashboard.table_positions('keyword', (None, adv, None, None), '', column, ascending)
+    sub = work[work['Advertiser'] == adv]
+    expected = sub[column].sort_values(ascending=ascending, kind='stable', na_position='last')
+    pd.testing.assert_series_equal(work[column].iloc[pos].reset_index(drop=True),
+                                   expected.reset_index(drop=True))
+
+def test_page_past_the_end(dashboard, work):
+    columns = ['Keyword', 'Clicks']
+    data, pages = dashboard.table_page('keyword', columns, NO_FILTERS, 10_000, 20, None, '')
+    assert data == []
+    assert pages == -(-len(work) // 20)
+def test_last_page(dashboard, work):
+    pages = -(-len(work) // 20)
+    data, _ = dashboard.table_page('keyword', ['Keyword', 'Clicks'], NO_FILTERS, pages - 1, 20,
+                                   [{'column_id': 'Clicks', 'direction': 'asc'}], '')
+    assert len(data) == len(work) - (pages - 1) * 20
+    assert data[-1]['Clicks'] == work['Clicks'].max()
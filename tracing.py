@@ -0,0 +1,137 @@
+# tracing.py
+# Lightweight request tracing. A trace is started around a callback (traced()); code inside it
+# marks stages with `with span('name'):`, which is a no-op on threads without an active trace.
+# Work handed to another thread keeps its place in the trace through bind(). Finished traces
+# are kept in a small in-memory ring for the debug route, and a sample of them (plus every slow
+# one) is appended to a JSON-lines file.
+import functools
+import json
+import os
+import random
+import threading
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager
+
+_local = threading.local()
+
+class Trace:
+    def __init__(self, name):
+        self.id = uuid.uuid4().hex[:12]
+        self.name = name
+        self.started = time.time()
+        self.t0 = time.perf_counter()
+        self.spans = []  # [id, parent id, name, start offset, seconds, thread name]
+        self.lock = threading.Lock()
+        self.seconds = None
+
+    def open(self, name, parent):
+        with self.lock:
+            span = [len(self.spans), parent, name, time.perf_counter() - self.t0, None,
+                    threading.current_thread().name]
+            self.spans.append(span)
+        return span
+    def as_dict(self):
+        return {'id': self.id, 'name': self.name, 'started': self.started, 'seconds': self.seconds,
+                'spans': [dict(zip(('id', 'parent', 'name', 'start', 'seconds', 'thread'), s)) for s in self.spans]}
+    def flame(self, width=60):
+        """Text flame/timeline chart: one line per span, indented by depth, with a bar covering
+        its share of the trace and its self time (not covered by child spans - 0 when the
+        children ran in parallel on other threads)"""
+        children = {}
+        for s in self.spans:
+            children.setdefault(s[1], []).append(s)
+        total = self.seconds or max((s[3] + (s[4] or 0) for s in self.spans), default=0) or 1e-9
+        lines = [f"{self.name}  {total * 1000:.1f} ms  (trace {self.id})", ""]
+        def walk(parent, depth):
+            for s in sorted(children.get(parent, []), key=lambda s: s[3]):
+                seconds = s[4] or 0
+                child_seconds = sum(c[4] or 0 for c in children.get(s[0], []))
+                a = int(s[3] / total * width)
+                b = max(a + 1, int((s[3] + seconds) / total * width))
+                bar = ' ' * a + '█' * (b - a)
+                label = ('  ' * depth + str(s[2]))[:48]
+                lines.append(f"{label:<48} {seconds * 1000:9.1f} ms {max(seconds - child_seconds, 0) * 1000:9.1f} self  "
+                             f"|{bar:<{width}}| {s[5]}")
+                walk(s[0], depth + 1)
+        walk(None, 0)
+        return '\n'.join(lines)
+
+class Tracer:
+    """Keeps the last `keep` traces and writes sampled / slow ones to log_path (rotated at max_bytes)"""
+    def __init__(self, log_path=None, sample_rate=0.05, slow_seconds=2.0, keep=50, max_bytes=10 * 1024 * 1024):
+        self.log_path, self.sample_rate, self.slow_seconds, self.max_bytes = log_path, sample_rate, slow_seconds, max_bytes
+        self.recent = deque(maxlen=keep)
+        self.lock = threading.Lock()
+
+    def get(self, trace_id):
+        return next((t for t in list(self.recent) if t.id == trace_id), None)
+    def finish(self, trace):
+        self.recent.append(trace)
+        if self.log_path and (trace.seconds >= self.slow_seconds or random.random() < self.sample_rate):
+            line = json.dumps(trace.as_dict(), default=str) + '\n'
+            with self.lock:
+                try:
+                    if os.path.exists(self.log_path) and os.path.getsize(self.log_path) > self.max_bytes:
+                        os.replace(self.log_path, f"{self.log_path}.1")
+                    with open(self.log_path, 'a') as f:
+                        f.write(line)
+                except OSError:
+                    pass
+
+@contextmanager
+def span(name):
+    """Time a stage as a child of the current span; free when no trace is active on this thread"""
+    trace = getattr(_local, 'trace', None)
+    if trace is None:
+        yield
+        return
+    parent = _local.span
+    s = trace.open(name, parent)
+    _local.span = s[0]
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        s[4] = time.perf_counter() - t0
+        _local.span = parent
+@contextmanager
+def _attached(trace, span_id):
+    saved = getattr(_local, 'trace', None), getattr(_local, 'span', None)
+    _local.trace, _local.span = trace, span_id
+    try:
+        yield
+    finally:
+        _local.trace, _local.span = saved
+def bind(fn):
+    """fn wrapped to run inside the calling thread's current span, for handing to a thread pool"""
+    trace = getattr(_local, 'trace', None)
+    if trace is None:
+        return fn
+    span_id = _local.span
+    @functools.wraps(fn)
+    def bound(*args, **kwargs):
+        with _attached(trace, span_id):
+            return fn(*args, **kwargs)
+    return bound
+def traced(tracer, fn, name=None):
+    """fn wrapped to run as the root span of a new trace, handed to tracer when it ends"""
+    name = name or fn.__name__
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        if getattr(_local, 'trace', None) is not None:  # already inside a trace
+            with span(name):
+                return fn(*args, **kwargs)
+        trace = Trace(name)
+        with _attached(trace, None):
+            try:
+                with span(name):
+                    return fn(*args, **kwargs)
+            finally:
+                trace.seconds = time.perf_counter() - trace.t0
+                tracer.finish(trace)
+    return wrapper
+def current_trace_id():
+    trace = getattr(_local, 'trace', None)
+    return trace and trace.id
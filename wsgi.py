@@ -0,0 +1,8 @@
+# wsgi.py
+# gunicorn entry point (gunicorn wsgi:server). Serves the dashboard or, when its data could not be
+# loaded, the error page - whose /healthz and /readyz report why - instead of crash-looping.
+from health import StartupFailed
+try:
+    from Dashboard import server
+except StartupFailed as e:
+    server = e.server